@@ -12,17 +12,60 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import threading
+
+import cachetools
 from oslo_utils import importutils
 
 
+# Action classes constructed for the same base class and attributes.
+# The base class is a part of the key so that a class replaced at runtime,
+# e.g. with mock.patch(), is never bypassed.
+_ACTION_CLASS_CACHE = cachetools.LRUCache(maxsize=1000)
+_ACTION_CLASS_CACHE_LOCK = threading.RLock()
+
+
+def _freeze(value):
+    # Equal values of different types, e.g. 1 and True or [1] and (1,),
+    # must not share a class.
+    if isinstance(value, dict):
+        return (
+            type(value),
+            frozenset((k, _freeze(v)) for k, v in value.items())
+        )
+
+    if isinstance(value, (list, tuple)):
+        return type(value), tuple(_freeze(v) for v in value)
+
+    return type(value), value
+
+
 def construct_action_class(action_class_str, attributes):
     # Rebuild action class and restore attributes.
     action_class = importutils.import_class(action_class_str)
 
+    try:
+        key = (action_class, _freeze(attributes))
+
+        hash(key)
+    except TypeError:
+        key = None
+
+    if key is not None:
+        with _ACTION_CLASS_CACHE_LOCK:
+            unique_action_class = _ACTION_CLASS_CACHE.get(key)
+
+        if unique_action_class is not None:
+            return unique_action_class
+
     unique_action_class = type(
         action_class.__name__,
         (action_class,),
         attributes
     )
 
+    if key is not None:
+        with _ACTION_CLASS_CACHE_LOCK:
+            _ACTION_CLASS_CACHE[key] = unique_action_class
+
     return unique_action_class
@@ -21,10 +21,10 @@ import smtplib
 import time
 
 from oslo_log import log as logging
-import requests
 import six
 
 from mistral import exceptions as exc
+from mistral.utils import http_utils
 from mistral.utils import javascript
 from mistral.utils import ssh_utils
 from mistral_lib import actions
@@ -136,6 +136,10 @@ class HTTPAction(actions.Action):
         A CA_BUNDLE path can also be provided.
     """
 
+    # Waiting for the response takes no CPU, the action is run by
+    # the I/O pool if the executor has one.
+    io_bound = True
+
     def __init__(self,
                  url,
                  method="GET",
@@ -197,7 +201,7 @@ class HTTPAction(actions.Action):
             else:
                 action_verify = None
 
-            resp = requests.request(
+            resp = http_utils.request(
                 self.method,
                 self.url,
                 params=self.params,
@@ -461,6 +465,10 @@ class JavaScriptAction(actions.Action):
 
     """
 
+    # Evaluation of a script is CPU-bound, it's run by a worker process
+    # if the executor has a process pool.
+    run_in_process = True
+
     def __init__(self, script, context=None):
         """Context here refers to a javasctript context
 
@@ -97,6 +97,66 @@ js_impl_opt = cfg.StrOpt(
            'action to evaluate scripts.')
 )
 
+javascript_opts = [
+    cfg.IntOpt(
+        'pool_size',
+        default=4,
+        min=0,
+        help=_(
+            'The max number of idle JavaScript runtimes kept for reuse '
+            'by the std.javascript action within one process. A reused '
+            'runtime runs scripts compiled by it before without parsing '
+            'them again. Runtimes are only reused for scripts of the same '
+            'project, built-in objects of a reused runtime are read-only '
+            'and global variables set by a script are deleted once it '
+            'completes. Supported by the "v8eval" and "py_mini_racer" '
+            'implementations. Use 0 to create a new runtime for every '
+            'script.'
+        )
+    ),
+    cfg.IntOpt(
+        'recycle_after',
+        default=1000,
+        min=0,
+        help=_(
+            'The number of scripts after which a JavaScript runtime is '
+            'replaced with a new one. Use 0 to keep runtimes as long as '
+            'they run scripts successfully.'
+        )
+    ),
+    cfg.IntOpt(
+        'script_cache_size',
+        default=100,
+        min=1,
+        help=_(
+            'The max number of distinct scripts compiled by one '
+            'JavaScript runtime. A runtime that has reached the limit is '
+            'replaced with a new one.'
+        )
+    ),
+    cfg.FloatOpt(
+        'timeout',
+        default=0.0,
+        min=0.0,
+        help=_(
+            'The time in seconds after which evaluation of a script is '
+            'interrupted. Supported by the "py_mini_racer" '
+            'implementation. Use 0 for no limit.'
+        )
+    ),
+    cfg.IntOpt(
+        'max_memory',
+        default=0,
+        min=0,
+        help=_(
+            'The max size of memory, in megabytes, used by a JavaScript '
+            'runtime after which evaluation of a script is interrupted. '
+            'Supported by the "py_mini_racer" implementation. Use 0 for '
+            'no limit.'
+        )
+    )
+]
+
 rpc_impl_opt = cfg.StrOpt(
     'rpc_implementation',
     default='oslo',
@@ -189,6 +249,54 @@ engine_opts = [
         default=60,
         help=_('A number of seconds that indicates how long action '
                'definitions should be stored in the local cache.')
+    ),
+    cfg.IntOpt(
+        'execution_data_cache_size',
+        default=500,
+        min=0,
+        help=_('The number of workflow executions whose spec, input, '
+               'params and context are kept decoded in the local cache '
+               'so that locking an unchanged workflow execution doesn\'t '
+               'need to read them from the database again. '
+               '0 disables the cache.')
+    ),
+    cfg.StrOpt(
+        'named_lock_backend',
+        default='table',
+        choices=['auto', 'table', 'postgresql', 'mysql', 'in_process'],
+        help=_('The mechanism used for named locks. "table" uses the '
+               '"named_locks" table and works with any database, '
+               '"postgresql" uses transaction level advisory locks, '
+               '"mysql" uses GET_LOCK() and requires MySQL 5.7 or newer '
+               'without Galera replication, "in_process" uses process '
+               'local semaphores and can only be used with SQLite and a '
+               'single Mistral process. "auto" selects the backend '
+               'according to the database dialect falling back to '
+               '"table". All engines working with the same database must '
+               'use the same backend.')
+    ),
+    cfg.IntOpt(
+        'completion_check_interval',
+        default=20,
+        min=1,
+        help=_('A number of seconds between periodic completion checks '
+               'of a running workflow execution. Workflow completion is '
+               'checked right after any of its tasks completes so this '
+               'periodic check is only a safety net that also restores '
+               'integrity of task executions, see '
+               '"execution_integrity_check_delay".')
+    ),
+    cfg.BoolOpt(
+        'execution_affinity',
+        default=False,
+        help=_('Enables routing of synchronous RPC calls related to '
+               'a workflow execution to the engines of one host chosen '
+               'by consistent hashing of the execution id over the hosts '
+               'of the engine coordination group members. Asynchronous '
+               'calls are handled by any engine. Requires a coordination '
+               'backend (see "backend_url" of the "coordination" group) '
+               'and the "oslo" RPC implementation. Calls for which there '
+               'is no owning engine are handled by any engine.')
     )
 ]
 
@@ -219,6 +327,219 @@ executor_opts = [
         'version',
         default='1.0',
         help=_('The version of the executor.')
+    ),
+    cfg.IntOpt(
+        'run_actions_batch_size',
+        default=1,
+        min=1,
+        help=_(
+            'The max number of actions sent to executors within one RPC '
+            'message. Actions scheduled within one engine transaction '
+            'are grouped by their target and sent in batches of this '
+            'size. The default value 1 means that every action is sent '
+            'with a separate "run_action" call. Set it to a bigger value '
+            'only when all executors support the "run_actions" call.'
+        )
+    ),
+    cfg.FloatOpt(
+        'result_batch_window',
+        default=0.0,
+        min=0.0,
+        help=_(
+            'The time in seconds during which an executor collects '
+            'results of completed actions in order to send them to the '
+            'engine with one "on_actions_complete" call. The default '
+            'value 0 means that every result is sent right away with '
+            'a separate "on_action_complete" call. Set it to a positive '
+            'value only when all engines support the '
+            '"on_actions_complete" call.'
+        )
+    ),
+    cfg.IntOpt(
+        'result_batch_size',
+        default=100,
+        min=1,
+        help=_(
+            'The max number of action results sent to the engine within '
+            'one "on_actions_complete" call. Collected results are sent '
+            'as soon as their number reaches this value even if '
+            '"result_batch_window" has not expired yet.'
+        )
+    ),
+    cfg.IntOpt(
+        'concurrency_limit',
+        default=0,
+        min=0,
+        help=_(
+            'The max number of actions run by the executor concurrently, '
+            'not counting the actions run by the I/O pool (see '
+            '"io_pool_size"). Requests to run more actions wait until '
+            'running actions complete. With the "kombu" RPC '
+            'implementation the executor also takes this number of '
+            'messages from the queue at a time instead of one so that '
+            'the broker sends requests to executors that have free '
+            'slots. With the "oslo" implementation use the '
+            '"rabbit_qos_prefetch_count" option for that. Use 0 for no '
+            'limit.'
+        )
+    ),
+    cfg.BoolOpt(
+        'capacity_routing',
+        default=False,
+        help=_(
+            'Enables routing of requests to run actions to executors '
+            'with free slots. Every executor periodically publishes the '
+            'number of its free slots, i.e. "concurrency_limit" minus '
+            'the number of running actions, over the coordination group '
+            'and engines send requests to the executor with the most '
+            'free slots. Requests are sent to any executor if none of '
+            'them has free slots. Requests sent to an executor that '
+            'dies are not redelivered to other executors, even for '
+            'actions with "safe-rerun", the actions are failed by the '
+            'action heartbeat checker which therefore must be enabled '
+            '(see the "action_heartbeat" group). Requires '
+            '"concurrency_limit", a coordination backend (see '
+            '"backend_url" of the "coordination" group) and the "oslo" '
+            'RPC implementation.'
+        )
+    ),
+    cfg.IntOpt(
+        'io_pool_size',
+        default=0,
+        min=0,
+        help=_(
+            'The max number of I/O-bound actions, e.g. "std.http", run '
+            'concurrently by the executor in addition to the actions '
+            'limited by "executor_thread_pool_size". Such actions are '
+            'the ones whose classes have the "io_bound" attribute set '
+            'to True or are listed in "io_pool_actions". They spend most '
+            'of their time waiting for I/O so the pool can be much bigger '
+            'than the thread pool. The pool is only used for actions '
+            'received in batches, i.e. when "run_actions_batch_size" is '
+            'greater than 1. Use 0 to run all actions within the thread '
+            'pool.'
+        )
+    ),
+    cfg.ListOpt(
+        'io_pool_actions',
+        default=[],
+        help=_(
+            'Full paths of action classes run by the I/O pool, e.g. '
+            '"mistral.actions.std_actions.HTTPAction".'
+        )
+    ),
+    cfg.IntOpt(
+        'process_pool_size',
+        default=0,
+        min=0,
+        help=_(
+            'The number of worker processes running CPU-bound actions '
+            'outside of the executor process so that they don\'t block '
+            'other actions and the heartbeats sent to the engine. Such '
+            'actions are the ones whose classes have the "run_in_process" '
+            'attribute set to True or are listed in '
+            '"process_pool_actions". Use 0 to run all actions within the '
+            'executor process.'
+        )
+    ),
+    cfg.ListOpt(
+        'process_pool_actions',
+        default=[],
+        help=_(
+            'Full paths of action classes run by worker processes, e.g. '
+            '"mistral.actions.std_actions.EchoAction".'
+        )
+    ),
+    cfg.IntOpt(
+        'process_pool_recycle_after',
+        default=1000,
+        min=0,
+        help=_(
+            'The number of actions after which the worker processes are '
+            'replaced with new ones. Use 0 to keep the worker processes '
+            'until the executor stops.'
+        )
+    ),
+    cfg.IntOpt(
+        'process_pool_max_result_size',
+        default=1024,
+        min=0,
+        help=_(
+            'The max size, in kilobytes, of a result of an action run by '
+            'a worker process. A larger result is replaced with an error. '
+            'Use 0 for no limit.'
+        )
+    )
+]
+
+http_client_opts = [
+    cfg.BoolOpt(
+        'keep_alive',
+        default=True,
+        help=_(
+            'Enables reuse of connections opened by HTTP actions and '
+            'webhook notifications. Requests sent to the same host with '
+            'the same "verify" and "proxies" settings share a pool of '
+            'connections within one process. Set it to false to open '
+            'a new connection for every request.'
+        )
+    ),
+    cfg.IntOpt(
+        'pool_maxsize',
+        default=10,
+        min=1,
+        help=_(
+            'The max number of connections to one host kept open for '
+            'reuse.'
+        )
+    ),
+    cfg.IntOpt(
+        'max_sessions',
+        default=100,
+        min=1,
+        help=_(
+            'The max number of pooled sessions, i.e. distinct '
+            'combinations of host, "verify" and "proxies" settings. '
+            'When the limit is reached the least recently used session '
+            'and its connections are closed.'
+        )
+    ),
+    cfg.FloatOpt(
+        'idle_timeout',
+        default=60.0,
+        min=0.0,
+        help=_(
+            'The time in seconds after which a session that has not '
+            'been used and its connections are closed. Use 0 to keep '
+            'sessions until they are evicted by "max_sessions".'
+        )
+    )
+]
+
+ssh_client_opts = [
+    cfg.IntOpt(
+        'pool_size',
+        default=10,
+        min=0,
+        help=_(
+            'The max number of idle connections opened by SSH actions '
+            'kept for reuse within one process. Commands run on the same '
+            'host with the same credentials and gateway settings reuse '
+            'such connections instead of making a new SSH handshake. '
+            'When the limit is reached the least recently used '
+            'connection is closed. Use 0 to close every connection once '
+            'its command completes.'
+        )
+    ),
+    cfg.FloatOpt(
+        'idle_timeout',
+        default=60.0,
+        min=0.0,
+        help=_(
+            'The time in seconds after which an idle SSH connection is '
+            'closed. Use 0 to keep idle connections until they are '
+            'evicted by "pool_size".'
+        )
     )
 ]
 
@@ -245,6 +566,21 @@ scheduler_opts = [
             'delay limited by this property.'
         )
     ),
+    cfg.FloatOpt(
+        'max_delay',
+        default=10,
+        min=0,
+        help=(
+            'Max delay between scheduler iterations, in seconds. Every '
+            'iteration in a row that finds nothing to process doubles the '
+            'delay, starting from "fixed_delay", until it reaches this '
+            'value. An iteration that selects a full batch is followed by '
+            'the next one right away. A scheduler also polls earlier if '
+            'its process schedules a call that is due before the next '
+            'iteration. If this value isn\'t greater than "fixed_delay" '
+            'the delay doesn\'t grow.'
+        )
+    ),
     cfg.IntOpt(
         'batch_size',
         default=None,
@@ -283,6 +619,81 @@ scheduler_opts = [
              'scheduler process crashed. In this case another scheduler '
              'instance will pick it up from the Job Store, but not earlier '
              'than 12:01:00 and try to process it.'
+    ),
+    cfg.StrOpt(
+        'job_capture_mode',
+        default='batch',
+        choices=['batch', 'per_job'],
+        help=(
+            'Defines how a scheduler captures jobs selected from the Job '
+            'Store. "batch" captures all selected jobs with one statement '
+            '(UPDATE .. RETURNING on PostgreSQL, SELECT .. FOR UPDATE SKIP '
+            'LOCKED where supported, chunks of jobs otherwise). "per_job" '
+            'captures every job with a separate UPDATE statement.'
+        )
+    ),
+    cfg.IntOpt(
+        'job_pool_size',
+        default=10,
+        min=1,
+        help=(
+            'The max number of scheduled jobs captured from the Job Store '
+            'that a scheduler invokes in parallel. A scheduler doesn\'t '
+            'capture more jobs than it has free green threads in the pool.'
+        )
+    ),
+    cfg.FloatOpt(
+        'job_timeout',
+        default=None,
+        min=0.1,
+        help=(
+            'Max time, in seconds, given to a job captured from the Job '
+            'Store to complete. If the job doesn\'t complete in time it '
+            'gets interrupted and stays in the Job Store so that it can be '
+            'captured again after "captured_job_timeout". If this property '
+            'equals None then there is no restriction on the job time. It '
+            'should be less than "captured_job_timeout".'
+        )
+    ),
+    cfg.FloatOpt(
+        'timer_wheel_max_delay',
+        default=30,
+        min=0,
+        help=(
+            'Max delay, in seconds, of a delayed call or a job that a '
+            'scheduler keeps in an in-memory timing wheel of the process '
+            'that scheduled it. Such calls are still persisted but they '
+            'are processed straight from memory once the transaction that '
+            'scheduled them is committed. Other schedulers pick them up '
+            'from DB only after "pickup_job_after" seconds, i.e. if the '
+            'process crashed. The value can\'t exceed 59.9 seconds. '
+            'Use 0 to disable the timing wheel.'
+        )
+    ),
+    cfg.IntOpt(
+        'shard_count',
+        default=16,
+        min=1,
+        help=(
+            'Number of shards that delayed calls are distributed between. '
+            'Shards are assigned to engines with a consistent hash ring '
+            'over the members of the engine coordination group. The '
+            'scheduler of every engine polls the calls of its own shards '
+            'and picks up calls of other shards only if they are overdue '
+            'by more than "pickup_job_after" seconds, so that engines '
+            'don\'t contend for the same calls. Without a coordination '
+            'backend every engine owns all shards. Use 1 to disable '
+            'sharding.'
+        )
+    ),
+    cfg.BoolOpt(
+        'coalesce_calls',
+        default=True,
+        help=(
+            'Enables squashing of scheduled calls that have the same key, '
+            'target function and arguments. Only the earliest pending call '
+            'per key is kept.'
+        )
     )
 ]
 
@@ -584,6 +995,9 @@ API_GROUP = 'api'
 ENGINE_GROUP = 'engine'
 EXECUTOR_GROUP = 'executor'
 SCHEDULER_GROUP = 'scheduler'
+HTTP_CLIENT_GROUP = 'http_client'
+SSH_CLIENT_GROUP = 'ssh_client'
+JAVASCRIPT_GROUP = 'javascript'
 CRON_TRIGGER_GROUP = 'cron_trigger'
 EVENT_ENGINE_GROUP = 'event_engine'
 NOTIFIER_GROUP = 'notifier'
@@ -610,6 +1024,9 @@ CONF.register_opts(api_opts, group=API_GROUP)
 CONF.register_opts(engine_opts, group=ENGINE_GROUP)
 CONF.register_opts(executor_opts, group=EXECUTOR_GROUP)
 CONF.register_opts(scheduler_opts, group=SCHEDULER_GROUP)
+CONF.register_opts(http_client_opts, group=HTTP_CLIENT_GROUP)
+CONF.register_opts(ssh_client_opts, group=SSH_CLIENT_GROUP)
+CONF.register_opts(javascript_opts, group=JAVASCRIPT_GROUP)
 CONF.register_opts(cron_trigger_opts, group=CRON_TRIGGER_GROUP)
 CONF.register_opts(
     execution_expiration_policy_opts,
@@ -667,6 +1084,9 @@ def list_opts():
         (EXECUTOR_GROUP, executor_opts),
         (EVENT_ENGINE_GROUP, event_engine_opts),
         (SCHEDULER_GROUP, scheduler_opts),
+        (HTTP_CLIENT_GROUP, http_client_opts),
+        (SSH_CLIENT_GROUP, ssh_client_opts),
+        (JAVASCRIPT_GROUP, javascript_opts),
         (CRON_TRIGGER_GROUP, cron_trigger_opts),
         (NOTIFIER_GROUP, notifier_opts),
         (PECAN_GROUP, pecan_opts),
@@ -696,6 +1116,28 @@ def parse_args(args=None, usage=None, default_config_files=None):
         default_config_files=default_config_files
     )
 
+    validate_opts()
+
+
+def validate_opts():
+    """Checks that the values of dependent options fit each other.
+
+    :raises RuntimeError: If they don't.
+    """
+    heartbeat_opts = CONF.action_heartbeat
+
+    # Requests to run actions are sent to the queue of one executor. If it
+    # dies they are only failed by the action heartbeat checker.
+    if (CONF.executor.capacity_routing and
+            not (heartbeat_opts.max_missed_heartbeats and
+                 heartbeat_opts.check_interval)):
+        raise RuntimeError(
+            'The "capacity_routing" option of the "executor" group '
+            'requires the action heartbeat checker, see the '
+            '"max_missed_heartbeats" and "check_interval" options of the '
+            '"action_heartbeat" group.'
+        )
+
 
 def set_config_defaults():
     """This method updates all configuration default values."""
@@ -17,6 +17,7 @@
 from oslo_config import cfg
 from oslo_db import options
 from oslo_db.sqlalchemy import enginefacade
+from oslo_log import log as logging
 import osprofiler.sqlalchemy
 import sqlalchemy as sa
 
@@ -28,8 +29,12 @@ from mistral import utils
 # Note(dzimine): sqlite only works for basic testing.
 options.set_defaults(cfg.CONF, connection="sqlite:///mistral.sqlite")
 
+LOG = logging.getLogger(__name__)
+
 _DB_SESSION_THREAD_LOCAL_NAME = "db_sql_alchemy_session"
 
+_AFTER_COMMIT_CALLBACKS_KEY = 'mistral_after_commit_callbacks'
+
 _facade = None
 _sqlalchemy_create_engine_orig = sa.create_engine
 
@@ -205,6 +210,52 @@ def end_tx():
     _set_thread_local_session(None)
 
 
+def add_after_commit_callback(callback):
+    """Registers a callback invoked after the current transaction commits.
+
+    If the transaction is rolled back the callback is discarded. If there
+    isn't any transaction started within the current thread the callback
+    is invoked immediately assuming that all changes have already been
+    committed.
+
+    :param callback: A callable with no arguments. It must not access
+        the database within the committed session.
+    """
+    ses = _get_thread_local_session()
+
+    if not ses:
+        callback()
+
+        return
+
+    if not sa.event.contains(ses, 'after_commit',
+                             _run_after_commit_callbacks):
+        sa.event.listen(ses, 'after_commit', _run_after_commit_callbacks)
+        sa.event.listen(
+            ses,
+            'after_transaction_end',
+            _discard_after_commit_callbacks
+        )
+
+    ses.info.setdefault(_AFTER_COMMIT_CALLBACKS_KEY, []).append(callback)
+
+
+def _run_after_commit_callbacks(session):
+    for callback in session.info.pop(_AFTER_COMMIT_CALLBACKS_KEY, []):
+        try:
+            callback()
+        except Exception:
+            LOG.exception(
+                "Failed to run an after commit callback [callback=%s]",
+                callback
+            )
+
+
+def _discard_after_commit_callbacks(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_AFTER_COMMIT_CALLBACKS_KEY, None)
+
+
 @session_aware()
 def get_driver_name(session=None):
     return session.bind.url.drivername
@@ -0,0 +1,50 @@
+# Copyright 2019 OpenStack Foundation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Add key to scheduled jobs
+
+Revision ID: 030
+Revises: 029
+Create Date: 2019-03-12 11:20:15.241573
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '030'
+down_revision = '029'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column(
+        'scheduled_jobs_v2',
+        sa.Column('key', sa.String(length=250), nullable=True)
+    )
+
+    op.create_index(
+        'scheduled_jobs_v2_key',
+        'scheduled_jobs_v2',
+        ['key'],
+        unique=False
+    )
+
+    op.create_index(
+        'delayed_calls_v2_key',
+        'delayed_calls_v2',
+        ['key'],
+        unique=False
+    )
@@ -0,0 +1,36 @@
+# Copyright 2019 OpenStack Foundation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Add capacity to task executions
+
+Revision ID: 032
+Revises: 031
+Create Date: 2019-03-28 11:02:45.271906
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '032'
+down_revision = '031'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column(
+        'task_executions_v2',
+        sa.Column('capacity', sa.Integer(), nullable=True)
+    )
@@ -0,0 +1,36 @@
+# Copyright 2019 OpenStack Foundation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Add shard to delayed calls
+
+Revision ID: 033
+Revises: 032
+Create Date: 2019-04-02 11:17:45.394812
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '033'
+down_revision = '032'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column(
+        'delayed_calls_v2',
+        sa.Column('shard', sa.Integer(), nullable=True)
+    )
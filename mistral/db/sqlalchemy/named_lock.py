@@ -0,0 +1,395 @@
+# Copyright 2019 - Nokia Networks.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import abc
+import hashlib
+import threading
+import time
+
+from eventlet import semaphore
+from oslo_log import log as logging
+import six
+import sqlalchemy as sa
+
+from mistral import exceptions as exc
+from mistral import utils
+
+
+LOG = logging.getLogger(__name__)
+
+# All named locks taken with a native DB mechanism get this prefix so
+# that they don't clash with locks taken by other applications that
+# share the same database server.
+_LOCK_NAME_PREFIX = 'mistral:'
+
+_SESSION_LOCKS_KEY = 'mistral_named_locks'
+
+# (Backend name, dialect name) -> backend. Configured "auto" names are
+# kept too so that a backend is selected only once.
+_backends = {}
+_backends_mutex = threading.Lock()
+
+_stats = {}
+_stats_mutex = threading.Lock()
+
+
+@six.add_metaclass(abc.ABCMeta)
+class NamedLockBackend(object):
+    """Named lock backend.
+
+    A named lock is always bound to a DB transaction: once acquired it
+    can't be taken by another transaction until the transaction that
+    owns it is completed.
+    """
+
+    name = None
+
+    @abc.abstractmethod
+    def acquire(self, name, session):
+        """Acquires a named lock.
+
+        :param name: Lock name.
+        :param session: DB session the lock is acquired within.
+        :return: A backend specific lock handle that must be passed
+            to release().
+        """
+        raise NotImplementedError
+
+    def release(self, name, handle, session):
+        """Releases a named lock.
+
+        Backends whose locks are released automatically at the end
+        of a transaction don't need to do anything here.
+
+        :param name: Lock name.
+        :param handle: Lock handle returned by acquire().
+        :param session: DB session the lock was acquired within.
+        """
+        pass
+
+
+class TableNamedLockBackend(NamedLockBackend):
+    """Named lock backend based on the "named_locks" table.
+
+    It works with any database supporting READ COMMITTED transactions
+    but costs two writes per lock. See the NamedLock model for details.
+    """
+
+    name = 'table'
+
+    def __init__(self, table):
+        self._table = table
+
+    def acquire(self, name, session):
+        # This method has to work not through SQLAlchemy session because
+        # session may not immediately issue an SQL query to a database
+        # and instead just schedule it whereas we need to make sure to
+        # issue a query immediately.
+        session.flush()
+
+        lock_id = utils.generate_unicode_uuid()
+
+        session.execute(self._table.insert().values(id=lock_id, name=name))
+
+        session.flush()
+
+        return lock_id
+
+    def release(self, name, handle, session):
+        session.flush()
+
+        delete = self._table.delete()
+
+        session.execute(delete.where(self._table.c.id == handle))
+
+        session.flush()
+
+
+class PostgreSQLNamedLockBackend(NamedLockBackend):
+    """Named lock backend based on PostgreSQL advisory locks.
+
+    Transaction level advisory locks are released by PostgreSQL itself
+    when the transaction ends so no writes are needed at all.
+    """
+
+    name = 'postgresql'
+
+    def acquire(self, name, session):
+        session.execute(
+            sa.select([sa.func.pg_advisory_xact_lock(get_lock_key(name))])
+        )
+
+
+class MySQLNamedLockBackend(NamedLockBackend):
+    """Named lock backend based on MySQL GET_LOCK().
+
+    User level locks in MySQL belong to a connection, not to a transaction,
+    so they're released when the connection is returned to the pool, i.e.
+    right after the transaction is committed or rolled back. Requires
+    MySQL 5.7 or newer where one connection can hold several user level
+    locks at the same time.
+    """
+
+    name = 'mysql'
+
+    def __init__(self, engine):
+        if not sa.event.contains(engine, 'checkin', _release_mysql_locks):
+            sa.event.listen(engine, 'checkin', _release_mysql_locks)
+
+    def acquire(self, name, session):
+        lock_name = get_lock_name(name)
+
+        conn = session.connection()
+
+        # Negative timeout means an infinite wait, same as for other
+        # kinds of locks it is limited by MySQL deadlock detection.
+        res = conn.execute(
+            sa.select([sa.func.get_lock(lock_name, -1)])
+        ).scalar()
+
+        if res != 1:
+            raise exc.DBError(
+                "Failed to acquire named lock [name=%s, result=%s]" %
+                (name, res)
+            )
+
+        conn.info.setdefault(_SESSION_LOCKS_KEY, []).append(lock_name)
+
+
+class InProcessNamedLockBackend(NamedLockBackend):
+    """Named lock backend based on in-process semaphores.
+
+    Suitable only for a single Mistral process working with SQLite
+    which is used for testing. Locks are released when the transaction
+    of the session they were acquired within ends.
+    """
+
+    name = 'in_process'
+
+    def __init__(self):
+        self._mutex = semaphore.Semaphore()
+
+        # Lock name -> [semaphore, number of lock users].
+        self._locks = {}
+
+    def acquire(self, name, session):
+        # Same as the other backends the lock is re-entrant within one
+        # transaction, a semaphore would otherwise block on itself.
+        if name in session.info.get(_SESSION_LOCKS_KEY, []):
+            return
+
+        with self._mutex:
+            if name not in self._locks:
+                self._locks[name] = [semaphore.Semaphore(), 0]
+
+            lock = self._locks[name]
+            lock[1] += 1
+
+        lock[0].acquire()
+
+        session.info.setdefault(_SESSION_LOCKS_KEY, []).append(name)
+
+        if not sa.event.contains(session, 'after_transaction_end',
+                                 self._on_transaction_end):
+            sa.event.listen(
+                session,
+                'after_transaction_end',
+                self._on_transaction_end
+            )
+
+    def _on_transaction_end(self, session, transaction):
+        if transaction.parent is not None:
+            return
+
+        for name in session.info.pop(_SESSION_LOCKS_KEY, []):
+            self._release(name)
+
+    def _release(self, name):
+        with self._mutex:
+            lock = self._locks[name]
+
+            lock[0].release()
+            lock[1] -= 1
+
+            if lock[1] == 0:
+                del self._locks[name]
+
+    def get_locks(self):
+        return self._locks
+
+
+def _release_mysql_locks(dbapi_conn, conn_record):
+    lock_names = conn_record.info.pop(_SESSION_LOCKS_KEY, None)
+
+    # If the connection has been invalidated the locks have gone
+    # together with it.
+    if not lock_names or dbapi_conn is None:
+        return
+
+    cursor = dbapi_conn.cursor()
+
+    try:
+        for lock_name in lock_names:
+            cursor.execute('SELECT RELEASE_LOCK(%s)', (lock_name,))
+    finally:
+        cursor.close()
+
+
+def get_lock_key(name):
+    """Returns a signed 64-bit integer key for the given lock name."""
+    digest = hashlib.sha1((_LOCK_NAME_PREFIX + name).encode('utf-8'))
+
+    key = int(digest.hexdigest()[:16], 16)
+
+    return key - (1 << 64) if key >= (1 << 63) else key
+
+
+def get_lock_name(name):
+    """Returns a lock name fitting the 64 characters limit of MySQL."""
+    return _LOCK_NAME_PREFIX + hashlib.sha1(name.encode('utf-8')).hexdigest()
+
+
+def _is_galera(engine):
+    """Tells if the MySQL server is a node of a Galera cluster."""
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(
+                sa.text("SHOW VARIABLES LIKE 'wsrep_on'")
+            ).first()
+    except Exception:
+        LOG.warning(
+            "Failed to check if MySQL server is a Galera node, "
+            "assuming it is.",
+            exc_info=True
+        )
+
+        return True
+
+    return bool(row) and str(row[1]).upper() == 'ON'
+
+
+def _resolve_backend_name(backend_name, dialect_name, engine):
+    if backend_name != 'auto':
+        return backend_name
+
+    backend_name = {
+        'postgresql': PostgreSQLNamedLockBackend.name,
+        'mysql': MySQLNamedLockBackend.name,
+        'sqlite': InProcessNamedLockBackend.name
+    }.get(dialect_name, TableNamedLockBackend.name)
+
+    # User level locks are local to a node of a Galera cluster.
+    if backend_name == MySQLNamedLockBackend.name and _is_galera(engine):
+        backend_name = TableNamedLockBackend.name
+
+    return backend_name
+
+
+def get_backend(backend_name, dialect_name, engine, table):
+    """Returns a named lock backend.
+
+    :param backend_name: Configured backend name. In case of "auto"
+        the backend is selected according to the database dialect,
+        MySQL servers running Galera get the table backend. The selection
+        is made once per process.
+    :param dialect_name: Database dialect name.
+    :param engine: Database engine.
+    :param table: The "named_locks" table used by the table backend.
+    :return: Named lock backend.
+    """
+    key = (backend_name, dialect_name)
+
+    with _backends_mutex:
+        backend = _backends.get(key)
+
+    if backend:
+        return backend
+
+    resolved_key = (
+        _resolve_backend_name(backend_name, dialect_name, engine),
+        dialect_name
+    )
+
+    with _backends_mutex:
+        backend = _backends.get(resolved_key)
+
+        if not backend:
+            resolved_name = resolved_key[0]
+
+            if resolved_name == PostgreSQLNamedLockBackend.name:
+                backend = PostgreSQLNamedLockBackend()
+            elif resolved_name == MySQLNamedLockBackend.name:
+                backend = MySQLNamedLockBackend(engine)
+            elif resolved_name == InProcessNamedLockBackend.name:
+                backend = InProcessNamedLockBackend()
+            else:
+                backend = TableNamedLockBackend(table)
+
+            _backends[resolved_key] = backend
+
+        # "auto" resolves to the same backend until cleanup() is called.
+        _backends[key] = backend
+
+    return backend
+
+
+def acquire(backend, name, session):
+    """Acquires a named lock using the given backend and tracks wait time.
+
+    :return: Lock handle.
+    """
+    started = time.time()
+
+    handle = backend.acquire(name, session)
+
+    _register_wait(backend.name, time.time() - started)
+
+    return handle
+
+
+def _register_wait(backend_name, wait_time):
+    with _stats_mutex:
+        stats = _stats.get(backend_name)
+
+        if stats is None:
+            stats = _stats[backend_name] = {
+                'count': 0,
+                'total_wait_time': 0.0,
+                'max_wait_time': 0.0
+            }
+
+        stats['count'] += 1
+        stats['total_wait_time'] += wait_time
+        stats['max_wait_time'] = max(stats['max_wait_time'], wait_time)
+
+    LOG.debug(
+        "Acquired named lock [backend=%s, wait_time=%.4f]",
+        backend_name,
+        wait_time
+    )
+
+
+def get_stats():
+    """Returns named lock wait time statistics grouped by backend."""
+    with _stats_mutex:
+        return {k: dict(v) for k, v in _stats.items()}
+
+
+def cleanup():
+    """Intended to be used by tests to reset the module state."""
+    with _backends_mutex:
+        _backends.clear()
+
+    with _stats_mutex:
+        _stats.clear()
@@ -26,6 +26,10 @@ def acquire_lock(obj_id, session):
 
         tup = _locks.get(obj_id)
 
+        if tup[0] is session and tup[1].locked():
+            # The session already holds the lock.
+            return
+
     tup[1].acquire()
 
     # Make sure to update the dictionary once the lock is acquired
@@ -52,6 +52,11 @@ def end_tx():
     IMPL.end_tx()
 
 
+def add_after_commit_callback(callback):
+    """Registers a callback invoked after the current transaction commits."""
+    IMPL.add_after_commit_callback(callback)
+
+
 @contextlib.contextmanager
 def transaction(read_only=False):
     with IMPL.transaction(read_only):
@@ -232,6 +237,15 @@ def update_action_execution(id, values, insecure=False):
     return IMPL.update_action_execution(id, values, insecure)
 
 
+def update_action_executions_state(ids, cur_states, state, values=None):
+    return IMPL.update_action_executions_state(
+        ids,
+        cur_states,
+        state,
+        values=values
+    )
+
+
 def create_or_update_action_execution(id, values):
     return IMPL.create_or_update_action_execution(id, values)
 
@@ -266,6 +280,13 @@ def get_workflow_executions(limit=None, marker=None, sort_keys=None,
     )
 
 
+def get_sub_workflow_executions(root_execution_id, in_states=None):
+    return IMPL.get_sub_workflow_executions(
+        root_execution_id,
+        in_states=in_states
+    )
+
+
 def create_workflow_execution(values):
     return IMPL.create_workflow_execution(values)
 
@@ -290,6 +311,15 @@ def update_workflow_execution_state(**kwargs):
     return IMPL.update_workflow_execution_state(**kwargs)
 
 
+def update_workflow_executions_state(ids, cur_states, state, values=None):
+    return IMPL.update_workflow_executions_state(
+        ids,
+        cur_states,
+        state,
+        values=values
+    )
+
+
 # Tasks executions.
 
 def get_task_execution(id, fields=()):
@@ -354,8 +384,14 @@ def update_task_execution_state(**kwargs):
 
 # Delayed calls.
 
-def get_delayed_calls_to_start(time, batch_size=None):
-    return IMPL.get_delayed_calls_to_start(time, batch_size)
+def get_delayed_calls_to_start(time, batch_size=None, shards=None,
+                               skip_shards=None):
+    return IMPL.get_delayed_calls_to_start(
+        time,
+        batch_size,
+        shards,
+        skip_shards
+    )
 
 
 def create_delayed_call(values):
@@ -400,6 +436,14 @@ def update_scheduled_job(id, values, query_filter=None):
     return IMPL.update_scheduled_job(id, values, query_filter)
 
 
+def capture_scheduled_jobs(ids, captured_at):
+    return IMPL.capture_scheduled_jobs(ids, captured_at)
+
+
+def capture_scheduled_jobs_to_start(time, captured_at, batch_size=None):
+    return IMPL.capture_scheduled_jobs_to_start(time, captured_at, batch_size)
+
+
 def get_scheduled_job(id):
     return IMPL.get_scheduled_job(id)
 
@@ -19,7 +19,7 @@ import datetime
 import sys
 import threading
 
-
+import cachetools
 from oslo_config import cfg
 from oslo_db import exception as db_exc
 from oslo_db import sqlalchemy as oslo_sqlalchemy
@@ -27,10 +27,13 @@ from oslo_db.sqlalchemy import utils as db_utils
 from oslo_log import log as logging
 from oslo_utils import uuidutils  # noqa
 import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.ext import mutable
 
 from mistral import context
 from mistral.db.sqlalchemy import base as b
 from mistral.db.sqlalchemy import model_base as mb
+from mistral.db.sqlalchemy import named_lock as nl
 from mistral.db.sqlalchemy import sqlite_lock
 from mistral.db import utils as m_dbutils
 from mistral.db.v2.sqlalchemy import filters as db_filters
@@ -48,6 +51,14 @@ LOG = logging.getLogger(__name__)
 _SCHEMA_LOCK = threading.RLock()
 _initialized = False
 
+# Workflow execution id -> (data version, {column name: decoded value}).
+# The values are shared between the transactions that lock the same
+# unchanged workflow execution so they must never be modified in place
+# without assigning them back to the attribute. Assigning a value or
+# changing a top level key evicts the entry.
+_WF_EX_DATA_CACHE = None
+_WF_EX_DATA_CACHE_LOCK = threading.RLock()
+
 
 def get_backend():
     """Consumed by openstack common code.
@@ -106,6 +117,10 @@ def end_tx():
     b.end_tx()
 
 
+def add_after_commit_callback(callback):
+    b.add_after_commit_callback(callback)
+
+
 @contextlib.contextmanager
 def transaction(read_only=False):
     start_tx()
@@ -140,7 +155,79 @@ def acquire_lock(model, id, session=None):
 
 def _lock_entity(model, id):
     # Get entity by ID in "FOR UPDATE" mode and expect exactly one object.
-    return _secure_query(model).with_for_update().filter(model.id == id).one()
+    query = _secure_query(model).with_for_update().filter(model.id == id)
+
+    if (model is models.WorkflowExecution and
+            CONF.engine.execution_data_cache_size):
+        return _lock_workflow_execution(query)
+
+    return query.one()
+
+
+def _get_wf_ex_data_cache():
+    global _WF_EX_DATA_CACHE
+
+    with _WF_EX_DATA_CACHE_LOCK:
+        if _WF_EX_DATA_CACHE is None:
+            _WF_EX_DATA_CACHE = cachetools.LRUCache(
+                maxsize=CONF.engine.execution_data_cache_size
+            )
+
+        return _WF_EX_DATA_CACHE
+
+
+def _lock_workflow_execution(query):
+    """Locks a workflow execution reusing its cached data columns.
+
+    The locking SELECT doesn't read the data columns. If the data version
+    it reads is the one cached by an earlier transaction the cached values
+    are used, otherwise the columns are loaded and cached again.
+    """
+    columns = models.WorkflowExecution.DATA_COLUMNS
+
+    wf_ex = query.options(*[sa.orm.defer(c) for c in columns]).one()
+
+    cache = _get_wf_ex_data_cache()
+
+    with _WF_EX_DATA_CACHE_LOCK:
+        cached = cache.get(wf_ex.id)
+
+    if wf_ex.data_version and cached and cached[0] == wf_ex.data_version:
+        for name, value in cached[1].items():
+            sa.orm.attributes.set_committed_value(wf_ex, name, value)
+
+            # Do the same as a regular load so that changing the value
+            # marks only this object as modified.
+            if isinstance(value, mutable.Mutable):
+                value._parents.clear()
+                value._parents[wf_ex] = name
+
+        return wf_ex
+
+    query.session.refresh(wf_ex, attribute_names=columns)
+
+    if wf_ex.data_version:
+        values = {name: getattr(wf_ex, name) for name in columns}
+
+        with _WF_EX_DATA_CACHE_LOCK:
+            cache[wf_ex.id] = (wf_ex.data_version, values)
+
+    return wf_ex
+
+
+def _evict_wf_ex_data(target, *args):
+    if _WF_EX_DATA_CACHE is None:
+        return
+
+    with _WF_EX_DATA_CACHE_LOCK:
+        _WF_EX_DATA_CACHE.pop(target.id, None)
+
+
+for _name in models.WorkflowExecution.DATA_COLUMNS:
+    _attr = getattr(models.WorkflowExecution, _name)
+
+    event.listen(_attr, 'set', _evict_wf_ex_data)
+    event.listen(_attr, 'modified', _evict_wf_ex_data)
 
 
 @b.session_aware()
@@ -192,6 +279,96 @@ def update_on_match(id, specimen, values, attempts, session=None):
     return model
 
 
+@b.session_aware()
+def _update_executions_state(model, ids, cur_states, state, values,
+                             session=None):
+    if not ids:
+        return []
+
+    # Select the matching rows first to know which of them get updated.
+    # The locks they get make the following UPDATE see the same rows.
+    # The ids come from the engine so access to them is not checked.
+    ids = [
+        row[0] for row in b.model_query(model, (model.id,)).filter(
+            model.id.in_(ids),
+            model.state.in_(cur_states)
+        ).with_for_update().all()
+    ]
+
+    if not ids:
+        return []
+
+    values = dict(values or {}, state=state)
+
+    b.model_query(model).filter(model.id.in_(ids)).update(
+        values,
+        synchronize_session=False
+    )
+
+    # Objects of these executions already loaded into the session need
+    # to be reloaded to have the new values.
+    for id in ids:
+        obj = session.identity_map.get(sa.orm.util.identity_key(model, id))
+
+        if obj is not None:
+            session.expire(obj, list(values.keys()) + ['updated_at'])
+
+    return ids
+
+
+@b.session_aware()
+def _update_state_on_match(model, id, cur_state, state, session=None):
+    """Changes the state of a persistent object if it has the given state.
+
+    Unlike update_on_match() this function doesn't flush the session. The
+    state is changed with a Core UPDATE statement and then it's set to
+    the object loaded into the session as its committed value, so that
+    other not flushed changes of this object and of any other objects are
+    kept and flushed later as usual. The only exception is a not flushed
+    change of the state of this object itself, the object is flushed then
+    so that the statement sees the state the caller sees.
+
+    :param model: Model class.
+    :param id: ID of the persistent object.
+    :param cur_state: Current state of the object.
+    :param state: New state.
+    :return: Persistent object attached to the session or None if the
+        object doesn't have the given current state anymore.
+    """
+    table = model.__table__
+    updated_at = utils.utc_now_sec()
+
+    obj = session.identity_map.get(sa.orm.util.identity_key(model, id))
+
+    if obj is not None and sa.inspect(obj).attrs.state.history.has_changes():
+        session.flush([obj])
+
+    result = session.execute(
+        table.update().where(
+            sa.and_(table.c.id == id, table.c.state == cur_state)
+        ).values(state=state, updated_at=updated_at)
+    )
+
+    if result.rowcount == 0:
+        LOG.info(
+            "Can't change state of persistent object "
+            "because it has already been changed. [model_class=%s, id=%s, "
+            "cur_state=%s, state=%s]",
+            model, id, cur_state, state
+        )
+
+        return None
+
+    if obj is None:
+        with session.no_autoflush:
+            return _get_db_object_by_id(model, id, insecure=True)
+
+    sa.orm.attributes.set_committed_value(obj, 'state', state)
+    sa.orm.attributes.set_committed_value(obj, 'updated_at', updated_at)
+
+    return obj
+
+
 def _secure_query(model, *columns):
     query = b.model_query(model, columns)
 
@@ -253,7 +430,9 @@ def _delete_all(model, **kwargs):
     # NOTE(kong): Because we use 'in_' operator in _secure_query(), delete()
     # method will raise error with default parameter. Please refer to
     # http://docs.sqlalchemy.org/en/rel_1_0/orm/query.html#sqlalchemy.orm.query.Query.delete
-    _secure_query(model).filter_by(**kwargs).delete(synchronize_session=False)
+    return _secure_query(model).filter_by(**kwargs).delete(
+        synchronize_session=False
+    )
 
 
 def _get_collection(model, insecure=False, limit=None, marker=None,
@@ -763,6 +942,25 @@ def update_action_execution(id, values, insecure=False, session=None):
     return a_ex
 
 
+def update_action_executions_state(ids, cur_states, state, values=None):
+    """Changes the state of many action executions with one UPDATE.
+
+    :param ids: Action execution ids.
+    :param cur_states: Only the action executions being in one of these
+        states are updated.
+    :param state: New state.
+    :param values: Other values to set along with the state.
+    :return: Ids of the updated action executions.
+    """
+    return _update_executions_state(
+        models.ActionExecution,
+        ids,
+        cur_states,
+        state,
+        values
+    )
+
+
 @b.session_aware()
 def create_or_update_action_execution(id, values, session=None):
     if not _get_db_object_by_id(models.ActionExecution, id):
@@ -822,6 +1020,34 @@ def get_workflow_executions(session=None, **kwargs):
     return _get_collection(models.WorkflowExecution, **kwargs)
 
 
+@b.session_aware()
+def get_sub_workflow_executions(root_execution_id, in_states=None,
+                                session=None):
+    """Gets all sub-workflow executions of the given root execution.
+
+    :param root_execution_id: Root workflow execution id.
+    :param in_states: If given, only sub-workflow executions being in one
+        of these states are returned.
+    :return: List of tuples (sub-workflow execution, id of its parent
+        workflow execution).
+    """
+    query = _secure_query(
+        models.WorkflowExecution,
+        models.WorkflowExecution,
+        models.TaskExecution.workflow_execution_id
+    ).join(
+        models.TaskExecution,
+        models.WorkflowExecution.task_execution_id == models.TaskExecution.id
+    ).filter(
+        models.WorkflowExecution.root_execution_id == root_execution_id
+    )
+
+    if in_states:
+        query = query.filter(models.WorkflowExecution.state.in_(in_states))
+
+    return query.all()
+
+
 @b.session_aware()
 def create_workflow_execution(values, session=None):
     wf_ex = models.WorkflowExecution()
@@ -880,9 +1106,31 @@ def delete_workflow_executions(session=None, **kwargs):
 
 
 def update_workflow_execution_state(id, cur_state, state):
-    specimen = models.WorkflowExecution(id=id, state=cur_state)
+    return _update_state_on_match(
+        models.WorkflowExecution,
+        id,
+        cur_state,
+        state
+    )
+
 
-    return update_on_match(id, specimen, values={'state': state}, attempts=1)
+def update_workflow_executions_state(ids, cur_states, state, values=None):
+    """Changes the state of many workflow executions with one UPDATE.
+
+    :param ids: Workflow execution ids.
+    :param cur_states: Only the workflow executions being in one of these
+        states are updated.
+    :param state: New state.
+    :param values: Other values to set along with the state.
+    :return: Ids of the updated workflow executions.
+    """
+    return _update_executions_state(
+        models.WorkflowExecution,
+        ids,
+        cur_states,
+        state,
+        values
+    )
 
 
 # Tasks executions.
@@ -1038,9 +1286,12 @@ def delete_task_executions(session=None, **kwargs):
 
 
 def update_task_execution_state(id, cur_state, state):
-    specimen = models.TaskExecution(id=id, state=cur_state)
-
-    return update_on_match(id, specimen, values={'state': state}, attempts=1)
+    return _update_state_on_match(
+        models.TaskExecution,
+        id,
+        cur_state,
+        state
+    )
 
 
 # Delayed calls.
@@ -1074,9 +1325,35 @@ def delete_delayed_call(id, session=None):
 
 
 @b.session_aware()
-def get_delayed_calls_to_start(time, batch_size=None, session=None):
+def get_delayed_calls_to_start(time, batch_size=None, shards=None,
+                               skip_shards=None, session=None):
+    """Selects delayed calls that can be started.
+
+    :param time: Calls with execution time earlier than this are selected.
+    :param batch_size: The max number of calls to select.
+    :param shards: If not None, only calls of these shards and calls
+        without a shard are selected.
+    :param skip_shards: If not None, calls of these shards and calls
+        without a shard are not selected.
+    :param session: Session.
+    :return: A list of delayed calls ordered by execution time.
+    """
     query = b.model_query(models.DelayedCall)
 
+    shard_col = models.DelayedCall.shard
+
+    if shards is not None:
+        query = query.filter(
+            sa.or_(shard_col.in_(shards), shard_col == sa.null())
+            if shards else shard_col == sa.null()
+        )
+
+    if skip_shards is not None:
+        query = query.filter(
+            shard_col.notin_(skip_shards)
+            if skip_shards else shard_col != sa.null()
+        )
+
     query = query.filter(models.DelayedCall.execution_time < time)
     query = query.filter_by(processing=False)
     query = query.order_by(models.DelayedCall.execution_time)
@@ -1131,7 +1408,13 @@ def get_delayed_calls(session=None, **kwargs):
 
 @b.session_aware()
 def delete_delayed_calls(session=None, **kwargs):
-    return _delete_all(models.DelayedCall, **kwargs)
+    query = db_filters.apply_filters(
+        _secure_query(models.DelayedCall),
+        models.DelayedCall,
+        **kwargs
+    )
+
+    return query.delete(synchronize_session=False)
 
 
 @b.session_aware()
@@ -1150,6 +1433,19 @@ def create_scheduled_job(values, session=None):
     return job
 
 
+def _get_capturable_scheduled_jobs_filter(captured_at_col):
+    # Filter by captured time accounting for a configured captured job timeout.
+    min_captured_at = (
+        datetime.datetime.now() -
+        datetime.timedelta(seconds=CONF.scheduler.captured_job_timeout)
+    )
+
+    return sa.or_(
+        captured_at_col == sa.null(),
+        captured_at_col <= min_captured_at
+    )
+
+
 @b.session_aware()
 def get_scheduled_jobs_to_start(time, batch_size=None, session=None):
     query = b.model_query(models.ScheduledJob)
@@ -1163,17 +1459,8 @@ def get_scheduled_jobs_to_start(time, batch_size=None, session=None):
         time - datetime.timedelta(seconds=CONF.scheduler.pickup_job_after)
     )
 
-    # Filter by captured time accounting for a configured captured job timeout.
-    min_captured_at = (
-        datetime.datetime.now() -
-        datetime.timedelta(seconds=CONF.scheduler.captured_job_timeout)
-    )
-
     query = query.filter(
-        sa.or_(
-            captured_at_col == sa.null(),
-            captured_at_col <= min_captured_at
-        )
+        _get_capturable_scheduled_jobs_filter(captured_at_col)
     )
 
     query = query.order_by(execute_at_col)
@@ -1182,6 +1469,183 @@ def get_scheduled_jobs_to_start(time, batch_size=None, session=None):
     return query.all()
 
 
+def _supports_skip_locked(dialect):
+    version = dialect.server_version_info or ()
+
+    if dialect.name == 'postgresql':
+        return version >= (9, 5)
+
+    if dialect.name == 'mysql':
+        return not getattr(dialect, '_is_mariadb', False) and \
+            version >= (8, 0, 1)
+
+    return False
+
+
+# A number of scheduled jobs captured with one statement in case if the
+# database doesn't support "SKIP LOCKED". It limits both the size of
+# the "IN" clause and the number of rows that a competing scheduler may
+# have to wait for.
+_CAPTURE_CHUNK_SIZE = 50
+
+
+@b.session_aware()
+def capture_scheduled_jobs(ids, captured_at, session=None):
+    """Marks scheduled jobs as captured if they're still capturable.
+
+    Unlike update_scheduled_job() that captures one job per statement
+    this method captures the whole batch of jobs in one statement on
+    PostgreSQL (UPDATE .. RETURNING), in two statements where
+    "SELECT .. FOR UPDATE SKIP LOCKED" is supported and in chunks of
+    two statements otherwise. Jobs that turn out to be modified
+    concurrently are skipped.
+
+    :param ids: IDs of scheduled jobs to capture.
+    :param captured_at: Capture time.
+    :param session: Session.
+    :return: A list of IDs of the jobs that have been captured. Jobs
+        that have already been captured by other schedulers or locked
+        by them at the moment are not included.
+    """
+    if not ids:
+        return []
+
+    table = models.ScheduledJob.__table__
+    dialect = session.bind.dialect
+    skip_locked = _supports_skip_locked(dialect)
+
+    capturable = _get_capturable_scheduled_jobs_filter(table.c.captured_at)
+
+    if dialect.name == 'postgresql' and skip_locked:
+        locked = sa.select([table.c.id]).where(
+            sa.and_(table.c.id.in_(ids), capturable)
+        ).with_for_update(skip_locked=True)
+
+        update = table.update().where(
+            table.c.id.in_(locked)
+        ).values(
+            captured_at=captured_at
+        ).returning(table.c.id)
+
+        return [row[0] for row in session.execute(update)]
+
+    chunk_size = len(ids) if skip_locked else _CAPTURE_CHUNK_SIZE
+
+    result = []
+
+    for i in range(0, len(ids), chunk_size):
+        chunk = ids[i:i + chunk_size]
+
+        # Lock the rows that are still capturable so that the following
+        # update can't conflict with other schedulers.
+        locked = sa.select([table.c.id]).where(
+            sa.and_(table.c.id.in_(chunk), capturable)
+        ).with_for_update(skip_locked=skip_locked)
+
+        locked_ids = [row[0] for row in session.execute(locked)]
+
+        if not locked_ids:
+            continue
+
+        update = table.update().where(
+            sa.and_(table.c.id.in_(locked_ids), capturable)
+        ).values(captured_at=captured_at)
+
+        updated_cnt = session.execute(update).rowcount
+
+        if updated_cnt != len(locked_ids):
+            # It may happen only if the database ignores "FOR UPDATE".
+            # Keep the jobs that have actually been captured by this
+            # update and skip the rest.
+            LOG.debug(
+                "Some of the locked scheduled jobs were concurrently"
+                " modified [locked=%s, updated=%s]",
+                len(locked_ids),
+                updated_cnt
+            )
+
+            captured = sa.select([table.c.id]).where(
+                sa.and_(
+                    table.c.id.in_(locked_ids),
+                    table.c.captured_at == captured_at
+                )
+            )
+
+            locked_ids = [row[0] for row in session.execute(captured)]
+
+        result.extend(locked_ids)
+
+    return result
+
+
+def _get_capture_scheduled_jobs_to_start_statement(table, time, captured_at,
+                                                   batch_size=None):
+    execute_at_col = table.c.execute_at
+
+    candidates = sa.select([table.c.id]).where(
+        sa.and_(
+            execute_at_col < time - datetime.timedelta(
+                seconds=CONF.scheduler.pickup_job_after
+            ),
+            _get_capturable_scheduled_jobs_filter(table.c.captured_at)
+        )
+    ).order_by(
+        execute_at_col
+    ).limit(
+        batch_size
+    ).with_for_update(
+        skip_locked=True
+    )
+
+    return table.update().where(
+        table.c.id.in_(candidates)
+    ).values(
+        captured_at=captured_at
+    ).returning(*table.c)
+
+
+@b.session_aware()
+def capture_scheduled_jobs_to_start(time, captured_at, batch_size=None,
+                                    session=None):
+    """Selects scheduled jobs that are due and captures them.
+
+    On PostgreSQL jobs are selected and captured with one statement
+    (UPDATE .. WHERE id IN (SELECT .. FOR UPDATE SKIP LOCKED) RETURNING)
+    so that schedulers never contend for the same rows. Otherwise the
+    jobs are selected first and then captured with
+    capture_scheduled_jobs().
+
+    :param time: Current time.
+    :param captured_at: Capture time.
+    :param batch_size: The max number of jobs to capture.
+    :param session: Session.
+    :return: A list of captured jobs.
+    """
+    table = models.ScheduledJob.__table__
+    dialect = session.bind.dialect
+
+    if dialect.name == 'postgresql' and _supports_skip_locked(dialect):
+        update = _get_capture_scheduled_jobs_to_start_statement(
+            table,
+            time,
+            captured_at,
+            batch_size
+        )
+
+        return [
+            models.ScheduledJob(**dict(row))
+            for row in session.execute(update)
+        ]
+
+    candidates = get_scheduled_jobs_to_start(time, batch_size)
+
+    captured_ids = set(
+        capture_scheduled_jobs([job.id for job in candidates], captured_at)
+    )
+
+    return [job for job in candidates if job.id in captured_ids]
+
+
 @b.session_aware()
 def update_scheduled_job(id, values, query_filter=None, session=None):
     if query_filter:
@@ -1812,6 +2276,25 @@ def delete_named_lock(lock_id, session=None):
     session.flush()
 
 
+def _get_named_lock_backend():
+    return nl.get_backend(
+        CONF.engine.named_lock_backend,
+        b.get_dialect_name(),
+        b.get_engine(),
+        models.NamedLock.__table__
+    )
+
+
+@b.session_aware()
+def _acquire_named_lock(backend, name, session=None):
+    return nl.acquire(backend, name, session)
+
+
+@b.session_aware()
+def _release_named_lock(backend, name, handle, session=None):
+    backend.release(name, handle, session)
+
+
 @contextlib.contextmanager
 def named_lock(name):
     # NOTE(rakhmerov): We can't use the well-known try-finally pattern here
@@ -1820,8 +2303,10 @@ def named_lock(name):
     # All we can do here is to let the exception bubble up so that the
     # transaction management code could rollback the transaction.
 
-    lock_id = create_named_lock(name)
+    backend = _get_named_lock_backend()
+
+    handle = _acquire_named_lock(backend, name)
 
     yield
 
-    delete_named_lock(lock_id)
+    _release_named_lock(backend, name, handle)
@@ -237,6 +237,19 @@ class WorkflowExecution(Execution):
     #   * This structure does not contain workflow input.
     context = sa.Column(st.JsonLongDictType())
 
+    # Token that changes every time one of the columns listed in
+    # DATA_COLUMNS changes. It allows to keep their decoded values
+    # between transactions and reload them only if they are stale.
+    data_version = sa.Column(
+        sa.String(36),
+        nullable=True,
+        default=utils.generate_unicode_uuid
+    )
+
+    # Columns that are written mostly when the workflow starts but read
+    # every time the workflow execution is locked.
+    DATA_COLUMNS = ('spec', 'input', 'params', 'context')
+
 
 class TaskExecution(Execution):
     """Contains task runtime information."""
@@ -261,6 +274,11 @@ class TaskExecution(Execution):
     # significantly.
     processed = sa.Column(sa.BOOLEAN, default=False)
 
+    # Number of actions that a "with-items" task can still start. It
+    # changes every time an action starts or completes so it's kept in
+    # a separate column not to rewrite the whole runtime context.
+    capacity = sa.Column(sa.Integer, nullable=True)
+
     # Data Flow properties.
     in_context = sa.Column(st.JsonLongDictType())
     published = sa.Column(st.JsonLongDictType())
@@ -291,6 +309,19 @@ for cls in utils.iter_subclasses(Execution):
     )
 
 
+def _update_data_version(mapper, connection, target):
+    # A random token rather than a counter so that a version written by
+    # a rolled back transaction is never taken for a committed one.
+    attrs = sa.inspect(target).attrs
+
+    if any(attrs[name].history.has_changes()
+           for name in WorkflowExecution.DATA_COLUMNS):
+        target.data_version = utils.generate_unicode_uuid()
+
+
+event.listen(WorkflowExecution, 'before_update', _update_data_version)
+
+
 # Many-to-one for 'ActionExecution' and 'TaskExecution'.
 
 ActionExecution.task_execution_id = sa.Column(
@@ -386,7 +417,14 @@ class DelayedCall(mb.MistralModelBase):
     key = sa.Column(sa.String(250), nullable=True)
     auth_context = sa.Column(st.JsonDictType())
     execution_time = sa.Column(sa.DateTime, nullable=False)
+    # The time the call is due at. It's earlier than the execution time
+    # for calls processed from memory whose execution time is shifted so
+    # that other schedulers pick them up only if the process crashed.
+    due_time = sa.Column(sa.DateTime, nullable=True)
     processing = sa.Column(sa.Boolean, default=False, nullable=False)
+    # Shard of the call. Every scheduler polls the calls of its own shards
+    # and calls of other shards only if they're overdue.
+    shard = sa.Column(sa.Integer, nullable=True)
 
 
 sa.Index(
@@ -394,6 +432,11 @@ sa.Index(
     DelayedCall.execution_time
 )
 
+sa.Index(
+    '%s_key' % DelayedCall.__tablename__,
+    DelayedCall.key
+)
+
 
 class ScheduledJob(mb.MistralModelBase):
     """Contains info about scheduled jobs."""
@@ -421,12 +464,20 @@ class ScheduledJob(mb.MistralModelBase):
     execute_at = sa.Column(sa.DateTime, nullable=False)
     captured_at = sa.Column(sa.DateTime, nullable=True)
 
+    # Key used for squashing similar jobs. Optional.
+    key = sa.Column(sa.String(250), nullable=True)
+
 
 sa.Index(
     '%s_execution_time' % ScheduledJob.__tablename__,
     ScheduledJob.execute_at
 )
 
+sa.Index(
+    '%s_key' % ScheduledJob.__tablename__,
+    ScheduledJob.key
+)
+
 
 class Environment(mb.MistralSecureModelBase):
     """Contains environment variables for workflow execution."""
@@ -13,15 +13,19 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+from mistral_lib import actions as ml_actions
 from oslo_log import log as logging
 from osprofiler import profiler
 import traceback as tb
 
+from mistral.db.v2 import api as db_api
 from mistral.db.v2.sqlalchemy import models
 from mistral.engine import actions
 from mistral.engine import task_handler
 from mistral import exceptions as exc
 from mistral.lang import parser as spec_parser
+from mistral.utils import wf_trace
+from mistral.workflow import states
 
 
 LOG = logging.getLogger(__name__)
@@ -54,6 +58,47 @@ def on_action_complete(action_ex, result):
         task_handler.schedule_on_action_complete(action_ex)
 
 
+@profiler.trace('action-handler-fail-running-actions', hide_args=True)
+def fail_running_actions(action_exs, msg):
+    """Fails the given action executions if they are still running.
+
+    The states of all the action executions are changed with one UPDATE
+    statement. The ones that have completed concurrently are skipped.
+
+    :param action_exs: Action executions.
+    :param msg: Error message.
+    """
+    failed_ids = set(
+        db_api.update_action_executions_state(
+            [a_ex.id for a_ex in action_exs],
+            cur_states=[states.RUNNING],
+            state=states.ERROR,
+            values={
+                'output': ml_actions.Result(error=msg).to_dict(),
+                'accepted': True
+            }
+        )
+    )
+
+    for action_ex in action_exs:
+        if action_ex.id not in failed_ids:
+            continue
+
+        wf_trace.info(
+            None,
+            "Action '%s' (%s)(task_ex_id=%s) [%s -> %s, error = %s]" %
+            (action_ex.name,
+             action_ex.id,
+             action_ex.task_execution_id,
+             states.RUNNING,
+             states.ERROR,
+             msg)
+        )
+
+        if action_ex.task_execution_id:
+            task_handler.schedule_on_action_complete(action_ex)
+
+
 @profiler.trace('action-handler-on-action-update', hide_args=True)
 def on_action_update(action_ex, state):
     task_ex = action_ex.task_execution
@@ -13,6 +13,7 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import collections
 import eventlet
 import functools
 
@@ -55,21 +56,31 @@ def _get_queue():
 def _process_queue(queue):
     executor = exe.get_executor(cfg.CONF.executor.type)
 
+    # Actions to run grouped by their targets so that every group can
+    # be sent to executors in batches.
+    run_actions = collections.OrderedDict()
+
     for operation, args in queue:
         if operation == _RUN_ACTION:
             action_ex, action_def, target, execution_context, timeout = args
 
-            executor.run_action(
-                action_ex.id,
-                action_def.action_class,
-                action_def.attributes or {},
-                action_ex.input,
-                action_ex.runtime_context.get('safe_rerun', False),
-                execution_context,
-                target=target,
-                timeout=timeout
-            )
+            run_actions.setdefault(target, []).append({
+                'action_ex_id': action_ex.id,
+                'action_cls_str': action_def.action_class,
+                'action_cls_attrs': action_def.attributes or {},
+                'params': action_ex.input,
+                'safe_rerun': action_ex.runtime_context.get(
+                    'safe_rerun',
+                    False
+                ),
+                'execution_context': execution_context,
+                'timeout': timeout
+            })
         elif operation == _ON_ACTION_COMPLETE:
+            # Actions queued before the completion must be sent first
+            # to keep the order of operations.
+            _flush_run_actions(executor, run_actions)
+
             action_ex_id, result, wf_action = args
 
             rpc.get_engine_client().on_action_complete(
@@ -78,6 +89,34 @@ def _process_queue(queue):
                 wf_action
             )
 
+    _flush_run_actions(executor, run_actions)
+
+
+def _flush_run_actions(executor, run_actions):
+    for target, actions in run_actions.items():
+        _run_actions(executor, actions, target)
+
+    run_actions.clear()
+
+
+def _run_actions(executor, actions, target):
+    if len(actions) > 1 and cfg.CONF.executor.run_actions_batch_size > 1:
+        executor.run_actions(actions, target=target)
+
+        return
+
+    for action in actions:
+        executor.run_action(
+            action['action_ex_id'],
+            action['action_cls_str'],
+            action['action_cls_attrs'],
+            action['params'],
+            action['safe_rerun'],
+            action['execution_context'],
+            target=target,
+            timeout=action['timeout']
+        )
+
 
 def process(func):
     """Decorator that processes (runs) all actions in the action queue.
@@ -78,6 +78,17 @@ class Engine(object):
         """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def on_actions_complete(self, completions):
+        """Accepts results of a batch of actions and continues workflows.
+
+        :param completions: A list of dicts, each of them holding
+            "action_ex_id" and "result" (an instance of
+            mistral.workflow.base.Result) of one completed action and,
+            optionally, "wf_action" flag.
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def pause_workflow(self, wf_ex_id):
         """Pauses workflow.
@@ -15,6 +15,8 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import collections
+
 from oslo_config import cfg
 from oslo_log import log as logging
 from osprofiler import profiler
@@ -145,6 +147,99 @@ class DefaultEngine(base.Engine):
 
             return action_ex.get_clone()
 
+    @profiler.trace('engine-on-actions-complete', hide_args=True)
+    def on_actions_complete(self, completions):
+        for wf_ex_id, group in self._group_completions(completions):
+            try:
+                self._on_actions_complete(wf_ex_id, group)
+            except Exception:
+                LOG.exception(
+                    "Failed to process a batch of action results, "
+                    "processing them one by one [wf_ex_id=%s]",
+                    wf_ex_id
+                )
+
+                for c in group:
+                    try:
+                        self.on_action_complete(
+                            c['action_ex_id'],
+                            c['result'],
+                            c.get('wf_action', False)
+                        )
+                    except Exception:
+                        LOG.exception(
+                            "Failed to process action result "
+                            "[action_ex_id=%s]",
+                            c['action_ex_id']
+                        )
+
+    @staticmethod
+    def _group_completions(completions):
+        """Groups action completions by workflow executions.
+
+        :return: A list of tuples (workflow execution id, completions).
+        """
+        groups = collections.OrderedDict()
+
+        action_ex_ids = [
+            c['action_ex_id'] for c in completions if not c.get('wf_action')
+        ]
+        wf_action_ex_ids = [
+            c['action_ex_id'] for c in completions if c.get('wf_action')
+        ]
+
+        # Only ids are needed here, loading whole executions with their
+        # input, output and context would be a waste since the handlers
+        # load them again anyway.
+        with db_api.transaction():
+            task_ex_ids = {}
+
+            if action_ex_ids:
+                for a_ex in db_api.get_action_executions(
+                        id={'in': action_ex_ids},
+                        fields=('id', 'task_execution_id')):
+                    task_ex_ids[a_ex.id] = a_ex.task_execution_id
+
+            if wf_action_ex_ids:
+                for wf_ex in db_api.get_workflow_executions(
+                        id={'in': wf_action_ex_ids},
+                        fields=('id', 'task_execution_id')):
+                    task_ex_ids[wf_ex.id] = wf_ex.task_execution_id
+
+            wf_ex_ids = {}
+
+            if any(task_ex_ids.values()):
+                for t_ex in db_api.get_task_executions(
+                        id={'in': [i for i in task_ex_ids.values() if i]},
+                        fields=('id', 'workflow_execution_id')):
+                    wf_ex_ids[t_ex.id] = t_ex.workflow_execution_id
+
+        for c in completions:
+            wf_ex_id = wf_ex_ids.get(task_ex_ids.get(c['action_ex_id']))
+
+            groups.setdefault(wf_ex_id, []).append(c)
+
+        return list(groups.items())
+
+    @db_utils.retry_on_db_error
+    @action_queue.process
+    def _on_actions_complete(self, wf_ex_id, completions):
+        with db_api.transaction():
+            # Lock the workflow execution once for the whole batch rather
+            # than letting every action result fight for it separately.
+            if wf_ex_id:
+                db_api.acquire_lock(db_models.WorkflowExecution, wf_ex_id)
+
+            for c in completions:
+                if c.get('wf_action'):
+                    action_ex = db_api.get_workflow_execution(
+                        c['action_ex_id']
+                    )
+                else:
+                    action_ex = db_api.get_action_execution(c['action_ex_id'])
+
+                action_handler.on_action_complete(action_ex, c['result'])
+
     @db_utils.retry_on_db_error
     @action_queue.process
     @profiler.trace('engine-on-action-update', hide_args=True)
@@ -12,6 +12,7 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+from mistral_lib.actions import types as ml_actions
 from oslo_log import log as logging
 
 from mistral import config as cfg
@@ -19,6 +20,7 @@ from mistral.db.v2 import api as db_api
 from mistral.engine import default_engine
 from mistral.rpc import base as rpc
 from mistral.service import base as service_base
+from mistral.service import coordination
 from mistral.services import action_execution_checker
 from mistral.services import expiration_policy
 from mistral.services import scheduler
@@ -62,6 +64,18 @@ class EngineServer(service_base.MistralService):
         self._rpc_server = rpc.get_rpc_server_driver()(cfg.CONF.engine)
         self._rpc_server.register_endpoint(self)
 
+        if cfg.CONF.engine.execution_affinity:
+            # Engine clients send calls related to workflow executions
+            # owned by this engine to its RPC server. The server is named
+            # after the host so that the engine restarted on the same host
+            # gets calls sent before the restart.
+            self._rpc_server.server_id = utils.get_host_identifier()
+
+            coordination.advertise_rpc_server(
+                self.cluster_member.group_type,
+                self._rpc_server.server_id
+            )
+
         self._rpc_server.run(executor=cfg.CONF.oslo_rpc_executor)
 
         self._notify_started('Engine server started.')
@@ -156,6 +170,26 @@ class EngineServer(service_base.MistralService):
 
         return self.engine.on_action_complete(action_ex_id, result, wf_action)
 
+    def on_actions_complete(self, rpc_ctx, completions):
+        """Receives RPC calls to communicate results of many actions.
+
+        :param rpc_ctx: RPC request context.
+        :param completions: A list of dicts holding "action_ex_id" and
+            "result" of every completed action. Results are passed in
+            the serialized form.
+        """
+        LOG.info(
+            "Received RPC request 'on_actions_complete'[action_ex_ids=%s]",
+            [c['action_ex_id'] for c in completions]
+        )
+
+        serializer = ml_actions.ResultSerializer()
+
+        for c in completions:
+            c['result'] = serializer.deserialize_from_dict(c['result'])
+
+        self.engine.on_actions_complete(completions)
+
     def on_action_update(self, rpc_ctx, action_ex_id, state, wf_action):
         """Receives RPC calls to communicate action execution state to engine.
 
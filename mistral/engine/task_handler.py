@@ -78,7 +78,14 @@ def run_task(wf_cmd):
 
         return
 
-    if task.is_waiting() and (task.is_created() or task.is_state_changed()):
+    if not task.is_waiting():
+        return
+
+    if task.is_join_ready():
+        # The last required inbound task has arrived, the 'join' task
+        # needs to be refreshed right away.
+        _schedule_refresh_task_state(task.task_ex)
+    elif task.is_created() or task.is_state_changed():
         _schedule_refresh_task_state(task.task_ex, 1)
 
 
@@ -340,11 +347,19 @@ def _refresh_task_state(task_ex_id):
             task_ex.workflow_execution_id
         )
 
-        wf_ctrl = wf_base.get_controller(wf_ex, wf_spec)
+        task_spec = wf_spec.get_tasks()[task_ex.name]
 
-        log_state = wf_ctrl.get_logical_task_state(
-            task_ex
-        )
+        if tasks.is_join_ready(wf_spec, task_spec, task_ex):
+            # All required inbound tasks have already triggered the 'join'
+            # task so there's no need to evaluate their states.
+            log_state = wf_base.TaskLogicalState(
+                states.RUNNING,
+                triggered_by=tasks.get_join_triggered_by(task_ex)
+            )
+        else:
+            wf_ctrl = wf_base.get_controller(wf_ex, wf_spec)
+
+            log_state = wf_ctrl.get_logical_task_state(task_ex)
 
         state = log_state.state
         state_info = log_state.state_info
@@ -357,15 +372,15 @@ def _refresh_task_state(task_ex_id):
         elif state == states.ERROR:
             complete_task(task_ex, state, state_info)
         elif state == states.WAITING:
+            # A 'join' task is refreshed right away when the last required
+            # inbound task arrives (see run_task()) so this periodic check
+            # is needed only to find out that the 'join' task can never run
+            # because some of the inbound tasks took other routes.
             # Let's assume that a task takes 0.01 sec in average to complete
             # and based on this assumption calculate a time of the next check.
-            # The estimation is very rough, of course, but this delay will be
-            # decreasing as task preconditions will be completing which will
-            # give a decent asymptotic approximation.
             # For example, if a 'join' task has 100 inbound incomplete tasks
             # then the next 'refresh_task_state' call will happen in 10
-            # seconds. For 500 tasks it will be 50 seconds. The larger the
-            # workflow is, the more beneficial this mechanism will be.
+            # seconds. For 500 tasks it will be 50 seconds.
             delay = int(log_state.cardinality * 0.01)
 
             _schedule_refresh_task_state(task_ex, max(1, delay))
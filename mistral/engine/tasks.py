@@ -23,9 +23,11 @@ from osprofiler import profiler
 import six
 
 from mistral.db.v2 import api as db_api
+from mistral.db.v2.sqlalchemy import models
 from mistral.engine import actions
 from mistral.engine import dispatcher
 from mistral.engine import policies
+from mistral.engine import workflow_handler as wf_handler
 from mistral import exceptions as exc
 from mistral import expressions as expr
 from mistral.notifiers import base as notif
@@ -39,6 +41,46 @@ from mistral.workflow import states
 
 LOG = logging.getLogger(__name__)
 
+# Runtime context key of inbound tasks that have triggered a 'join' task
+# so far. The value is a dictionary where keys are names of inbound tasks
+# and values are the corresponding "triggered_by" entries.
+JOIN_ARRIVALS_KEY = 'join_arrivals'
+
+
+def is_join_ready(wf_spec, task_spec, task_ex):
+    """Checks if enough inbound tasks have triggered the 'join' task.
+
+    The check doesn't evaluate states of inbound tasks and takes
+    constant time. If it returns True then all the inbound tasks required
+    by the 'join' expression have already routed to the 'join' task and
+    its logical state is RUNNING.
+
+    :param wf_spec: Workflow specification.
+    :param task_spec: 'join' task specification.
+    :param task_ex: 'join' task execution.
+    :return: True if the 'join' task is ready to run.
+    """
+    join_expr = task_spec.get_join()
+
+    if not join_expr or not task_ex:
+        return False
+
+    if join_expr == 'all':
+        required_cnt = len(wf_spec.find_inbound_task_specs(task_spec))
+    elif join_expr == 'one':
+        required_cnt = 1
+    else:
+        required_cnt = join_expr
+
+    arrivals = task_ex.runtime_context.get(JOIN_ARRIVALS_KEY, {})
+
+    return len(arrivals) >= required_cnt
+
+
+def get_join_triggered_by(task_ex):
+    """Gets "triggered_by" of the 'join' task from its arrivals."""
+    return list(task_ex.runtime_context.get(JOIN_ARRIVALS_KEY, {}).values())
+
 
 @six.add_metaclass(abc.ABCMeta)
 class Task(object):
@@ -91,6 +133,10 @@ class Task(object):
     def is_state_changed(self):
         return self.state_changed
 
+    def is_join_ready(self):
+        """Checks if enough inbound tasks have triggered this 'join' task."""
+        return is_join_ready(self.wf_spec, self.task_spec, self.task_ex)
+
     @abc.abstractmethod
     def on_action_complete(self, action_ex):
         """Handle action completion.
@@ -127,6 +173,13 @@ class Task(object):
 
                 self.task_ex = t_execs[0] if t_execs else None
 
+            if self.task_ex:
+                # NOTE: We need to refresh task execution object right
+                # after the lock is acquired to make sure that we're
+                # working with a fresh state of its runtime context.
+                # Otherwise, arrivals of other inbound tasks can be lost.
+                db_api.refresh(self.task_ex)
+
             msg = 'Task is waiting.'
 
             if not self.task_ex:
@@ -137,9 +190,35 @@ class Task(object):
             elif self.task_ex.state != states.WAITING:
                 self.set_state(states.WAITING, msg)
 
+            # The task is locked so arrivals of inbound tasks are recorded
+            # one at a time.
+            if self.triggered_by and self.task_spec.get_join():
+                self._register_join_arrivals()
+
+    def _register_join_arrivals(self):
+        arrivals = dict(
+            self.task_ex.runtime_context.get(JOIN_ARRIVALS_KEY, {})
+        )
+
+        for t in self.triggered_by:
+            in_task_ex = db_api.get_task_execution(
+                t['task_id'],
+                fields=(models.TaskExecution.name,)
+            )
+
+            # An inbound task is counted only once even if it triggers
+            # the 'join' task several times (e.g. in a loop).
+            arrivals.setdefault(in_task_ex.name, t)
+
+        # Assign a new dictionary so that SQLAlchemy sees the change.
+        self.task_ex.runtime_context[JOIN_ARRIVALS_KEY] = arrivals
+
     def reset(self):
         self.reset_flag = True
 
+        if self.task_ex:
+            self.task_ex.runtime_context.pop(JOIN_ARRIVALS_KEY, None)
+
     @profiler.trace('task-set-state')
     def set_state(self, state, state_info, processed=None):
         """Sets task state without executing post completion logic.
@@ -254,6 +333,8 @@ class Task(object):
 
         dispatcher.dispatch_workflow_commands(self.wf_ex, cmds)
 
+        wf_handler.on_task_complete(self.task_ex)
+
     @profiler.trace('task-update')
     def update(self, state, state_info=None):
         """Update task and set specified state.
@@ -757,7 +838,12 @@ class WithItemsTask(RegularTask):
         return self._get_with_items_context()[self._COUNT]
 
     def _get_with_items_capacity(self):
-        return self._get_with_items_context()[self._CAPACITY]
+        if self.task_ex.capacity is not None:
+            return self.task_ex.capacity
+
+        # Task executions created by older versions keep the capacity
+        # in the runtime context.
+        return self._get_with_items_context().get(self._CAPACITY)
 
     def _get_concurrency(self):
         return self.task_ex.runtime_context.get(self._CONCURRENCY)
@@ -845,30 +931,24 @@ class WithItemsTask(RegularTask):
         return indices[:capacity]
 
     def _increase_capacity(self):
-        ctx = self._get_with_items_context()
+        capacity = self._get_with_items_capacity()
         concurrency = self._get_concurrency()
 
-        if concurrency and ctx[self._CAPACITY] < concurrency:
-            ctx[self._CAPACITY] += 1
-
-            self.task_ex.runtime_context.update({self._WITH_ITEMS: ctx})
+        if concurrency and capacity < concurrency:
+            self.task_ex.capacity = capacity + 1
 
     def _decrease_capacity(self, count):
-        ctx = self._get_with_items_context()
-
-        capacity = ctx[self._CAPACITY]
+        capacity = self._get_with_items_capacity()
 
         if capacity is not None:
             if capacity >= count:
-                ctx[self._CAPACITY] -= count
+                self.task_ex.capacity = capacity - count
             else:
                 raise RuntimeError(
                     "Can't decrease with-items capacity"
                     " [capacity=%s, count=%s]" % (capacity, count)
                 )
 
-        self.task_ex.runtime_context.update({self._WITH_ITEMS: ctx})
-
     def _is_new(self):
         return not self.task_ex.runtime_context.get(self._WITH_ITEMS)
 
@@ -877,10 +957,9 @@ class WithItemsTask(RegularTask):
 
         if not runtime_ctx.get(self._WITH_ITEMS):
             # Prepare current indexes and parallel limitation.
-            runtime_ctx[self._WITH_ITEMS] = {
-                self._CAPACITY: self._get_concurrency(),
-                self._COUNT: action_count
-            }
+            runtime_ctx[self._WITH_ITEMS] = {self._COUNT: action_count}
+
+            self.task_ex.capacity = self._get_concurrency()
 
     def _has_more_iterations(self):
         # See action executions which have been already
@@ -25,6 +25,9 @@ from mistral.engine import action_queue
 from mistral.engine import workflows
 from mistral import exceptions as exc
 from mistral.services import scheduler
+from mistral import utils
+from mistral.utils import wf_trace
+from mistral.workflow import lookup_utils
 from mistral.workflow import states
 
 LOG = logging.getLogger(__name__)
@@ -35,6 +38,25 @@ _CHECK_AND_COMPLETE_PATH = (
     'mistral.engine.workflow_handler._check_and_complete'
 )
 
+_CHECK_COMPLETION_PATH = (
+    'mistral.engine.workflow_handler._check_completion'
+)
+
+_INCOMPLETE_STATES = [
+    states.IDLE,
+    states.WAITING,
+    states.RUNNING,
+    states.RUNNING_DELAYED,
+    states.PAUSED
+]
+
+_CANCELLABLE_STATES = [
+    states.IDLE,
+    states.RUNNING,
+    states.RUNNING_DELAYED,
+    states.PAUSED
+]
+
 
 @profiler.trace('workflow-handler-start-workflow', hide_args=True)
 def start_workflow(wf_identifier, wf_namespace, wf_ex_id, wf_input, desc,
@@ -54,7 +76,12 @@ def start_workflow(wf_identifier, wf_namespace, wf_ex_id, wf_input, desc,
         params=params
     )
 
-    _schedule_check_and_complete(wf.wf_ex)
+    # Completion is checked every time a task completes, here only
+    # the periodic safety net check is scheduled.
+    _schedule_check_and_complete(
+        wf.wf_ex,
+        CONF.engine.completion_check_interval
+    )
 
     return wf.wf_ex
 
@@ -68,16 +95,101 @@ def stop_workflow(wf_ex, state, msg=None):
     # with ERROR state.
     wf.stop(state, msg)
 
+    # The workflow is completed so its pending completion check is not
+    # needed anymore.
+    _delete_check_and_complete(wf_ex)
+
     # Cancels subworkflows.
     if state == states.CANCELLED:
-        for task_ex in wf_ex.task_executions:
-            sub_wf_exs = db_api.get_workflow_executions(
-                task_execution_id=task_ex.id
-            )
+        _cancel_sub_workflows(wf_ex, msg)
+
+
+def _get_sub_workflows(wf_ex, in_states):
+    """Gets sub-workflow executions of the given workflow execution.
+
+    All sub-workflow executions of the execution tree being in the given
+    states are fetched with one query. Only the ones reachable from the
+    given workflow execution through such sub-workflow executions are
+    returned, parents go before their children.
+
+    :param wf_ex: Workflow execution.
+    :param in_states: States of the sub-workflow executions.
+    :return: List of sub-workflow executions.
+    """
+    children = {}
+
+    for sub_wf_ex, parent_id in db_api.get_sub_workflow_executions(
+            wf_ex.root_execution_id or wf_ex.id,
+            in_states=in_states):
+        children.setdefault(parent_id, []).append(sub_wf_ex)
+
+    sub_wf_exs = []
+    parent_ids = [wf_ex.id]
+
+    while parent_ids:
+        found = [
+            sub_wf_ex
+            for parent_id in parent_ids
+            for sub_wf_ex in children.get(parent_id, [])
+        ]
+
+        sub_wf_exs.extend(found)
+
+        parent_ids = [sub_wf_ex.id for sub_wf_ex in found]
 
-            for sub_wf_ex in sub_wf_exs:
-                if not states.is_completed(sub_wf_ex.state):
-                    stop_workflow(sub_wf_ex, state, msg=msg)
+    return sub_wf_exs
+
+
+def _cancel_sub_workflows(wf_ex, msg=None):
+    """Cancels all running sub-workflows of the given workflow execution.
+
+    The sub-workflow executions are cancelled with one UPDATE statement.
+
+    :param wf_ex: Workflow execution.
+    :param msg: Additional explaining message.
+    """
+    sub_wf_exs = _get_sub_workflows(wf_ex, _CANCELLABLE_STATES)
+
+    if not sub_wf_exs:
+        return
+
+    prev_states = {sub_wf_ex.id: sub_wf_ex.state for sub_wf_ex in sub_wf_exs}
+
+    cancelled_ids = set(
+        db_api.update_workflow_executions_state(
+            [sub_wf_ex.id for sub_wf_ex in sub_wf_exs],
+            cur_states=_CANCELLABLE_STATES,
+            state=states.CANCELLED,
+            values={
+                'state_info': msg,
+                'accepted': True,
+                'output': {
+                    'result': utils.cut_by_kb(
+                        msg,
+                        CONF.engine.execution_field_size_limit_kb
+                    )
+                }
+            }
+        )
+    )
+
+    cancelled = [s for s in sub_wf_exs if s.id in cancelled_ids]
+
+    _delete_check_and_complete(*cancelled)
+
+    for sub_wf_ex in cancelled:
+        wf_trace.info(
+            sub_wf_ex,
+            "Workflow '%s' [%s -> %s, msg=%s]" %
+            (sub_wf_ex.workflow_name,
+             prev_states[sub_wf_ex.id],
+             states.CANCELLED,
+             msg)
+        )
+
+        lookup_utils.invalidate_cached_task_executions(sub_wf_ex.id)
+
+        workflows.Workflow(wf_ex=sub_wf_ex).on_cancelled()
 
 
 def force_fail_workflow(wf_ex, msg=None):
@@ -104,13 +216,13 @@ def _check_and_complete(wf_ex_id):
         try:
             check_and_fix_integrity(wf_ex)
 
-            num_incomplete_tasks = wf.check_and_complete()
+            wf.check_and_complete()
 
             if not states.is_completed(wf_ex.state):
-                delay = (
-                    2 + int(num_incomplete_tasks * 0.1) if num_incomplete_tasks
-                    else 4
-                )
+                # The check is triggered every time a task completes so
+                # the periodic one is only a safety net, e.g. for tasks
+                # whose integrity needs to be restored.
+                delay = CONF.engine.completion_check_interval
 
                 # Rescheduling this check may not happen if errors are
                 # raised in the business logic. If the error is DB related
@@ -124,14 +236,43 @@ def _check_and_complete(wf_ex_id):
                 _schedule_check_and_complete(wf_ex, delay)
 
         except exc.MistralException as e:
-            msg = (
-                "Failed to check and complete [wf_ex_id=%s, wf_name=%s]:"
-                " %s\n%s" % (wf_ex_id, wf_ex.name, e, tb.format_exc())
-            )
+            _fail_on_check_error(wf, e)
 
-            LOG.error(msg)
 
-            force_fail_workflow(wf.wf_ex, msg)
+@db_utils.retry_on_db_error
+@action_queue.process
+@profiler.trace('workflow-handler-check-completion', hide_args=True)
+def _check_completion(wf_ex_id):
+    """Checks if a workflow is completed after one of its tasks completed.
+
+    Unlike the periodic check it neither restores integrity of task
+    executions nor reschedules itself, both are left to the periodic
+    check.
+    """
+    # Note: This method can only be called via scheduler.
+    with db_api.transaction():
+        wf_ex = db_api.load_workflow_execution(wf_ex_id)
+
+        if not wf_ex or states.is_completed(wf_ex.state):
+            return
+
+        wf = workflows.Workflow(wf_ex=wf_ex)
+
+        try:
+            wf.check_and_complete()
+        except exc.MistralException as e:
+            _fail_on_check_error(wf, e)
+
+
+def _fail_on_check_error(wf, e):
+    msg = (
+        "Failed to check and complete [wf_ex_id=%s, wf_name=%s]:"
+        " %s\n%s" % (wf.wf_ex.id, wf.wf_ex.name, e, tb.format_exc())
+    )
+
+    LOG.error(msg)
+
+    force_fail_workflow(wf.wf_ex, msg)
 
 
 @profiler.trace('workflow-handler-check-and-fix-integrity')
@@ -198,14 +339,7 @@ def check_and_fix_integrity(wf_ex):
 
 def pause_workflow(wf_ex, msg=None):
     # Pause subworkflows first.
-    for task_ex in wf_ex.task_executions:
-        sub_wf_exs = db_api.get_workflow_executions(
-            task_execution_id=task_ex.id
-        )
-
-        for sub_wf_ex in sub_wf_exs:
-            if not states.is_completed(sub_wf_ex.state):
-                pause_workflow(sub_wf_ex, msg=msg)
+    _pause_sub_workflows(wf_ex, msg)
 
     # If all subworkflows paused successfully, pause the main workflow.
     # If any subworkflows failed to pause for temporary reason, this
@@ -214,6 +348,51 @@ def pause_workflow(wf_ex, msg=None):
     wf.pause(msg=msg)
 
 
+def _pause_sub_workflows(wf_ex, msg=None):
+    """Pauses all running sub-workflows of the given workflow execution.
+
+    The sub-workflow executions are paused with one UPDATE statement.
+
+    :param wf_ex: Workflow execution.
+    :param msg: Additional explaining message.
+    """
+    sub_wf_exs = [
+        sub_wf_ex
+        for sub_wf_ex in _get_sub_workflows(wf_ex, _INCOMPLETE_STATES)
+        if states.is_running(sub_wf_ex.state)
+    ]
+
+    if not sub_wf_exs:
+        return
+
+    prev_states = {sub_wf_ex.id: sub_wf_ex.state for sub_wf_ex in sub_wf_exs}
+
+    paused_ids = set(
+        db_api.update_workflow_executions_state(
+            [sub_wf_ex.id for sub_wf_ex in sub_wf_exs],
+            cur_states=[states.RUNNING],
+            state=states.PAUSED,
+            values={'state_info': msg}
+        )
+    )
+
+    # Children are handled first, same as when pausing them one by one.
+    for sub_wf_ex in reversed(sub_wf_exs):
+        if sub_wf_ex.id not in paused_ids:
+            continue
+
+        wf_trace.info(
+            sub_wf_ex,
+            "Workflow '%s' [%s -> %s, msg=%s]" %
+            (sub_wf_ex.workflow_name,
+             prev_states[sub_wf_ex.id],
+             states.PAUSED,
+             msg)
+        )
+
+        workflows.Workflow(wf_ex=sub_wf_ex).on_paused()
+
+
 def rerun_workflow(wf_ex, task_ex, reset=True, env=None):
     if wf_ex.state == states.PAUSED:
         return wf_ex.get_clone()
@@ -232,15 +411,12 @@ def resume_workflow(wf_ex, env=None):
     if not states.is_paused_or_idle(wf_ex.state):
         return wf_ex.get_clone()
 
-    # Resume subworkflows first.
-    for task_ex in wf_ex.task_executions:
-        sub_wf_exs = db_api.get_workflow_executions(
-            task_execution_id=task_ex.id
-        )
+    # Resume subworkflows first, children before their parents. Only
+    # the ones reachable through paused or idle parents get resumed.
+    sub_wf_exs = _get_sub_workflows(wf_ex, [states.IDLE, states.PAUSED])
 
-        for sub_wf_ex in sub_wf_exs:
-            if not states.is_completed(sub_wf_ex.state):
-                resume_workflow(sub_wf_ex)
+    for sub_wf_ex in reversed(sub_wf_exs):
+        workflows.Workflow(wf_ex=sub_wf_ex).resume()
 
     # Resume current workflow here so to trigger continue workflow only
     # after all other subworkflows are placed back in running state.
@@ -261,10 +437,48 @@ def set_workflow_state(wf_ex, state, msg=None):
         )
 
 
-def _get_completion_check_key(wf_ex):
+@profiler.trace('workflow-handler-on-task-complete', hide_args=True)
+def on_task_complete(task_ex):
+    """Triggers the completion check of the workflow of a completed task.
+
+    The check is made right after the current transaction is committed
+    so that the workflow completes as soon as its last task is processed
+    rather than on the next periodic check. Checks triggered by tasks
+    completed at the same time are squashed into one.
+
+    :param task_ex: Task execution that has completed and been processed.
+    """
+    wf_ex = task_ex.workflow_execution
+
+    if states.is_paused_or_completed(wf_ex.state):
+        return
+
+    scheduler.schedule_call(
+        None,
+        _CHECK_COMPLETION_PATH,
+        0,
+        key=_get_completion_check_key(wf_ex, on_task_complete=True),
+        wf_ex_id=wf_ex.id
+    )
+
+
+def _get_completion_check_key(wf_ex, on_task_complete=False):
+    if on_task_complete:
+        return 'wfh_c_c-%s' % wf_ex.id
+
     return 'wfh_on_c_a_c-%s' % wf_ex.id
 
 
+def _delete_check_and_complete(*wf_exs):
+    keys = [
+        _get_completion_check_key(wf_ex, on_task_complete)
+        for wf_ex in wf_exs
+        for on_task_complete in (False, True)
+    ]
+
+    db_api.delete_delayed_calls(key={'in': keys}, processing=False)
+
+
 @profiler.trace('workflow-handler-schedule-check-and-complete', hide_args=True)
 def _schedule_check_and_complete(wf_ex, delay=0):
     """Schedules workflow completion check.
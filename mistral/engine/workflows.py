@@ -160,6 +160,16 @@ class Workflow(object):
         # Set the state of this workflow to paused.
         self.set_state(states.PAUSED, state_info=msg)
 
+        self.on_paused()
+
+    def on_paused(self):
+        """Handles the workflow execution that has just been paused.
+
+        Publishes the event and updates the parent task if this is
+        a sub-workflow.
+        """
+        assert self.wf_ex
+
         # Publish event.
         self.notify(events.WORKFLOW_PAUSED)
 
@@ -511,6 +521,16 @@ class Workflow(object):
 
         self.wf_ex.output = {'result': msg}
 
+        self.on_cancelled()
+
+    def on_cancelled(self):
+        """Handles the workflow execution that has just been cancelled.
+
+        Publishes the event and sends the result to the parent workflow
+        if this is a sub-workflow.
+        """
+        assert self.wf_ex
+
         # Publish event.
         self.notify(events.WORKFLOW_CANCELLED)
 
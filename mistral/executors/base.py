@@ -68,3 +68,16 @@ class Executor(object):
         :return: Action result.
         """
         raise NotImplementedError()
+
+    def run_actions(self, actions, target=None):
+        """Runs a batch of actions in asynchronous mode.
+
+        :param actions: A list of dicts, each of them holding the
+            arguments of run_action() for one action: "action_ex_id",
+            "action_cls_str", "action_cls_attrs", "params", "safe_rerun",
+            "execution_context" and "timeout".
+        :param target: Target (group of action executors) of all the
+            actions in the batch.
+        """
+        for action in actions:
+            self.run_action(target=target, async_=True, **action)
@@ -15,6 +15,7 @@
 
 from eventlet import timeout as ev_timeout
 from mistral_lib import actions as mistral_lib
+from oslo_config import cfg
 from oslo_log import log as logging
 from osprofiler import profiler
 
@@ -22,6 +23,8 @@ from mistral.actions import action_factory as a_f
 from mistral import context
 from mistral import exceptions as exc
 from mistral.executors import base
+from mistral.executors import process_pool
+from mistral.executors import result_buffer
 from mistral.rpc import clients as rpc
 from mistral.utils import inspect_utils as i_u
 
@@ -32,6 +35,37 @@ LOG = logging.getLogger(__name__)
 class DefaultExecutor(base.Executor):
     def __init__(self):
         self._engine_client = rpc.get_engine_client()
+        self._result_buffer = None
+
+        if cfg.CONF.executor.result_batch_window:
+            self._result_buffer = result_buffer.ResultBuffer(
+                self._engine_client,
+                cfg.CONF.executor.result_batch_window,
+                cfg.CONF.executor.result_batch_size
+            )
+
+        self._process_pool = None
+
+        if cfg.CONF.executor.process_pool_size:
+            self._process_pool = process_pool.ProcessPool(
+                cfg.CONF.executor.process_pool_size,
+                cfg.CONF.executor.process_pool_recycle_after,
+                cfg.CONF.executor.process_pool_max_result_size * 1024
+            )
+
+    def flush_results(self):
+        """Sends action results collected so far to the engine."""
+        if self._result_buffer:
+            self._result_buffer.flush()
+
+    def _runs_in_process(self, action_cls_str, action_cls):
+        if not self._process_pool:
+            return False
+
+        return (
+            getattr(action_cls, 'run_in_process', False) or
+            action_cls_str in cfg.CONF.executor.process_pool_actions
+        )
 
     @profiler.trace('default-executor-run-action', hide_args=True)
     def run_action(self, action_ex_id, action_cls_str, action_cls_attrs,
@@ -57,13 +91,16 @@ class DefaultExecutor(base.Executor):
         :return: Action result.
         """
 
+        wf_ex_id = (execution_context or {}).get('workflow_execution_id')
+
         def send_error_back(error_msg):
             error_result = mistral_lib.Result(error=error_msg)
 
             if action_ex_id:
                 self._engine_client.on_action_complete(
                     action_ex_id,
-                    error_result
+                    error_result,
+                    wf_ex_id=wf_ex_id
                 )
 
                 return None
@@ -105,15 +142,25 @@ class DefaultExecutor(base.Executor):
 
         # Run action.
         try:
-            with ev_timeout.Timeout(seconds=timeout):
-                # NOTE(d0ugal): If the action is a subclass of mistral-lib we
-                # know that it expects to be passed the context.
-                if isinstance(action, mistral_lib.Action):
-                    action_ctx = context.create_action_context(
-                        execution_context)
-                    result = action.run(action_ctx)
-                else:
-                    result = action.run()
+            if self._runs_in_process(action_cls_str, action_cls):
+                result = self._process_pool.run_action(
+                    action_cls_str,
+                    action_cls_attrs,
+                    params,
+                    execution_context,
+                    timeout=timeout
+                )
+            else:
+                with ev_timeout.Timeout(seconds=timeout):
+                    # NOTE(d0ugal): If the action is a subclass of
+                    # mistral-lib we know that it expects to be passed
+                    # the context.
+                    if isinstance(action, mistral_lib.Action):
+                        action_ctx = context.create_action_context(
+                            execution_context)
+                        result = action.run(action_ctx)
+                    else:
+                        result = action.run()
 
             # Note: it's made for backwards compatibility with already
             # existing Mistral actions which don't return result as
@@ -140,11 +187,15 @@ class DefaultExecutor(base.Executor):
         # Send action result.
         try:
             if action_ex_id and (action.is_sync() or result.is_error()):
-                self._engine_client.on_action_complete(
-                    action_ex_id,
-                    result,
-                    async_=True
-                )
+                if self._result_buffer:
+                    self._result_buffer.add(action_ex_id, result)
+                else:
+                    self._engine_client.on_action_complete(
+                        action_ex_id,
+                        result,
+                        async_=True,
+                        wf_ex_id=wf_ex_id
+                    )
 
         except exc.MistralException as e:
             # In case of a Mistral exception we can try to send error info to
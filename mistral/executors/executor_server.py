@@ -12,12 +12,19 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import eventlet
+from eventlet import semaphore
 from oslo_log import log as logging
+from oslo_service import threadgroup
+import tooz.coordination
 
+from mistral.actions import action_factory as a_f
 from mistral import config as cfg
+from mistral import context
 from mistral.executors import default_executor as exe
 from mistral.rpc import base as rpc
 from mistral.service import base as service_base
+from mistral.service import coordination
 from mistral.services import action_execution_reporter
 from mistral import utils
 from mistral.utils import profiler as profiler_utils
@@ -41,6 +48,18 @@ class ExecutorServer(service_base.MistralService):
         self._rpc_server = None
         self._reporter = None
         self._aer = None
+        self._action_pool = None
+        self._io_pool = None
+        self._capacity_tg = None
+
+        # Number of running actions limited by "concurrency_limit".
+        self._running_cnt = 0
+        self._slots = None
+
+        if CONF.executor.concurrency_limit:
+            self._slots = semaphore.Semaphore(
+                CONF.executor.concurrency_limit
+            )
 
     def start(self):
         super(ExecutorServer, self).start()
@@ -56,6 +75,14 @@ class ExecutorServer(service_base.MistralService):
         self._rpc_server = rpc.get_rpc_server_driver()(cfg.CONF.executor)
         self._rpc_server.register_endpoint(self)
 
+        if CONF.executor.concurrency_limit:
+            # Don't take from the queue more messages than the executor
+            # can handle so that other executors get them.
+            self._rpc_server.prefetch_count = CONF.executor.concurrency_limit
+
+        if CONF.executor.capacity_routing:
+            self._start_capacity_reporting()
+
         self._rpc_server.run(executor='threading')
 
         self._notify_started('Executor server started.')
@@ -66,9 +93,22 @@ class ExecutorServer(service_base.MistralService):
         if self._reporter:
             self._reporter.stop(graceful)
 
+        if self._capacity_tg:
+            self._capacity_tg.stop()
+
+            self._capacity_tg = None
+
         if self._rpc_server:
             self._rpc_server.stop(graceful)
 
+        if graceful:
+            for pool in (self._action_pool, self._io_pool):
+                if pool:
+                    pool.waitall()
+
+        # Results of actions may be waiting to be sent in a batch.
+        self.executor.flush_results()
+
     def run_action(self, rpc_ctx, action_ex_id, action_cls_str,
                    action_cls_attrs, params, safe_rerun, execution_context,
                    timeout):
@@ -100,6 +140,136 @@ class ExecutorServer(service_base.MistralService):
 
         redelivered = rpc_ctx.redelivered or False
 
+        return self._run_action(
+            action_ex_id,
+            action_cls_str,
+            action_cls_attrs,
+            params,
+            safe_rerun,
+            execution_context,
+            redelivered,
+            timeout
+        )
+
+    def run_actions(self, rpc_ctx, actions):
+        """Receives calls over RPC to run a batch of actions on executor.
+
+        Actions of the batch are run concurrently in a green thread pool
+        shared by all batches. I/O-bound actions, like "std.http", are run
+        in a separate, usually much bigger, pool if it's configured so
+        that thousands of them can wait for their responses at the same
+        time without taking threads from other actions. The call returns
+        once all the actions are started so the RPC message gets
+        acknowledged without waiting for them to complete. Hence, the
+        whole batch can only be redelivered if the executor stops before
+        it starts all its actions. In this case every action of the batch
+        is run again as a redelivered one, i.e. it fails right away unless
+        it can be safely rerun, including the actions that had already
+        been started.
+
+        :param rpc_ctx: RPC request context dictionary.
+        :param actions: A list of dicts holding the arguments of
+            run_action() for every action.
+        """
+
+        LOG.info(
+            "Received RPC request 'run_actions'[action_ex_ids=%s]",
+            [a['action_ex_id'] for a in actions]
+        )
+
+        redelivered = rpc_ctx.redelivered or False
+        auth_ctx = context.ctx() if context.has_ctx() else None
+
+        for action in actions:
+            io_bound = self._is_io_bound(action)
+
+            pool = self._get_io_pool() if io_bound else self._get_action_pool()
+
+            # Blocks while the pool has no free green threads.
+            pool.spawn_n(
+                self._run_batched_action,
+                auth_ctx,
+                redelivered,
+                action,
+                io_bound
+            )
+
+    def _get_action_pool(self):
+        if self._action_pool is None:
+            # The pool is sized like the pool of the RPC server so that
+            # batches don't run more actions concurrently than separate
+            # "run_action" calls would. The option gets registered by
+            # the RPC server.
+            self._action_pool = eventlet.GreenPool(
+                CONF.executor_thread_pool_size
+            )
+
+        return self._action_pool
+
+    def _get_io_pool(self):
+        if self._io_pool is None:
+            self._io_pool = eventlet.GreenPool(CONF.executor.io_pool_size)
+
+        return self._io_pool
+
+    @staticmethod
+    def _is_io_bound(action):
+        if not CONF.executor.io_pool_size:
+            return False
+
+        action_cls_str = action['action_cls_str']
+
+        if action_cls_str in CONF.executor.io_pool_actions:
+            return True
+
+        try:
+            action_cls = a_f.construct_action_class(
+                action_cls_str,
+                action['action_cls_attrs']
+            )
+        except Exception:
+            # The error shows up when the action is run.
+            return False
+
+        return getattr(action_cls, 'io_bound', False)
+
+    def _run_batched_action(self, auth_ctx, redelivered, action,
+                            io_bound=False):
+        # Green threads don't inherit the security context of the thread
+        # that received the RPC message so it needs to be set explicitly.
+        context.set_ctx(auth_ctx)
+
+        try:
+            self._run_action(
+                action['action_ex_id'],
+                action['action_cls_str'],
+                action['action_cls_attrs'],
+                action['params'],
+                action['safe_rerun'],
+                action['execution_context'],
+                redelivered,
+                action.get('timeout'),
+                limited=not io_bound
+            )
+        except Exception:
+            LOG.exception(
+                "Failed to run action [action_ex_id=%s]",
+                action['action_ex_id']
+            )
+        finally:
+            context.set_ctx(None)
+
+    def _run_action(self, action_ex_id, action_cls_str, action_cls_attrs,
+                    params, safe_rerun, execution_context, redelivered,
+                    timeout, limited=True):
+        limited = limited and self._slots is not None
+
+        if limited:
+            # Blocks while the executor runs as many actions as it can.
+            self._slots.acquire()
+
+            self._running_cnt += 1
+
         try:
             self._aer.add_action_ex_id(action_ex_id)
 
@@ -116,6 +286,48 @@ class ExecutorServer(service_base.MistralService):
         finally:
             self._aer.remove_action_ex_id(action_ex_id)
 
+            if limited:
+                self._running_cnt -= 1
+
+                self._slots.release()
+
+    def _start_capacity_reporting(self):
+        if not CONF.executor.concurrency_limit:
+            LOG.warning(
+                "Capacity routing requires the executor concurrency limit, "
+                "free slots of the executor aren't reported."
+            )
+
+            return
+
+        # Engines send requests to run actions to the RPC server of the
+        # executor with free slots. The server is named after the host so
+        # that the executor restarted on the same host gets requests sent
+        # before the restart.
+        self._rpc_server.server_id = utils.get_host_identifier()
+
+        self._capacity_tg = threadgroup.ThreadGroup()
+
+        self._capacity_tg.add_timer(
+            CONF.coordination.heartbeat_interval,
+            self._report_capacity
+        )
+
+    def _report_capacity(self):
+        free_slots = CONF.executor.concurrency_limit - self._running_cnt
+
+        try:
+            coordination.get_service_coordinator().update_capabilities(
+                self.cluster_member.group_type,
+                {
+                    'free_slots': free_slots,
+                    coordination.RPC_SERVER_CAPABILITY:
+                        self._rpc_server.server_id
+                }
+            )
+        except tooz.coordination.ToozError as e:
+            LOG.warning("Failed to report executor capacity: %s", e)
+
 
 def get_oslo_service(setup_profiler=True):
     return ExecutorServer(
@@ -0,0 +1,235 @@
+# Copyright 2019 - Nokia Networks.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from concurrent import futures
+from concurrent.futures import process as futures_process
+import multiprocessing
+import pickle
+import signal
+import sys
+import threading
+
+from mistral_lib import actions as mistral_lib
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from mistral.actions import action_factory as a_f
+from mistral import config
+from mistral import context
+from mistral import exceptions as exc
+
+
+LOG = logging.getLogger(__name__)
+
+# Time given to a worker process to interrupt a timed out action itself
+# before the whole pool is terminated.
+_TIMEOUT_GRACE = 5
+
+_worker_initialized = False
+
+
+def _init_worker(config_files):
+    global _worker_initialized
+
+    if _worker_initialized:
+        return
+
+    # Worker processes are spawned, not forked, so they need to load
+    # the configuration themselves.
+    config.parse_args(args=[], default_config_files=config_files)
+
+    _worker_initialized = True
+
+
+def _on_timeout(signum, frame):
+    raise exc.ActionException("Action timed out.")
+
+
+def _run_action(action_cls_str, action_cls_attrs, params, execution_context,
+                security_ctx, timeout, max_result_size, config_files):
+    """Runs an action within a worker process.
+
+    :return: Pickled action result.
+    """
+    _init_worker(config_files)
+
+    if security_ctx is not None:
+        context.RpcContextSerializer().deserialize_context(security_ctx)
+
+    if timeout:
+        signal.signal(signal.SIGALRM, _on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    try:
+        action_cls = a_f.construct_action_class(
+            action_cls_str,
+            action_cls_attrs
+        )
+
+        action = action_cls(**params)
+
+        if isinstance(action, mistral_lib.Action):
+            result = action.run(
+                context.create_action_context(execution_context)
+            )
+        else:
+            result = action.run()
+    except Exception as e:
+        # The original exception may be impossible to unpickle in
+        # the executor process.
+        raise exc.ActionException(str(e))
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+        context.set_ctx(None)
+
+    if not isinstance(result, mistral_lib.Result):
+        result = mistral_lib.Result(data=result)
+
+    data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+
+    if max_result_size and len(data) > max_result_size:
+        data = pickle.dumps(
+            mistral_lib.Result(
+                error="Size of the action result exceeds the limit "
+                      "[size=%s, limit=%s]" % (len(data), max_result_size)
+            ),
+            pickle.HIGHEST_PROTOCOL
+        )
+
+    return data
+
+
+class ProcessPool(object):
+    """Runs actions in a pool of worker processes.
+
+    CPU-bound actions running in green threads block the eventlet hub of
+    the executor process and delay all other actions and the heartbeats
+    sent to the engine. The pool runs such actions in separate processes
+    while the calling green thread waits for the result.
+
+    Worker processes get replaced once the pool has run the configured
+    number of actions. If a worker doesn't stop a timed out action, e.g.
+    because it's stuck in native code, all workers of the pool are
+    terminated and the actions they are running fail.
+    """
+
+    def __init__(self, size, recycle_after=None, max_result_size=None):
+        self._size = size
+        self._recycle_after = recycle_after
+        self._max_result_size = max_result_size
+
+        self._lock = threading.Lock()
+        self._pool = None
+        self._run_cnt = 0
+
+    def _create_pool(self):
+        kwargs = {}
+
+        if sys.version_info >= (3, 7):
+            # Forking a process running an eventlet hub isn't safe.
+            kwargs['mp_context'] = multiprocessing.get_context('spawn')
+
+        return futures.ProcessPoolExecutor(self._size, **kwargs)
+
+    def _get_pool(self):
+        with self._lock:
+            recycle = (
+                self._pool is not None and
+                self._recycle_after and
+                self._run_cnt >= self._recycle_after
+            )
+
+            if recycle:
+                # Workers of the old pool exit once they complete
+                # the actions they are running.
+                self._pool.shutdown(wait=False)
+
+                self._pool = None
+
+            if self._pool is None:
+                self._pool = self._create_pool()
+                self._run_cnt = 0
+
+            self._run_cnt += 1
+
+            return self._pool
+
+    def _discard_pool(self, pool, terminate=False):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+
+        # Workers can't be terminated with the public API of
+        # concurrent.futures.
+        processes = list((getattr(pool, '_processes', None) or {}).values())
+
+        pool.shutdown(wait=False)
+
+        if terminate:
+            for p in processes:
+                p.terminate()
+
+    def run_action(self, action_cls_str, action_cls_attrs, params,
+                   execution_context, timeout=None):
+        """Runs an action in a worker process.
+
+        :param action_cls_str: Path to action class in dot notation.
+        :param action_cls_attrs: Attributes of action class which
+            will be set to.
+        :param params: Action parameters.
+        :param execution_context: A dict of values providing information
+            about the current execution.
+        :param timeout: A period of time in seconds after which execution
+            of the action is interrupted.
+        :return: Action result.
+        """
+        security_ctx = (
+            context.RpcContextSerializer().serialize_context(context.ctx())
+            if context.has_ctx() else None
+        )
+
+        pool = self._get_pool()
+
+        future = pool.submit(
+            _run_action,
+            action_cls_str,
+            action_cls_attrs,
+            params,
+            execution_context,
+            security_ctx,
+            timeout,
+            self._max_result_size,
+            list(cfg.CONF.config_file)
+        )
+
+        try:
+            data = future.result(timeout + _TIMEOUT_GRACE if timeout else None)
+        except futures.TimeoutError:
+            LOG.warning(
+                "Worker process didn't interrupt a timed out action, "
+                "terminating the process pool [action_cls=%s]",
+                action_cls_str
+            )
+
+            self._discard_pool(pool, terminate=True)
+
+            raise exc.ActionException("Action timed out.")
+        except futures_process.BrokenProcessPool:
+            self._discard_pool(pool)
+
+            raise
+
+        return pickle.loads(data)
@@ -0,0 +1,167 @@
+# Copyright 2019 - Nokia Networks.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import collections
+
+import eventlet
+from eventlet import semaphore
+from mistral_lib import actions as mistral_lib
+from oslo_log import log as logging
+
+from mistral import context
+from mistral import exceptions as exc
+
+
+LOG = logging.getLogger(__name__)
+
+
+def _get_ctx_key(ctx):
+    if ctx is None:
+        return None
+
+    return (
+        ctx.project_id,
+        ctx.user_id,
+        ctx.auth_token,
+        ctx.trust_id,
+        ctx.is_admin
+    )
+
+
+class ResultBuffer(object):
+    """Collects action results to send them to the engine in batches.
+
+    Results are sent with one "on_actions_complete" call when the given
+    window expires since the first of them has been added or when their
+    number reaches the given batch size, whichever comes first. Results
+    of actions run on behalf of different users are sent separately
+    because the engine processes every call within the security context
+    of the caller.
+    """
+
+    def __init__(self, engine_client, window, batch_size):
+        self._engine_client = engine_client
+        self._window = window
+        self._batch_size = batch_size
+
+        self._lock = semaphore.Semaphore()
+
+        # Security context key -> (security context, completions).
+        self._batches = collections.OrderedDict()
+
+        self._timer = None
+
+    def add(self, action_ex_id, result):
+        """Adds a result of the given action.
+
+        :param action_ex_id: Action execution id.
+        :param result: Action result (an instance of mistral_lib Result).
+        """
+        ctx = context.ctx() if context.has_ctx() else None
+
+        batch = None
+
+        with self._lock:
+            _, completions = self._batches.setdefault(
+                _get_ctx_key(ctx),
+                (ctx, [])
+            )
+
+            completions.append(
+                {
+                    'action_ex_id': action_ex_id,
+                    'result': result
+                }
+            )
+
+            if len(completions) >= self._batch_size:
+                batch = self._batches.pop(_get_ctx_key(ctx))
+            elif self._timer is None:
+                self._timer = eventlet.spawn_after(
+                    self._window,
+                    self._on_window_expired
+                )
+
+        if batch:
+            self._send(*batch)
+
+    def flush(self):
+        """Sends all collected results right away."""
+        with self._lock:
+            batches = list(self._batches.values())
+
+            self._batches.clear()
+
+            if self._timer is not None:
+                self._timer.cancel()
+
+                self._timer = None
+
+        for ctx, completions in batches:
+            self._send(ctx, completions)
+
+    def _on_window_expired(self):
+        with self._lock:
+            self._timer = None
+
+        self.flush()
+
+    def _send(self, ctx, completions):
+        old_ctx = context.ctx() if context.has_ctx() else None
+
+        context.set_ctx(ctx)
+
+        try:
+            self._engine_client.on_actions_complete(completions)
+        except Exception:
+            LOG.exception(
+                "Failed to send a batch of action results, sending them "
+                "one by one [action_ex_ids=%s]",
+                [c['action_ex_id'] for c in completions]
+            )
+
+            for c in completions:
+                self._send_one(c['action_ex_id'], c['result'])
+        finally:
+            context.set_ctx(old_ctx)
+
+    def _send_one(self, action_ex_id, result):
+        try:
+            self._engine_client.on_action_complete(
+                action_ex_id,
+                result,
+                async_=True
+            )
+        except exc.MistralException as e:
+            # Most likely the result can't be serialized, the engine
+            # still needs to know that the action has completed.
+            LOG.exception(
+                "Failed to send action result [action_ex_id=%s]",
+                action_ex_id
+            )
+
+            self._engine_client.on_action_complete(
+                action_ex_id,
+                mistral_lib.Result(
+                    error="Failed to complete action due to a Mistral "
+                          "exception [action_ex_id=%s]\n %s" %
+                          (action_ex_id, e)
+                ),
+                async_=True
+            )
+        except Exception:
+            LOG.exception(
+                "Failed to send action result [action_ex_id=%s]",
+                action_ex_id
+            )
@@ -13,12 +13,12 @@
 #    limitations under the License.
 
 import json
-import requests
 from six.moves import http_client
 
 from oslo_log import log as logging
 
 from mistral.notifiers import base
+from mistral.utils import http_utils
 
 
 LOG = logging.getLogger(__name__)
@@ -30,7 +30,12 @@ class WebhookPublisher(base.NotificationPublisher):
         url = kwargs.get('url')
         headers = kwargs.get('headers', {})
 
-        resp = requests.post(url, data=json.dumps(data), headers=headers)
+        resp = http_utils.request(
+            'POST',
+            url,
+            data=json.dumps(data),
+            headers=headers
+        )
 
         LOG.info("Webook request url=%s code=%s", url, resp.status_code)
 
@@ -15,6 +15,7 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+from mistral_lib.actions import types as ml_actions
 from oslo_config import cfg
 from oslo_log import log as logging
 from osprofiler import profiler
@@ -26,6 +27,7 @@ from mistral.event_engine import base as evt_eng
 from mistral.executors import base as exe
 from mistral.notifiers import base as notif
 from mistral.rpc import base
+from mistral.service import coordination
 
 
 LOG = logging.getLogger(__name__)
@@ -115,6 +117,25 @@ class EngineClient(eng.Engine):
         :param rpc_conf_dict: Dict containing RPC configuration.
         """
         self._client = base.get_rpc_client_driver()(rpc_conf_dict)
+        self._ring = None
+
+        if cfg.CONF.engine.execution_affinity:
+            self._ring = coordination.MemberRing(
+                'engine_group',
+                coordination.RPC_SERVER_CAPABILITY
+            )
+
+    def _get_target(self, wf_ex_id):
+        """Gets the engine owning the given workflow execution.
+
+        :param wf_ex_id: Workflow execution id.
+        :return: Name of the engine RPC server or None if the call can be
+            handled by any engine.
+        """
+        if not self._ring or not wf_ex_id:
+            return None
+
+        return self._ring.get_member(wf_ex_id)
 
     @base.wrap_messaging_exception
     def start_workflow(self, wf_identifier, wf_namespace='', wf_ex_id=None,
@@ -133,6 +154,7 @@ class EngineClient(eng.Engine):
         return self._client.sync_call(
             auth_ctx.ctx(),
             'start_workflow',
+            target=self._get_target(wf_ex_id),
             wf_identifier=wf_identifier,
             wf_namespace=wf_namespace,
             wf_ex_id=wf_ex_id,
@@ -164,7 +186,7 @@ class EngineClient(eng.Engine):
     @base.wrap_messaging_exception
     @profiler.trace('engine-client-on-action-complete', hide_args=True)
     def on_action_complete(self, action_ex_id, result, wf_action=False,
-                           async_=False):
+                           async_=False, wf_ex_id=None):
         """Conveys action result to Mistral Engine.
 
         This method should be used by clients of Mistral Engine to update
@@ -184,19 +206,58 @@ class EngineClient(eng.Engine):
             workflow.
         :param async_: If True, run action in asynchronous mode (w/o waiting
             for completion).
+        :param wf_ex_id: Id of the workflow execution that the action
+            belongs to. If given, synchronous calls are sent to the engine
+            owning the workflow execution. Asynchronous calls are sent to
+            any engine since nobody would notice that the owning engine is
+            gone and the result is lost.
         :return: Action(or workflow if wf_action=True) execution object.
         """
 
-        call = self._client.async_call if async_ else self._client.sync_call
+        if async_:
+            call = self._client.async_call
+            target = None
+        else:
+            call = self._client.sync_call
+            target = self._get_target(wf_ex_id)
 
         return call(
             auth_ctx.ctx(),
             'on_action_complete',
+            target=target,
             action_ex_id=action_ex_id,
             result=result,
             wf_action=wf_action
         )
 
+    @base.wrap_messaging_exception
+    @profiler.trace('engine-client-on-actions-complete', hide_args=True)
+    def on_actions_complete(self, completions):
+        """Conveys results of a batch of actions to Mistral Engine.
+
+        The request is sent asynchronously. Completions of the actions
+        that belong to the same workflow execution are processed by the
+        engine within one transaction.
+
+        :param completions: A list of dicts holding "action_ex_id" and
+            "result" of every completed action.
+        """
+
+        serializer = ml_actions.ResultSerializer()
+
+        return self._client.async_call(
+            auth_ctx.ctx(),
+            'on_actions_complete',
+            completions=[
+                {
+                    'action_ex_id': c['action_ex_id'],
+                    'result': serializer.serialize_to_dict(c['result']),
+                    'wf_action': c.get('wf_action', False)
+                }
+                for c in completions
+            ]
+        )
+
     @base.wrap_messaging_exception
     @profiler.trace('engine-client-on-action-update', hide_args=True)
     def on_action_update(self, action_ex_id, state, wf_action=False,
@@ -242,6 +303,7 @@ class EngineClient(eng.Engine):
         return self._client.sync_call(
             auth_ctx.ctx(),
             'pause_workflow',
+            target=self._get_target(wf_ex_id),
             wf_ex_id=wf_ex_id
         )
 
@@ -279,6 +341,7 @@ class EngineClient(eng.Engine):
         return self._client.sync_call(
             auth_ctx.ctx(),
             'resume_workflow',
+            target=self._get_target(wf_ex_id),
             wf_ex_id=wf_ex_id,
             env=env
         )
@@ -300,6 +363,7 @@ class EngineClient(eng.Engine):
         return self._client.sync_call(
             auth_ctx.ctx(),
             'stop_workflow',
+            target=self._get_target(wf_ex_id),
             wf_ex_id=wf_ex_id,
             state=state,
             message=message
@@ -317,6 +381,7 @@ class EngineClient(eng.Engine):
         return self._client.sync_call(
             auth_ctx.ctx(),
             'rollback_workflow',
+            target=self._get_target(wf_ex_id),
             wf_ex_id=wf_ex_id
         )
 
@@ -341,6 +406,25 @@ class ExecutorClient(exe.Executor):
 
         self.topic = cfg.CONF.executor.topic
         self._client = base.get_rpc_client_driver()(rpc_conf_dict)
+        self._capacity = None
+
+        if cfg.CONF.executor.capacity_routing:
+            self._capacity = coordination.MemberCapacity(
+                'executor_group',
+                coordination.RPC_SERVER_CAPABILITY
+            )
+
+    def _get_target(self, slots=1):
+        """Gets the executor with the most free slots.
+
+        :param slots: Number of actions sent to the executor.
+        :return: Name of the executor RPC server or None if the call can
+            be handled by any executor.
+        """
+        if not self._capacity:
+            return None
+
+        return self._capacity.get_member(slots)
 
     @profiler.trace('executor-client-run-action')
     def run_action(self, action_ex_id, action_cls_str, action_cls_attrs,
@@ -379,7 +463,37 @@ class ExecutorClient(exe.Executor):
         rpc_client_method = (self._client.async_call
                              if async_ else self._client.sync_call)
 
-        return rpc_client_method(auth_ctx.ctx(), 'run_action', **rpc_kwargs)
+        return rpc_client_method(
+            auth_ctx.ctx(),
+            'run_action',
+            target=self._get_target(),
+            **rpc_kwargs
+        )
+
+    @profiler.trace('executor-client-run-actions')
+    def run_actions(self, actions, target=None):
+        """Sends a request to run a batch of actions to executors.
+
+        Actions are sent in chunks limited by the "run_actions_batch_size"
+        option so that an executor receives and acknowledges many actions
+        with one message.
+
+        :param actions: A list of dicts holding the arguments of
+            run_action() for every action.
+        :param target: Target (group of action executors).
+        """
+
+        batch_size = cfg.CONF.executor.run_actions_batch_size
+
+        for i in range(0, len(actions), batch_size):
+            chunk = actions[i:i + batch_size]
+
+            self._client.async_call(
+                auth_ctx.ctx(),
+                'run_actions',
+                target=self._get_target(len(chunk)),
+                actions=chunk
+            )
 
 
 class EventEngineClient(evt_eng.EventEngine):
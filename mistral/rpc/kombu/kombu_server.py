@@ -60,6 +60,9 @@ class KombuRPCServer(rpc_base.RPCServer, kombu_base.Base):
         self._hosts = kombu_hosts.KombuHosts(CONF)
 
         self._executor_threads = CONF.executor_thread_pool_size
+        # The max number of messages being processed at a time. Messages
+        # are acknowledged once they have been processed.
+        self.prefetch_count = 1
         self.exchange = CONF.control_exchange
         # TODO(rakhmerov): We shouldn't rely on any properties related
         # to oslo.messaging. Only "transport_url" should matter.
@@ -125,7 +128,7 @@ class KombuRPCServer(rpc_base.RPCServer, kombu_base.Base):
                         queues=queue,
                         callbacks=[self._process_message],
                 ) as consumer:
-                    consumer.qos(prefetch_count=1)
+                    consumer.qos(prefetch_count=self.prefetch_count)
 
                     self._running.set()
                     self._stopped.clear()
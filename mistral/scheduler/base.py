@@ -13,9 +13,84 @@
 #    limitations under the License.
 
 import abc
+import random
+import threading
+
+import cachetools
+from oslo_utils import importutils
 import six
 
 
+# Serializers don't keep any state so one instance of every serializer
+# class is shared by all jobs.
+_SERIALIZER_CACHE = cachetools.LRUCache(maxsize=100)
+_SERIALIZER_CACHE_LOCK = threading.RLock()
+
+
+@cachetools.cached(_SERIALIZER_CACHE, lock=_SERIALIZER_CACHE_LOCK)
+def get_serializer(path):
+    """Returns a serializer by its class path.
+
+    :param path: Full path of a serializer class.
+    :return: Serializer instance (possibly a cached value).
+    """
+    return importutils.import_class(path)()
+
+
+class PollingDelay(object):
+    """Delay between polls of a scheduler store.
+
+    A poll that returns a full batch means that a backlog is building up
+    so the store is polled again right away. Every next poll in a row
+    that returns nothing doubles the delay, starting from the fixed delay,
+    until it reaches the max delay. Otherwise, or if the store couldn't
+    be polled, the fixed delay is used.
+    A random delay is added to every non-zero delay.
+    """
+
+    def __init__(self, fixed_delay, random_delay, max_delay=None):
+        self._fixed_delay = fixed_delay
+        self._random_delay = random_delay
+        self._max_delay = max(fixed_delay, max_delay or 0)
+
+        # The number of polls in a row that returned nothing.
+        self._idle_cnt = 0
+
+    def next(self, processed_cnt, batch_size=None):
+        """Gets the delay before the next poll.
+
+        :param processed_cnt: The number of items returned by the last poll
+            or None if the store hasn't been polled, e.g. due to an error.
+        :param batch_size: The max number of items returned by one poll or
+            None if it's not limited.
+        :return: Delay in seconds.
+        """
+        if processed_cnt is None:
+            self._idle_cnt = 0
+
+            delay = self._fixed_delay
+        elif processed_cnt:
+            self._idle_cnt = 0
+
+            if batch_size and processed_cnt >= batch_size:
+                return 0
+
+            delay = self._fixed_delay
+        else:
+            delay = min(
+                self._max_delay,
+                self._fixed_delay * 2 ** self._idle_cnt
+            )
+
+            if 0 < delay < self._max_delay:
+                self._idle_cnt += 1
+
+        return (
+            delay +
+            random.Random().randint(0, self._random_delay * 1000) * 0.001
+        )
+
+
 @six.add_metaclass(abc.ABCMeta)
 class Scheduler(object):
     """Scheduler interface.
@@ -43,7 +118,7 @@ class SchedulerJob(object):
     """
     def __init__(self, run_after=0, target_factory_func_name=None,
                  func_name=None, func_args=None,
-                 func_arg_serializers=None):
+                 func_arg_serializers=None, key=None):
         """Initializes a Scheduler Job.
 
         :param run_after: Amount of seconds after which to invoke
@@ -65,6 +140,9 @@ class SchedulerJob(object):
             Optional. Serializers must be specified only for those arguments
             whose values can't be saved into a persistent storage as is and
             they need to be converted first into a value of a primitive type.
+        :param key: Key used for squashing similar jobs. If there's a pending
+            job with the same key, function and arguments that is due no
+            later than this one then this job isn't scheduled. Optional.
 
         """
 
@@ -76,3 +154,4 @@ class SchedulerJob(object):
         self.func_name = func_name
         self.func_args = func_args or {}
         self.func_arg_serializers = func_arg_serializers
+        self.key = key
@@ -12,10 +12,9 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
-import copy
 import datetime
 import eventlet
-import random
+import functools
 import sys
 import threading
 
@@ -28,6 +27,7 @@ from mistral.db import utils as db_utils
 from mistral.db.v2 import api as db_api
 from mistral import exceptions as exc
 from mistral.scheduler import base
+from mistral.scheduler import timer_wheel
 
 
 LOG = logging.getLogger(__name__)
@@ -36,15 +36,23 @@ CONF = cfg.CONF
 
 
 class DefaultScheduler(base.Scheduler):
-    def __init__(self, fixed_delay, random_delay, batch_size):
-        self._fixed_delay = fixed_delay
-        self._random_delay = random_delay
+    def __init__(self, fixed_delay, random_delay, batch_size,
+                 max_delay=None):
+        self._delay = base.PollingDelay(fixed_delay, random_delay, max_delay)
         self._batch_size = batch_size
 
         # Dictionary containing {GreenThread: ScheduledJob} pairs that
         # represent in-memory jobs.
         self.memory_jobs = {}
 
+        # Timing wheel keeping short in-memory jobs so that they don't
+        # need a green thread each.
+        self._timer_wheel = timer_wheel.TimerWheel()
+
+        # Pool of green threads invoking jobs captured from Job Store.
+        self._job_pool = eventlet.GreenPool(CONF.scheduler.job_pool_size)
+        self._job_timeout = CONF.scheduler.job_timeout
+
         self._job_store_checker_thread = threading.Thread(
             target=self._job_store_checker
         )
@@ -52,25 +60,39 @@ class DefaultScheduler(base.Scheduler):
 
         self._stopped = True
 
+        # Numbers of jobs captured from Job Store by this scheduler, jobs
+        # that were selected but captured by other schedulers and jobs
+        # squashed into similar pending jobs.
+        self._stats = {'captured': 0, 'contended': 0, 'coalesced': 0}
+
     def start(self):
         self._stopped = False
 
+        if CONF.scheduler.timer_wheel_max_delay > 0:
+            self._timer_wheel.start()
+
         self._job_store_checker_thread.start()
 
     def stop(self, graceful=False):
         self._stopped = True
 
+        self._timer_wheel.stop()
+
         if graceful:
             self._job_store_checker_thread.join()
 
+            self._job_pool.waitall()
+
     def _job_store_checker(self):
         while not self._stopped:
             LOG.debug(
                 "Starting Scheduler Job Store checker [scheduler=%s]...", self
             )
 
+            captured_cnt = batch_size = None
+
             try:
-                self._process_store_jobs()
+                captured_cnt, batch_size = self._process_store_jobs()
             except Exception:
                 LOG.exception(
                     "Scheduler failed to process delayed calls"
@@ -84,39 +106,115 @@ class DefaultScheduler(base.Scheduler):
                 if sys.version_info < (3,):
                     sys.exc_clear()
 
-            eventlet.sleep(
-                self._fixed_delay +
-                random.Random().randint(0, self._random_delay * 1000) * 0.001
-            )
+            delay = self._delay.next(captured_cnt, batch_size)
+
+            if delay:
+                eventlet.sleep(delay)
+            else:
+                # Let other green threads run.
+                eventlet.sleep()
 
     def _process_store_jobs(self):
+        """Captures due jobs from Job Store and invokes them.
+
+        :return: A tuple (captured_cnt, batch_size) where batch_size is
+            the max number of jobs that could be captured. Both values
+            are None if all green threads of the pool are busy.
+        """
+        # Don't capture more jobs than can be invoked right away. Jobs that
+        # are still running don't prevent capturing new ones so a slow job
+        # doesn't delay the jobs that become due after it.
+        free_cnt = self._job_pool.free()
+
+        if not free_cnt:
+            return None, None
+
+        batch_size = (
+            min(self._batch_size, free_cnt) if self._batch_size else free_cnt
+        )
+
         # Select and capture eligible jobs.
         with db_api.transaction():
-            candidate_jobs = db_api.get_scheduled_jobs_to_start(
-                datetime.datetime.now(),
-                self._batch_size
-            )
+            now = datetime.datetime.now()
 
-            captured_jobs = [
-                job for job in candidate_jobs
-                if self._capture_scheduled_job(job)
-            ]
+            if CONF.scheduler.job_capture_mode == 'batch':
+                captured_jobs = db_api.capture_scheduled_jobs_to_start(
+                    now,
+                    now,
+                    batch_size
+                )
+
+                self._stats['captured'] += len(captured_jobs)
+            else:
+                candidate_jobs = db_api.get_scheduled_jobs_to_start(
+                    now,
+                    batch_size
+                )
 
-        # Invoke and delete scheduled jobs.
+                captured_jobs = self._capture_scheduled_jobs(candidate_jobs)
+
+        # Invoke and delete scheduled jobs in parallel.
         for job in captured_jobs:
-            auth_ctx, func, func_args = self._prepare_job(job)
+            self._job_pool.spawn_n(self._process_store_job, job)
 
-            self._invoke_job(auth_ctx, func, func_args)
+        return len(captured_jobs), batch_size
 
+    def _process_store_job(self, job):
+        try:
+            self._invoke_store_job(job)
+        except Exception:
+            LOG.exception(
+                "Failed to process a scheduled job [job_id=%s, func_name=%s]",
+                job.id,
+                job.func_name
+            )
+
+    def _invoke_store_job(self, job):
+        auth_ctx, func, func_args = self._prepare_job(job)
+
+        try:
+            with eventlet.Timeout(self._job_timeout):
+                self._invoke_job(auth_ctx, func, func_args)
+        except eventlet.Timeout:
+            # Keep the job in Job Store, it will be captured again
+            # after the captured job timeout.
+            LOG.warning(
+                "Scheduled job didn't complete in %s seconds and was"
+                " interrupted [job_id=%s, func_name=%s]",
+                self._job_timeout,
+                job.id,
+                job.func_name
+            )
+
+            return
+
+        try:
             self._delete_scheduled_job(job)
+        except Exception:
+            LOG.exception(
+                "Failed to delete a scheduled job [job_id=%s]", job.id
+            )
 
     def schedule(self, job, allow_redistribute=False):
-        scheduled_job = DefaultScheduler._persist_job(job)
+        values = DefaultScheduler._get_job_values(job)
 
-        self._schedule_in_memory(job.run_after, scheduled_job)
+        if self._coalesce_job(values):
+            return
+
+        scheduled_job = db_api.create_scheduled_job(values)
+
+        # The job must not be processed before the transaction that
+        # persisted it is committed.
+        db_api.add_after_commit_callback(
+            functools.partial(
+                self._schedule_in_memory,
+                job.run_after,
+                scheduled_job
+            )
+        )
 
     @classmethod
-    def _persist_job(cls, job):
+    def _get_job_values(cls, job):
         ctx_serializer = context.RpcContextSerializer()
 
         ctx = (
@@ -138,7 +236,7 @@ class DefaultScheduler(base.Scheduler):
                         " not found in func_args=%s"
                         % (arg_name, args))
                 try:
-                    serializer = importutils.import_class(serializer_path)()
+                    serializer = base.get_serializer(serializer_path)
                 except ImportError as e:
                     raise ImportError(
                         "Cannot import class %s: %s" % (serializer_path, e)
@@ -154,12 +252,81 @@ class DefaultScheduler(base.Scheduler):
             'func_arg_serializers': arg_serializers,
             'auth_ctx': ctx,
             'execute_at': execute_at,
-            'captured_at': None
+            'captured_at': None,
+            'key': job.key
         }
 
-        return db_api.create_scheduled_job(values)
+        return values
+
+    @staticmethod
+    def _is_same_job(scheduled_job, values):
+        return (
+            scheduled_job.target_factory_func_name ==
+            values['target_factory_func_name'] and
+            scheduled_job.func_name == values['func_name'] and
+            scheduled_job.func_args == values['func_args']
+        )
+
+    def _coalesce_job(self, values):
+        """Squashes a job into a similar pending job, if any.
+
+        Only the earliest pending job per key is kept: if a pending job
+        with the same key is due no later than the new one then the new
+        one is not needed, otherwise the pending job gets deleted.
+
+        :param values: Values of a new scheduled job.
+        :return: True if the new job has been squashed and must not be
+            persisted, False otherwise.
+        """
+        key = values['key']
+
+        if not key or not CONF.scheduler.coalesce_calls:
+            return False
+
+        coalesced = False
+
+        pending_jobs = db_api.get_scheduled_jobs(key=key, captured_at=None)
+
+        for scheduled_job in pending_jobs:
+            if not self._is_same_job(scheduled_job, values):
+                continue
+
+            if not coalesced and (scheduled_job.execute_at <=
+                                  values['execute_at']):
+                # Updating the job locks it until the current transaction
+                # ends so other schedulers can't capture it before the
+                # changes that caused the new job are committed. If the job
+                # has just been captured it can't be used anymore.
+                _, updated_cnt = db_api.update_scheduled_job(
+                    id=scheduled_job.id,
+                    values={'captured_at': None},
+                    query_filter={'captured_at': None}
+                )
+
+                coalesced = updated_cnt == 1
+            elif db_api.delete_scheduled_jobs(id=scheduled_job.id,
+                                              captured_at=None):
+                # The pending job is either later than the new one or
+                # redundant, it's superseded.
+                self._stats['coalesced'] += 1
+
+        if coalesced:
+            self._stats['coalesced'] += 1
+
+            LOG.debug("Scheduled job has been coalesced [key=%s]", key)
+
+        return coalesced
 
     def _schedule_in_memory(self, run_after, scheduled_job):
+        use_timer_wheel = (
+            self._timer_wheel.is_running() and
+            run_after <= CONF.scheduler.timer_wheel_max_delay
+        )
+
+        if use_timer_wheel and self._timer_wheel.schedule(
+                run_after, self._process_memory_job, scheduled_job):
+            return
+
         green_thread = eventlet.spawn_after(
             run_after,
             self._process_memory_job,
@@ -171,10 +338,9 @@ class DefaultScheduler(base.Scheduler):
     def _process_memory_job(self, scheduled_job):
         # 1. Capture the job in Job Store.
         if not self._capture_scheduled_job(scheduled_job):
-            LOG.warning(
-                "Unable to capture a scheduled job [scheduled_job=%s]",
-                scheduled_job
-            )
+            self._log_not_captured(scheduled_job)
+
+            self.memory_jobs.pop(eventlet.getcurrent(), None)
 
             return
 
@@ -189,8 +355,70 @@ class DefaultScheduler(base.Scheduler):
         # TODO(rakhmerov):
         # 3.1 What do we do if invocation wasn't successful?
 
-        # Delete from a local collection of in-memory jobs.
-        del self.memory_jobs[eventlet.getcurrent()]
+        # Delete from a local collection of in-memory jobs. Jobs kept
+        # by the timing wheel are not there.
+        self.memory_jobs.pop(eventlet.getcurrent(), None)
+
+    @staticmethod
+    def _log_not_captured(scheduled_job):
+        try:
+            db_api.get_scheduled_job(scheduled_job.id)
+        except exc.DBEntityNotFoundError:
+            # The job has been superseded by a similar job or already
+            # processed by another scheduler, that's normal.
+            LOG.debug(
+                "Scheduled job doesn't exist anymore [job_id=%s]",
+                scheduled_job.id
+            )
+
+            return
+
+        LOG.warning(
+            "Unable to capture a scheduled job [scheduled_job=%s]",
+            scheduled_job
+        )
+
+    def _capture_scheduled_jobs(self, scheduled_jobs):
+        """Captures a batch of scheduled jobs selected from Job Store.
+
+        :param scheduled_jobs: Jobs.
+        :return: A list of jobs that have been captured.
+        """
+        if not scheduled_jobs:
+            return []
+
+        if CONF.scheduler.job_capture_mode == 'per_job':
+            captured_jobs = [
+                job for job in scheduled_jobs
+                if self._capture_scheduled_job(job)
+            ]
+        else:
+            captured_ids = set(
+                db_api.capture_scheduled_jobs(
+                    [job.id for job in scheduled_jobs],
+                    datetime.datetime.now()
+                )
+            )
+
+            captured_jobs = [
+                job for job in scheduled_jobs if job.id in captured_ids
+            ]
+
+        contended_cnt = len(scheduled_jobs) - len(captured_jobs)
+
+        self._stats['captured'] += len(captured_jobs)
+        self._stats['contended'] += contended_cnt
+
+        LOG.debug(
+            "Scheduler captured %s scheduled jobs, %s jobs were captured"
+            " by other schedulers.", len(captured_jobs), contended_cnt
+        )
+
+        return captured_jobs
+
+    def get_stats(self):
+        """Returns numbers of captured, contended and coalesced jobs."""
+        return dict(self._stats)
 
     @staticmethod
     def _capture_scheduled_job(scheduled_job):
@@ -244,7 +472,10 @@ class DefaultScheduler(base.Scheduler):
             scheduled_job.func_args
         )
 
-        auth_ctx = copy.deepcopy(scheduled_job.auth_ctx)
+        # The job is deleted or captured again from DB after invocation
+        # so its values are never reused. Shallow copies are enough to
+        # keep them unchanged while the job object is still alive.
+        auth_ctx = dict(scheduled_job.auth_ctx)
 
         if scheduled_job.target_factory_func_name:
             factory = importutils.import_class(
@@ -255,14 +486,14 @@ class DefaultScheduler(base.Scheduler):
         else:
             func = importutils.import_class(scheduled_job.func_name)
 
-        args = copy.deepcopy(scheduled_job.func_args)
+        args = dict(scheduled_job.func_args)
 
         serializers_dict = scheduled_job.func_arg_serializers
 
         if serializers_dict:
             # Deserialize arguments.
             for arg_name, ser_path in serializers_dict.items():
-                serializer = importutils.import_class(ser_path)()
+                serializer = base.get_serializer(ser_path)
 
                 deserialized = serializer.deserialize(args[arg_name])
 
@@ -0,0 +1,177 @@
+# Copyright 2019 - Nokia Networks.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import math
+import threading
+import time
+
+import eventlet
+from oslo_log import log as logging
+
+
+LOG = logging.getLogger(__name__)
+
+
+class TimerWheel(object):
+    """Hierarchical timing wheel.
+
+    Keeps short delayed calls in memory. Every level of the wheel is a
+    ring of slots, a slot of a level spans a full revolution of the
+    previous level. Calls are placed into the lowest level that can hold
+    their delay and get cascaded down as the wheel turns so that both
+    scheduling and expiring a call take constant time regardless of how
+    many calls are pending.
+
+    Calls are invoked in separate green threads.
+    """
+
+    def __init__(self, tick=0.1, wheel_sizes=(100, 6)):
+        """Initializes a timing wheel.
+
+        :param tick: Duration of one tick of the lowest level, in seconds.
+        :param wheel_sizes: Numbers of slots of the levels starting from
+            the lowest one. The max delay the wheel can hold equals
+            tick multiplied by all the sizes.
+        """
+        self._tick = tick
+        self._sizes = wheel_sizes
+        self._wheels = [[[] for _ in range(size)] for size in wheel_sizes]
+
+        self._max_ticks = 1
+
+        for size in wheel_sizes:
+            self._max_ticks *= size
+
+        self._ticks = 0
+        self._started_at = None
+        self._stopped = True
+        self._thread = None
+        self._mutex = threading.Lock()
+
+    @property
+    def max_delay(self):
+        return self._tick * (self._max_ticks - 1)
+
+    def start(self):
+        self._started_at = time.time()
+        self._stopped = False
+
+        self._thread = eventlet.spawn(self._loop)
+
+    def stop(self):
+        self._stopped = True
+
+        if self._thread:
+            self._thread.kill()
+            self._thread = None
+
+    def is_running(self):
+        return not self._stopped
+
+    def schedule(self, delay, func, *args, **kwargs):
+        """Schedules a call.
+
+        :param delay: Delay in seconds.
+        :param func: Function to call.
+        :return: True if the call has been scheduled, False if the delay
+            is too long for the wheel.
+        """
+        if delay > self.max_delay:
+            return False
+
+        if delay <= 0:
+            eventlet.spawn_n(self._invoke, func, args, kwargs)
+
+            return True
+
+        with self._mutex:
+            # Ticks are counted from the moment the wheel started so the
+            # expiration tick is calculated from the current time rather
+            # than from the last tick, the call is never invoked early.
+            expires = max(
+                self._ticks + 1,
+                int(math.ceil(
+                    (time.time() - self._started_at + delay) / self._tick
+                ))
+            )
+
+            self._place((expires, func, args, kwargs))
+
+        return True
+
+    def _place(self, entry):
+        remaining = entry[0] - self._ticks
+        span = 1
+
+        for level, size in enumerate(self._sizes):
+            if remaining < span * size or level == len(self._sizes) - 1:
+                self._wheels[level][(entry[0] // span) % size].append(entry)
+
+                return
+
+            span *= size
+
+    def _advance(self):
+        """Moves the wheel one tick forward and returns expired calls."""
+        self._ticks += 1
+
+        span = 1
+
+        # Cascade the calls of the upper levels whenever a lower level
+        # completes a revolution.
+        for level, size in enumerate(self._sizes[:-1]):
+            span *= size
+
+            if self._ticks % span:
+                break
+
+            upper_size = self._sizes[level + 1]
+            slot = self._wheels[level + 1][(self._ticks // span) % upper_size]
+
+            entries = slot[:]
+
+            del slot[:]
+
+            for entry in entries:
+                self._place(entry)
+
+        slot = self._wheels[0][self._ticks % self._sizes[0]]
+
+        expired = [e for e in slot if e[0] <= self._ticks]
+
+        slot[:] = [e for e in slot if e[0] > self._ticks]
+
+        return expired
+
+    def _loop(self):
+        while not self._stopped:
+            eventlet.sleep(self._tick)
+
+            target_ticks = int((time.time() - self._started_at) / self._tick)
+
+            expired = []
+
+            with self._mutex:
+                while self._ticks < target_ticks:
+                    expired.extend(self._advance())
+
+            for _, func, args, kwargs in expired:
+                eventlet.spawn_n(self._invoke, func, args, kwargs)
+
+    @staticmethod
+    def _invoke(func, args, kwargs):
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            LOG.exception("Timer wheel call failed [func=%s]", func)
@@ -12,6 +12,9 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import threading
+import time
+
 import six
 
 from oslo_concurrency import lockutils
@@ -20,6 +23,7 @@ from oslo_log import log
 from oslo_service import threadgroup
 import tenacity
 import tooz.coordination
+from tooz import hashring
 
 from mistral import utils
 
@@ -28,6 +32,10 @@ LOG = log.getLogger(__name__)
 
 _SERVICE_COORDINATOR = None
 
+# Name of the member capability holding the name of the RPC server
+# of the member.
+RPC_SERVER_CAPABILITY = 'rpc_server'
+
 
 class ServiceCoordinator(object):
     """Service coordinator.
@@ -75,6 +83,10 @@ class ServiceCoordinator(object):
             self._coordinator = None
             self._started = False
 
+    @property
+    def my_id(self):
+        return self._my_id
+
     def is_active(self):
         return self._coordinator and self._started
 
@@ -156,6 +168,44 @@ class ServiceCoordinator(object):
 
             return []
 
+    def update_capabilities(self, group_id, capabilities):
+        """Publishes capabilities of this member of coordination group.
+
+        ToozError exception must be handled when this function is invoked,
+        we leave it to the invoker for the handling decision.
+        """
+        if not self.is_active():
+            return
+
+        self._coordinator.update_capabilities(group_id, capabilities).get()
+
+    def get_members_capabilities(self, group_id):
+        """Gets capabilities of members of coordination group.
+
+        ToozError exception must be handled when this function is invoked,
+        we leave it to the invoker for the handling decision.
+
+        :return: A dict mapping member ids to their capabilities.
+        """
+        if not self.is_active():
+            return {}
+
+        requests = {
+            m: self._coordinator.get_member_capabilities(group_id, m)
+            for m in self.get_members(group_id)
+        }
+
+        capabilities = {}
+
+        for member, req in requests.items():
+            try:
+                capabilities[member] = req.get()
+            except tooz.coordination.MemberNotJoined:
+                # The member has just left the group.
+                pass
+
+        return capabilities
+
 
 def cleanup_service_coordinator():
     """Intends to be used by tests to recreate service coordinator."""
@@ -175,6 +225,195 @@ def get_service_coordinator(my_id=None):
     return _SERVICE_COORDINATOR
 
 
+def advertise_rpc_server(group_id, server_id):
+    """Publishes the name of the RPC server of this group member.
+
+    :param group_id: Coordination group id.
+    :param server_id: Name of the RPC server.
+    """
+    try:
+        get_service_coordinator().update_capabilities(
+            group_id,
+            {RPC_SERVER_CAPABILITY: server_id}
+        )
+    except tooz.coordination.ToozError as e:
+        LOG.warning(
+            'Failed to advertise RPC server of group %s member: %s',
+            group_id,
+            six.text_type(e)
+        )
+
+
+class MemberRing(object):
+    """Consistent hash ring over members of a coordination group.
+
+    Maps keys (e.g. workflow execution ids) to group members. When a member
+    joins or leaves the group only the keys owned by this member move to
+    other members. Group members are fetched from the coordination backend
+    at most once per heartbeat interval.
+
+    If a capability name is given, the ring is built over the values of
+    this capability of the members rather than over member ids, e.g. over
+    RPC servers that several members may share.
+    """
+
+    def __init__(self, group_id, capability=None):
+        self._group_id = group_id
+        self._capability = capability
+        self._members = set()
+        self._ring = None
+        self._refreshed_at = None
+
+    def get_member(self, key):
+        """Gets id of the member owning the given key.
+
+        :param key: Key.
+        :return: Member id or None if the group has no members or
+            the coordination backend is not available.
+        """
+        self._refresh()
+
+        if not self._ring:
+            return None
+
+        member = self._ring.get_nodes(key.encode('utf-8')).pop()
+
+        return member.decode('utf-8') if isinstance(member, bytes) else member
+
+    def _refresh(self):
+        now = time.time()
+        interval = cfg.CONF.coordination.heartbeat_interval
+
+        if self._refreshed_at is not None and \
+                now - self._refreshed_at < interval:
+            return
+
+        self._refreshed_at = now
+
+        try:
+            members = self._get_members()
+        except tooz.coordination.ToozError as e:
+            LOG.warning(
+                'Failed to get members of group %s: %s',
+                self._group_id,
+                six.text_type(e)
+            )
+
+            members = set()
+
+        if members != self._members:
+            LOG.info(
+                'Members of group %s changed: %s',
+                self._group_id,
+                members
+            )
+
+            self._members = members
+            self._ring = hashring.HashRing(members) if members else None
+
+    def _get_members(self):
+        coordinator = get_service_coordinator()
+
+        if not self._capability:
+            return set(coordinator.get_members(self._group_id))
+
+        capabilities = coordinator.get_members_capabilities(self._group_id)
+
+        return set(
+            c[self._capability] for c in capabilities.values()
+            if isinstance(c, dict) and c.get(self._capability)
+        )
+
+
+class MemberCapacity(object):
+    """Free capacity advertised by members of a coordination group.
+
+    Members publish the number of their free slots, i.e. how many more
+    requests they can handle right away, as their capabilities. The
+    capabilities are fetched from the coordination backend at most once
+    per heartbeat interval. Every member picked in between takes slots
+    from the fetched numbers so that requests are spread over members
+    until the next refresh.
+
+    If a capability name is given, free slots of the members with the same
+    value of this capability, e.g. sharing an RPC server, are summed up and
+    this value is returned instead of a member id.
+    """
+
+    def __init__(self, group_id, capability=None):
+        self._group_id = group_id
+        self._capability = capability
+        self._free_slots = {}
+        self._refreshed_at = None
+        self._lock = threading.Lock()
+
+    def get_member(self, slots=1):
+        """Gets id of the member with the most free slots.
+
+        :param slots: Number of slots taken by the request.
+        :return: Member id or None if no member has free slots or
+            the coordination backend is not available.
+        """
+        self._refresh()
+
+        with self._lock:
+            if not self._free_slots:
+                return None
+
+            member, free_slots = max(
+                self._free_slots.items(),
+                key=lambda item: item[1]
+            )
+
+            if free_slots <= 0:
+                return None
+
+            self._free_slots[member] = free_slots - slots
+
+        return member.decode('utf-8') if isinstance(member, bytes) else member
+
+    def _refresh(self):
+        now = time.time()
+        interval = cfg.CONF.coordination.heartbeat_interval
+
+        with self._lock:
+            if self._refreshed_at is not None and \
+                    now - self._refreshed_at < interval:
+                return
+
+            self._refreshed_at = now
+
+        try:
+            capabilities = get_service_coordinator().get_members_capabilities(
+                self._group_id
+            )
+        except tooz.coordination.ToozError as e:
+            LOG.warning(
+                'Failed to get capabilities of group %s: %s',
+                self._group_id,
+                six.text_type(e)
+            )
+
+            capabilities = {}
+
+        free_slots = {}
+
+        for m, c in capabilities.items():
+            if not isinstance(c, dict) or 'free_slots' not in c:
+                continue
+
+            if self._capability:
+                m = c.get(self._capability)
+
+                if not m:
+                    continue
+
+            free_slots[m] = free_slots.get(m, 0) + c['free_slots']
+
+        with self._lock:
+            self._free_slots = free_slots
+
+
 class Service(object):
     def __init__(self, group_type):
         self.group_type = group_type
@@ -20,7 +20,6 @@ from mistral.engine import action_handler
 from mistral.engine import action_queue
 from mistral.services import scheduler
 from mistral import utils
-from mistral_lib import actions as mistral_lib
 from oslo_config import cfg
 from oslo_log import log as logging
 
@@ -49,11 +48,11 @@ def handle_expired_actions():
             if action_exs:
                 LOG.info("Actions executions to transit to error, because "
                          "heartbeat wasn't received: {}".format(action_exs))
-                for action_ex in action_exs:
-                    result = mistral_lib.Result(
-                        error="Heartbeat wasn't received."
-                    )
-                    action_handler.on_action_complete(action_ex, result)
+
+                action_handler.fail_running_actions(
+                    action_exs,
+                    "Heartbeat wasn't received."
+                )
     finally:
         schedule(interval)
 
@@ -14,13 +14,15 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
-import copy
 import datetime
 import eventlet
+import functools
+import heapq
 import random
 import sys
 import threading
 
+from eventlet import event
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import importutils
@@ -29,6 +31,9 @@ from mistral import context
 from mistral.db import utils as db_utils
 from mistral.db.v2 import api as db_api
 from mistral import exceptions as exc
+from mistral.scheduler import base as sched_base
+from mistral.scheduler import timer_wheel
+from mistral.service import coordination
 
 
 LOG = logging.getLogger(__name__)
@@ -38,6 +43,24 @@ CONF = cfg.CONF
 # All schedulers.
 _schedulers = set()
 
+# Timing wheel keeping short delayed calls scheduled by this process.
+_timer_wheel = None
+
+# The max number of execution times that a scheduler keeps to poll
+# no later than they come.
+_MAX_WAKEUP_TIMES = 1000
+
+# Number of delayed calls squashed into already pending calls.
+_stats = {'coalesced': 0}
+
+# Consistent hash ring distributing shards of delayed calls between
+# engines.
+_shard_ring = None
+
+# Shards of delayed calls owned by this process or None if it owns all
+# shards. Updated by the schedulers of this process.
+_own_shards = None
+
 
 def schedule_call(factory_method_path, target_method_name,
                   run_after, serializers=None, key=None, **method_args):
@@ -57,8 +80,9 @@ def schedule_call(factory_method_path, target_method_name,
         { "result": "mistral.utils.serializer.ResultSerializer"}
         Serializer for the object type must implement serializer interface
         in mistral/utils/serializer.py
-    :param key: Key which can potentially be used for squashing similar
-        delayed calls.
+    :param key: Key used for squashing similar delayed calls. If there's
+        a pending call with the same key, target method and arguments that
+        is due no later than this one then this call isn't scheduled.
     :param method_args: Target method keyword arguments.
     """
     ctx_serializer = context.RpcContextSerializer()
@@ -68,8 +92,21 @@ def schedule_call(factory_method_path, target_method_name,
         if context.has_ctx() else {}
     )
 
-    execution_time = (datetime.datetime.now() +
-                      datetime.timedelta(seconds=run_after))
+    in_memory = _can_schedule_in_memory(run_after)
+
+    due_time = (datetime.datetime.now() +
+                datetime.timedelta(seconds=run_after))
+
+    execution_time = due_time
+
+    if in_memory:
+        # The call is still persisted so that it doesn't get lost if
+        # this process crashes. But other schedulers can pick it up
+        # only after the pickup period, normally it's processed by
+        # the timing wheel of this process.
+        execution_time += datetime.timedelta(
+            seconds=CONF.scheduler.pickup_job_after
+        )
 
     if serializers:
         for arg_name, serializer_path in serializers.items():
@@ -79,7 +116,7 @@ def schedule_call(factory_method_path, target_method_name,
                     " not found in method_args=%s"
                     % (arg_name, method_args))
             try:
-                serializer = importutils.import_class(serializer_path)()
+                serializer = sched_base.get_serializer(serializer_path)
             except ImportError as e:
                 raise ImportError(
                     "Cannot import class %s: %s" % (serializer_path, e)
@@ -91,40 +128,267 @@ def schedule_call(factory_method_path, target_method_name,
         'factory_method_path': factory_method_path,
         'target_method_name': target_method_name,
         'execution_time': execution_time,
+        'due_time': due_time,
         'auth_context': ctx,
         'serializers': serializers,
         'key': key,
         'method_arguments': method_args,
-        'processing': False
+        'processing': False,
+        'shard': _get_shard()
     }
 
-    db_api.create_delayed_call(values)
+    if _coalesce_delayed_call(values):
+        return
+
+    delayed_call = db_api.create_delayed_call(values)
+
+    if in_memory:
+        # The call must not be processed before the transaction that
+        # created it is committed.
+        db_api.add_after_commit_callback(
+            functools.partial(
+                _timer_wheel.schedule,
+                run_after,
+                _process_memory_call,
+                delayed_call
+            )
+        )
+    elif _schedulers:
+        db_api.add_after_commit_callback(
+            functools.partial(_wakeup_schedulers, execution_time)
+        )
+
+
+def _wakeup_schedulers(execution_time):
+    for sched in list(_schedulers):
+        sched.wakeup(execution_time)
+
+
+def _is_same_call(delayed_call, values):
+    return (
+        delayed_call.factory_method_path == values['factory_method_path'] and
+        delayed_call.target_method_name == values['target_method_name'] and
+        delayed_call.method_arguments == values['method_arguments']
+    )
+
+
+def _coalesce_delayed_call(values):
+    """Squashes a delayed call into a similar pending call, if any.
+
+    Only the earliest pending call per key is kept: if a pending call
+    with the same key is due no later than the new one then the new one
+    is not needed, otherwise the pending call gets deleted.
+
+    :param values: Values of a new delayed call.
+    :return: True if the new call has been squashed and must not be
+        created, False otherwise.
+    """
+    key = values['key']
+
+    if not key or not CONF.scheduler.coalesce_calls:
+        return False
+
+    coalesced = False
+
+    for delayed_call in db_api.get_delayed_calls(key=key, processing=False):
+        if not _is_same_call(delayed_call, values):
+            continue
+
+        # Execution time of calls processed from memory is shifted, the
+        # calls need to be compared by the time they're actually due.
+        due_time = delayed_call.due_time or delayed_call.execution_time
+
+        if not coalesced and due_time <= values['due_time']:
+            # Updating the call locks it until the current transaction
+            # ends so other schedulers can't capture it before the changes
+            # that caused the new call are committed. If the call has just
+            # been captured it can't be used anymore.
+            _, updated_cnt = db_api.update_delayed_call(
+                id=delayed_call.id,
+                values={'processing': False},
+                query_filter={'processing': False}
+            )
+
+            coalesced = updated_cnt == 1
+        elif db_api.delete_delayed_calls(id=delayed_call.id,
+                                         processing=False):
+            # The pending call is either later than the new one or
+            # redundant, it's superseded.
+            _stats['coalesced'] += 1
+
+    if coalesced:
+        _stats['coalesced'] += 1
+
+        LOG.debug("Delayed call has been coalesced [key=%s]", key)
+
+    return coalesced
+
+
+def _get_shard():
+    # Calls are put into shards of the process that scheduled them so
+    # that its scheduler picks them up if they are lost from memory.
+    if _own_shards:
+        return random.choice(_own_shards)
+
+    return random.randrange(CONF.scheduler.shard_count)
+
+
+def _update_own_shards():
+    """Updates the shards of delayed calls owned by this process.
+
+    :return: A list of shards or None if this process owns all shards.
+    """
+    global _shard_ring
+    global _own_shards
+
+    shard_cnt = CONF.scheduler.shard_count
+
+    if shard_cnt <= 1:
+        _own_shards = None
+
+        return _own_shards
+
+    if not _shard_ring:
+        _shard_ring = coordination.MemberRing('engine_group')
+
+    owners = [_shard_ring.get_member(str(s)) for s in range(shard_cnt)]
+
+    if not any(owners):
+        # Engines aren't coordinated.
+        _own_shards = None
+    else:
+        my_id = coordination.get_service_coordinator().my_id
+
+        _own_shards = [s for s, owner in enumerate(owners) if owner == my_id]
+
+    return _own_shards
+
+
+def get_stats():
+    """Returns the number of delayed calls coalesced by this process."""
+    return dict(_stats)
+
+
+def _can_schedule_in_memory(run_after):
+    return (
+        _timer_wheel is not None and
+        _timer_wheel.is_running() and
+        run_after <= min(
+            CONF.scheduler.timer_wheel_max_delay,
+            _timer_wheel.max_delay
+        )
+    )
+
+
+@db_utils.retry_on_db_error
+def _capture_memory_call(delayed_call):
+    with db_api.transaction():
+        # Same as the polling path the call is marked as being processed
+        # and deleted only after it has been invoked. If nothing has been
+        # updated then the call has been captured by another scheduler
+        # that picked it up from DB.
+        _, updated_cnt = db_api.update_delayed_call(
+            id=delayed_call.id,
+            values={'processing': True},
+            query_filter={'processing': False}
+        )
+
+        return updated_cnt == 1
+
+
+def _process_memory_call(delayed_call):
+    if not _capture_memory_call(delayed_call):
+        LOG.debug(
+            "Delayed call has already been captured by another scheduler"
+            " [call_id=%s]", delayed_call.id
+        )
+
+        return
+
+    Scheduler._invoke_calls(Scheduler._prepare_calls([delayed_call]))
+
+    Scheduler.delete_calls([delayed_call])
 
 
 class Scheduler(object):
-    def __init__(self, fixed_delay, random_delay, batch_size):
+    def __init__(self, fixed_delay, random_delay, batch_size,
+                 max_delay=None):
         self._stopped = False
         self._thread = threading.Thread(target=self._loop)
         self._thread.daemon = True
-        self._fixed_delay = fixed_delay
-        self._random_delay = random_delay
+        self._delay = sched_base.PollingDelay(
+            fixed_delay,
+            random_delay,
+            max_delay
+        )
         self._batch_size = batch_size
 
+        # Execution times of delayed calls persisted by this process,
+        # as a heap. The scheduler polls no later than the earliest one.
+        self._wakeup_times = []
+        self._wakeup_event = event.Event()
+
     def start(self):
         self._thread.start()
 
     def stop(self, graceful=False):
         self._stopped = True
 
+        self._wake()
+
         if graceful:
             self._thread.join()
 
+    def wakeup(self, execution_time):
+        """Makes the scheduler poll no later than the given time.
+
+        :param execution_time: Execution time of a persisted delayed call.
+        """
+        if len(self._wakeup_times) >= _MAX_WAKEUP_TIMES:
+            # The call will be picked up by a regular poll.
+            return
+
+        heapq.heappush(self._wakeup_times, execution_time)
+
+        self._wake()
+
+    def _wake(self):
+        if not self._wakeup_event.ready():
+            self._wakeup_event.send()
+
+    def _wait(self, delay):
+        # Calls due within a second are captured by a poll.
+        ahead = datetime.timedelta(seconds=1)
+
+        poll_at = datetime.datetime.now() + datetime.timedelta(seconds=delay)
+
+        while not self._stopped:
+            if self._wakeup_times:
+                poll_at = min(poll_at, self._wakeup_times[0] - ahead)
+
+            timeout = (poll_at - datetime.datetime.now()).total_seconds()
+
+            if timeout <= 0:
+                break
+
+            self._wakeup_event.wait(timeout)
+
+            if self._wakeup_event.ready():
+                self._wakeup_event.reset()
+
+        horizon = datetime.datetime.now() + ahead
+
+        while self._wakeup_times and self._wakeup_times[0] < horizon:
+            heapq.heappop(self._wakeup_times)
+
     def _loop(self):
         while not self._stopped:
             LOG.debug("Starting Scheduler loop [scheduler=%s]...", self)
 
+            processed_cnt = None
+
             try:
-                self._process_delayed_calls()
+                processed_cnt = self._process_delayed_calls()
             except Exception:
                 LOG.exception(
                     "Scheduler failed to process delayed calls"
@@ -138,10 +402,13 @@ class Scheduler(object):
                 if sys.version_info < (3,):
                     sys.exc_clear()
 
-            eventlet.sleep(
-                self._fixed_delay +
-                random.Random().randint(0, self._random_delay * 1000) * 0.001
-            )
+            delay = self._delay.next(processed_cnt, self._batch_size)
+
+            if delay:
+                self._wait(delay)
+            else:
+                # Let other green threads run.
+                eventlet.sleep()
 
     def _process_delayed_calls(self, ctx=None):
         """Run delayed required calls.
@@ -150,13 +417,17 @@ class Scheduler(object):
         'READ-COMMITTED' isolation mode.
 
         :param ctx: Auth context.
+        :return: The number of processed calls.
         """
 
         # Select and capture calls matching time criteria.
-        db_calls = self._capture_calls(self._batch_size)
+        db_calls = self._capture_calls(
+            self._batch_size,
+            _update_own_shards()
+        )
 
         if not db_calls:
-            return
+            return 0
 
         # Determine target methods, deserialize arguments etc.
         prepared_calls = self._prepare_calls(db_calls)
@@ -167,15 +438,22 @@ class Scheduler(object):
         # Delete invoked calls from DB.
         self.delete_calls(db_calls)
 
+        return len(db_calls)
+
     @staticmethod
     @db_utils.retry_on_db_error
-    def _capture_calls(batch_size):
+    def _capture_calls(batch_size, shards=None):
         """Captures delayed calls eligible for processing (based on time).
 
         The intention of this method is to select delayed calls based on time
         criteria and mark them in DB as being processed so that no other
         threads could process them in parallel.
 
+        :param batch_size: The max number of calls to capture.
+        :param shards: Shards owned by this scheduler or None if it owns
+            all shards. Calls of other shards are captured only if they
+            are overdue by more than "pickup_job_after" seconds and there
+            is room left in the batch.
         :return: A list of delayed calls captured for further processing.
         """
         result = []
@@ -185,9 +463,24 @@ class Scheduler(object):
         with db_api.transaction():
             candidates = db_api.get_delayed_calls_to_start(
                 time_filter,
-                batch_size
+                batch_size,
+                shards=shards
             )
 
+            if shards is not None and \
+                    (not batch_size or len(candidates) < batch_size):
+                # Most likely the owners of these calls can't process
+                # them, e.g. they crashed.
+                candidates.extend(
+                    db_api.get_delayed_calls_to_start(
+                        time_filter - datetime.timedelta(
+                            seconds=CONF.scheduler.pickup_job_after
+                        ),
+                        batch_size - len(candidates) if batch_size else None,
+                        skip_shards=shards
+                    )
+                )
+
             for call in candidates:
                 # Mark this delayed call has been processed in order to
                 # prevent calling from parallel transaction.
@@ -229,7 +522,9 @@ class Scheduler(object):
                 call.target_method_name, call.method_arguments
             )
 
-            target_auth_context = copy.deepcopy(call.auth_context)
+            # Delayed calls are deleted after invocation so their values
+            # are never reused, shallow copies are enough.
+            target_auth_context = dict(call.auth_context)
 
             if call.factory_method_path:
                 factory = importutils.import_class(call.factory_method_path)
@@ -240,12 +535,12 @@ class Scheduler(object):
                     call.target_method_name
                 )
 
-            method_args = copy.deepcopy(call.method_arguments)
+            method_args = dict(call.method_arguments)
 
             if call.serializers:
                 # Deserialize arguments.
                 for arg_name, ser_path in call.serializers.items():
-                    serializer = importutils.import_class(ser_path)()
+                    serializer = sched_base.get_serializer(ser_path)
 
                     deserialized = serializer.deserialize(
                         method_args[arg_name]
@@ -310,17 +605,38 @@ class Scheduler(object):
         LOG.debug("Scheduler deleted %s delayed calls.", len(db_calls))
 
 
+def _start_timer_wheel():
+    global _timer_wheel
+
+    if _timer_wheel or CONF.scheduler.timer_wheel_max_delay <= 0:
+        return
+
+    _timer_wheel = timer_wheel.TimerWheel()
+    _timer_wheel.start()
+
+
+def _stop_timer_wheel():
+    global _timer_wheel
+
+    if _timer_wheel:
+        _timer_wheel.stop()
+        _timer_wheel = None
+
+
 def start():
     sched = Scheduler(
         CONF.scheduler.fixed_delay,
         CONF.scheduler.random_delay,
-        CONF.scheduler.batch_size
+        CONF.scheduler.batch_size,
+        CONF.scheduler.max_delay
     )
 
     _schedulers.add(sched)
 
     sched.start()
 
+    _start_timer_wheel()
+
     return sched
 
 
@@ -332,9 +648,14 @@ def stop_scheduler(sched, graceful=False):
 
     _schedulers.remove(sched)
 
+    if not _schedulers:
+        _stop_timer_wheel()
+
 
 def stop_all_schedulers():
     for sched in _schedulers:
         sched.stop(graceful=True)
 
     _schedulers.clear()
+
+    _stop_timer_wheel()
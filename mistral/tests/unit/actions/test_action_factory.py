@@ -0,0 +1,83 @@
+# Copyright 2019 - Nokia Networks.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import mock
+
+from mistral.actions import action_factory
+from mistral.actions import std_actions
+from mistral.tests.unit import base
+
+ECHO = 'mistral.actions.std_actions.EchoAction'
+
+
+class ActionFactoryTest(base.BaseTest):
+    def test_construct_action_class(self):
+        attrs = {'client_method_name': 'servers.get', 'args': [1, {'a': 2}]}
+
+        action_cls = action_factory.construct_action_class(ECHO, attrs)
+
+        self.assertTrue(issubclass(action_cls, std_actions.EchoAction))
+        self.assertEqual('servers.get', action_cls.client_method_name)
+
+        # Classes are reused for the same attributes.
+        self.assertIs(
+            action_cls,
+            action_factory.construct_action_class(ECHO, dict(attrs))
+        )
+
+        self.assertIsNot(
+            action_cls,
+            action_factory.construct_action_class(
+                ECHO,
+                {'client_method_name': 'servers.list', 'args': [1, {'a': 2}]}
+            )
+        )
+        self.assertIsNot(
+            action_factory.construct_action_class(ECHO, {'flag': 1}),
+            action_factory.construct_action_class(ECHO, {'flag': True})
+        )
+
+        list_cls = action_factory.construct_action_class(ECHO, {'args': [1]})
+        tuple_cls = action_factory.construct_action_class(ECHO, {'args': (1,)})
+
+        self.assertIsNot(list_cls, tuple_cls)
+        self.assertEqual([1], list_cls.args)
+        self.assertEqual((1,), tuple_cls.args)
+
+    def test_construct_action_class_unhashable_attributes(self):
+        attrs = {'values': set([1])}
+
+        self.assertIsNot(
+            action_factory.construct_action_class(ECHO, attrs),
+            action_factory.construct_action_class(ECHO, attrs)
+        )
+
+    def test_construct_patched_action_class(self):
+        action_cls = action_factory.construct_action_class(ECHO, {})
+
+        class FakeEchoAction(std_actions.EchoAction):
+            pass
+
+        with mock.patch.object(std_actions, 'EchoAction', FakeEchoAction):
+            self.assertTrue(
+                issubclass(
+                    action_factory.construct_action_class(ECHO, {}),
+                    FakeEchoAction
+                )
+            )
+
+        self.assertIs(
+            action_cls,
+            action_factory.construct_action_class(ECHO, {})
+        )
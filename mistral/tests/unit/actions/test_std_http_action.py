@@ -58,7 +58,7 @@ def get_error_fake_response():
 
 
 class HTTPActionTest(base.BaseTest):
-    @mock.patch.object(requests, 'request')
+    @mock.patch.object(requests.Session, 'request')
     def test_http_action(self, mocked_method):
         mocked_method.return_value = get_success_fake_response()
         mock_ctx = mock.Mock()
@@ -97,7 +97,7 @@ class HTTPActionTest(base.BaseTest):
             verify=None
         )
 
-    @mock.patch.object(requests, 'request')
+    @mock.patch.object(requests.Session, 'request')
     def test_http_action_error_result(self, mocked_method):
         mocked_method.return_value = get_error_fake_response()
         mock_ctx = mock.Mock()
@@ -115,7 +115,7 @@ class HTTPActionTest(base.BaseTest):
         self.assertIsInstance(result, mistral_lib_actions.Result)
         self.assertEqual(401, result.error['status'])
 
-    @mock.patch.object(requests, 'request')
+    @mock.patch.object(requests.Session, 'request')
     def test_http_action_with_auth(self, mocked_method):
         mocked_method.return_value = get_success_fake_response()
         mock_ctx = mock.Mock()
@@ -131,7 +131,7 @@ class HTTPActionTest(base.BaseTest):
         args, kwargs = mocked_method.call_args
         self.assertEqual(('user', 'password'), kwargs['auth'])
 
-    @mock.patch.object(requests, 'request')
+    @mock.patch.object(requests.Session, 'request')
     def test_http_action_with_headers(self, mocked_method):
         mocked_method.return_value = get_success_fake_response()
         mock_ctx = mock.Mock()
@@ -155,7 +155,7 @@ class HTTPActionTest(base.BaseTest):
         args, kwargs = mocked_method.call_args
         self.assertEqual(safe_headers, kwargs['headers'])
 
-    @mock.patch.object(requests, 'request')
+    @mock.patch.object(requests.Session, 'request')
     def test_http_action_empty_resp(self, mocked_method):
 
         def invoke(content):
@@ -172,7 +172,7 @@ class HTTPActionTest(base.BaseTest):
         invoke(None)
         invoke('')
 
-    @mock.patch.object(requests, 'request')
+    @mock.patch.object(requests.Session, 'request')
     def test_http_action_none_encoding_not_empty_resp(self, mocked_method):
         action = std.HTTPAction(
             url=URL,
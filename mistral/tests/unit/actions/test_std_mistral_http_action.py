@@ -56,7 +56,7 @@ def get_error_fake_response():
 
 
 class MistralHTTPActionTest(base.BaseTest):
-    @mock.patch.object(requests, 'request')
+    @mock.patch.object(requests.Session, 'request')
     def test_http_action(self, mocked_method):
         mocked_method.return_value = get_success_fake_response()
         mock_ctx = mock.Mock()
@@ -105,7 +105,7 @@ class MistralHTTPActionTest(base.BaseTest):
             verify=None
         )
 
-    @mock.patch.object(requests, 'request')
+    @mock.patch.object(requests.Session, 'request')
     def test_http_action_error_result(self, mocked_method):
         mocked_method.return_value = get_error_fake_response()
         mock_ctx = mock.Mock()
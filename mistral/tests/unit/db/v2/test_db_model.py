@@ -34,6 +34,7 @@ WF_EXEC = {
     'description': None,
     'output': None,
     'accepted': False,
+    'data_version': '6a8d3f12-7c4e-4b0a-9e51-2f3b8c7d1e60',
     'some_invalid_field': "foobar"
 }
 
@@ -15,11 +15,13 @@
 
 
 import eventlet
+import mock
 from oslo_config import cfg
 import random
 import testtools
 
 from mistral import context as auth_context
+from mistral.db.sqlalchemy import named_lock
 from mistral.db.sqlalchemy import sqlite_lock
 from mistral.db.v2.sqlalchemy import api as db_api
 from mistral.db.v2.sqlalchemy import models as db_models
@@ -89,6 +91,22 @@ class SQLiteLocksTest(test_base.DbTestCase):
 
         self.assertEqual(0, len(sqlite_lock.get_locks()))
 
+    def test_sqlite_lock_reentrant(self):
+        session = object()
+
+        sqlite_lock.acquire_lock('object_id', session)
+
+        # The same session takes the lock again without blocking.
+        sqlite_lock.acquire_lock('object_id', session)
+
+        self.assertTrue(sqlite_lock.get_locks()['object_id'][1].locked())
+
+        sqlite_lock.release_locks(session)
+
+        self.assertFalse(sqlite_lock.get_locks()['object_id'][1].locked())
+
+        sqlite_lock.cleanup()
+
     def _run_correct_locking(self, wf_ex):
         # Set context info for the thread.
         auth_context.set_ctx(test_base.get_context())
@@ -126,3 +144,262 @@ class SQLiteLocksTest(test_base.DbTestCase):
         print("Correct locking test gave object name: %s" % wf_ex.name)
 
         self.assertEqual(str(number), wf_ex.name)
+
+
+class NamedLocksTest(test_base.DbTestCase):
+    def setUp(self):
+        super(NamedLocksTest, self).setUp()
+
+        named_lock.cleanup()
+
+        self.addCleanup(named_lock.cleanup)
+
+    def test_get_backend(self):
+        def _get_backend(backend_name, dialect_name):
+            return named_lock.get_backend(
+                backend_name,
+                dialect_name,
+                mock.MagicMock(),
+                db_models.NamedLock.__table__
+            )
+
+        self.assertIsInstance(
+            _get_backend('auto', 'postgresql'),
+            named_lock.PostgreSQLNamedLockBackend
+        )
+        self.assertIsInstance(
+            _get_backend('auto', 'mysql'),
+            named_lock.MySQLNamedLockBackend
+        )
+        self.assertIsInstance(
+            _get_backend('auto', 'sqlite'),
+            named_lock.InProcessNamedLockBackend
+        )
+        self.assertIsInstance(
+            _get_backend('auto', 'oracle'),
+            named_lock.TableNamedLockBackend
+        )
+        self.assertIsInstance(
+            _get_backend('table', 'postgresql'),
+            named_lock.TableNamedLockBackend
+        )
+
+    def test_get_backend_galera(self):
+        engine = mock.MagicMock()
+
+        conn = engine.connect.return_value.__enter__.return_value
+        conn.execute.return_value.first.return_value = ('wsrep_on', 'ON')
+
+        self.assertIsInstance(
+            named_lock.get_backend(
+                'auto',
+                'mysql',
+                engine,
+                db_models.NamedLock.__table__
+            ),
+            named_lock.TableNamedLockBackend
+        )
+
+    def test_get_backend_auto_resolved_once(self):
+        engine = mock.MagicMock()
+
+        conn = engine.connect.return_value.__enter__.return_value
+        conn.execute.return_value.first.return_value = ('wsrep_on', 'OFF')
+
+        backends = [
+            named_lock.get_backend(
+                'auto',
+                'mysql',
+                engine,
+                db_models.NamedLock.__table__
+            )
+            for _ in range(3)
+        ]
+
+        self.assertIsInstance(backends[0], named_lock.MySQLNamedLockBackend)
+        self.assertTrue(all(b is backends[0] for b in backends))
+
+        # The Galera check is made only for the first call.
+        self.assertEqual(1, engine.connect.call_count)
+
+        self.assertIs(
+            backends[0],
+            named_lock.get_backend(
+                'mysql',
+                'mysql',
+                engine,
+                db_models.NamedLock.__table__
+            )
+        )
+
+    def test_in_process_named_lock_reentrant(self):
+        self.override_config('named_lock_backend', 'in_process', 'engine')
+
+        with db_api.transaction():
+            with db_api.named_lock('test-lock'):
+                # Must not block on the lock held by the same transaction.
+                with db_api.named_lock('test-lock'):
+                    pass
+
+        backend = db_api._get_named_lock_backend()
+
+        self.assertEqual(0, len(backend.get_locks()))
+
+        # The lock is available to other transactions again.
+        with db_api.transaction():
+            with db_api.named_lock('test-lock'):
+                pass
+
+        self.assertEqual(0, len(backend.get_locks()))
+
+    def test_lock_key_and_name(self):
+        key = named_lock.get_lock_key('with-items-123')
+
+        self.assertEqual(key, named_lock.get_lock_key('with-items-123'))
+        self.assertNotEqual(key, named_lock.get_lock_key('with-items-124'))
+        self.assertTrue(-(1 << 63) <= key < (1 << 63))
+
+        self.assertLessEqual(len(named_lock.get_lock_name('a' * 1000)), 64)
+
+    def _run_named_lock(self, counter):
+        auth_context.set_ctx(test_base.get_context())
+
+        with db_api.transaction():
+            with db_api.named_lock('test-lock'):
+                val = counter['value']
+
+                self._random_sleep()
+
+                counter['value'] = val + 1
+
+    def _random_sleep(self):
+        eventlet.sleep(random.Random().randint(0, 10) * 0.001)
+
+    def test_in_process_named_lock(self):
+        self.override_config('named_lock_backend', 'in_process', 'engine')
+
+        counter = {'value': 0}
+
+        number = 100
+
+        threads = [
+            eventlet.spawn(self._run_named_lock, counter)
+            for _ in range(number)
+        ]
+
+        [t.wait() for t in threads]
+
+        self.assertEqual(number, counter['value'])
+
+        backend = db_api._get_named_lock_backend()
+
+        # Make sure that all locks have been released and removed.
+        self.assertEqual(0, len(backend.get_locks()))
+
+        stats = named_lock.get_stats()['in_process']
+
+        self.assertEqual(number, stats['count'])
+        self.assertGreater(stats['max_wait_time'], 0)
+        self.assertGreaterEqual(
+            stats['total_wait_time'],
+            stats['max_wait_time']
+        )
+
+
+class WorkflowExecutionDataCacheTest(test_base.DbTestCase):
+    def setUp(self):
+        super(WorkflowExecutionDataCacheTest, self).setUp()
+
+        db_api._WF_EX_DATA_CACHE = None
+
+        self.addCleanup(setattr, db_api, '_WF_EX_DATA_CACHE', None)
+
+        self.wf_ex = db_api.create_workflow_execution(
+            dict(WF_EXEC, context={'var': 1}, params={'env': {}})
+        )
+
+    def _lock(self):
+        return db_api.acquire_lock(db_models.WorkflowExecution, self.wf_ex.id)
+
+    def test_lock_reuses_data(self):
+        with db_api.transaction():
+            ctx = self._lock().context
+
+        with db_api.transaction():
+            wf_ex = self._lock()
+
+            self.assertIs(ctx, wf_ex.context)
+            self.assertEqual({'var': 1}, wf_ex.context)
+            self.assertEqual({'env': {}}, wf_ex.params)
+
+            # Changes of a cached value are still tracked.
+            wf_ex.context['var'] = 2
+
+        with db_api.transaction():
+            wf_ex = db_api.get_workflow_execution(self.wf_ex.id)
+
+            self.assertEqual({'var': 2}, wf_ex.context)
+
+        with db_api.transaction():
+            self.assertEqual({'var': 2}, self._lock().context)
+
+    def test_data_version(self):
+        version = self.wf_ex.data_version
+
+        self.assertIsNotNone(version)
+
+        wf_ex = db_api.update_workflow_execution(
+            self.wf_ex.id,
+            {'state': 'SUCCESS'}
+        )
+
+        self.assertEqual(version, wf_ex.data_version)
+
+        wf_ex = db_api.update_workflow_execution(
+            self.wf_ex.id,
+            {'context': {'var': 2}}
+        )
+
+        self.assertNotEqual(version, wf_ex.data_version)
+
+    def test_lock_reloads_changed_data(self):
+        with db_api.transaction():
+            self._lock()
+
+        # Another engine changes the data.
+        table = db_models.WorkflowExecution.__table__
+
+        db_api.b.get_engine().execute(
+            table.update().where(table.c.id == self.wf_ex.id).values(
+                context={'var': 2},
+                data_version='new-version'
+            )
+        )
+
+        with db_api.transaction():
+            self.assertEqual({'var': 2}, self._lock().context)
+
+    def test_lock_after_rollback(self):
+        try:
+            with db_api.transaction():
+                wf_ex = self._lock()
+
+                wf_ex.context['var'] = 2
+
+                # Flush the change and the new data version.
+                db_api.get_workflow_execution(self.wf_ex.id)
+
+                raise ValueError()
+        except ValueError:
+            pass
+
+        with db_api.transaction():
+            self.assertEqual({'var': 1}, self._lock().context)
+
+    def test_cache_disabled(self):
+        self.override_config('execution_data_cache_size', 0, 'engine')
+
+        with db_api.transaction():
+            self.assertEqual({'var': 1}, self._lock().context)
+
+        self.assertIsNone(db_api._WF_EX_DATA_CACHE)
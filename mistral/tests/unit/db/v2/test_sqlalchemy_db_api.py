@@ -19,6 +19,7 @@ import copy
 import datetime
 
 from oslo_config import cfg
+import sqlalchemy as sa
 
 from mistral import context as auth_context
 from mistral.db.v2.sqlalchemy import api as db_api
@@ -1543,6 +1544,24 @@ class ActionExecutionTest(SQLAlchemyTest):
             len(state_info)
         )
 
+    def test_update_action_executions_state(self):
+        with db_api.transaction():
+            a_ex1 = db_api.create_action_execution(ACTION_EXECS[0])
+            a_ex2 = db_api.create_action_execution(ACTION_EXECS[1])
+
+            updated_ids = db_api.update_action_executions_state(
+                [a_ex1.id, a_ex2.id],
+                cur_states=['IDLE'],
+                state='ERROR',
+                values={'output': {'result': 'Failed'}}
+            )
+
+            self.assertEqual([a_ex1.id], updated_ids)
+
+            self.assertEqual('ERROR', a_ex1.state)
+            self.assertEqual({'result': 'Failed'}, a_ex1.output)
+            self.assertEqual(ACTION_EXECS[1]['state'], a_ex2.state)
+
     def test_action_execution_repr(self):
         s = db_api.create_action_execution(ACTION_EXECS[0]).__repr__()
 
@@ -1956,6 +1975,80 @@ class WorkflowExecutionTest(SQLAlchemyTest):
             self.assertEqual(0, len(wf_ex.task_executions))
             self.assertIsNone(db_api.load_task_execution(task_ex.id))
 
+    def test_update_workflow_executions_state(self):
+        with db_api.transaction():
+            wf_ex1 = db_api.create_workflow_execution(WF_EXECS[0])
+            wf_ex2 = db_api.create_workflow_execution(WF_EXECS[1])
+
+            updated_ids = db_api.update_workflow_executions_state(
+                [wf_ex1.id, wf_ex2.id],
+                cur_states=['RUNNING'],
+                state='CANCELLED',
+                values={'state_info': 'Cancelled'}
+            )
+
+            self.assertEqual([wf_ex2.id], updated_ids)
+
+            # Objects loaded into the session get the new values.
+            self.assertEqual('IDLE', wf_ex1.state)
+            self.assertEqual('CANCELLED', wf_ex2.state)
+            self.assertEqual('Cancelled', wf_ex2.state_info)
+
+        with db_api.transaction():
+            self.assertEqual(
+                'CANCELLED',
+                db_api.get_workflow_execution(wf_ex2.id).state
+            )
+
+            self.assertEqual(
+                [],
+                db_api.update_workflow_executions_state(
+                    [wf_ex2.id],
+                    cur_states=['RUNNING'],
+                    state='CANCELLED'
+                )
+            )
+
+    def test_get_sub_workflow_executions(self):
+        with db_api.transaction():
+            root_wf_ex = db_api.create_workflow_execution(WF_EXECS[0])
+
+            task_ex = db_api.create_task_execution(
+                dict(TASK_EXECS[0], workflow_execution_id=root_wf_ex.id)
+            )
+
+            sub_wf_ex1 = db_api.create_workflow_execution(
+                dict(
+                    WF_EXECS[1],
+                    root_execution_id=root_wf_ex.id,
+                    task_execution_id=task_ex.id
+                )
+            )
+
+            db_api.create_workflow_execution(
+                dict(
+                    WF_EXECS[0],
+                    state='SUCCESS',
+                    root_execution_id=root_wf_ex.id,
+                    task_execution_id=task_ex.id
+                )
+            )
+
+        with db_api.transaction():
+            sub_wf_exs = db_api.get_sub_workflow_executions(
+                root_wf_ex.id,
+                in_states=['RUNNING']
+            )
+
+            self.assertEqual(1, len(sub_wf_exs))
+            self.assertEqual(sub_wf_ex1.id, sub_wf_exs[0][0].id)
+            self.assertEqual(root_wf_ex.id, sub_wf_exs[0][1])
+
+            self.assertEqual(
+                2,
+                len(db_api.get_sub_workflow_executions(root_wf_ex.id))
+            )
+
     def test_workflow_execution_repr(self):
         s = db_api.create_workflow_execution(WF_EXECS[0]).__repr__()
 
@@ -2016,6 +2109,115 @@ class TaskExecutionTest(SQLAlchemyTest):
 
             self.assertIsNone(db_api.load_task_execution("not-existing-id"))
 
+    def test_update_task_execution_state(self):
+        with db_api.transaction():
+            wf_ex = db_api.create_workflow_execution(WF_EXECS[0])
+
+            values = copy.deepcopy(TASK_EXECS[0])
+            values.update({'workflow_execution_id': wf_ex.id})
+
+            created = db_api.create_task_execution(values)
+
+        with db_api.transaction():
+            task_ex = db_api.update_task_execution_state(
+                id=created.id,
+                cur_state='IDLE',
+                state='RUNNING'
+            )
+
+            self.assertEqual(created.id, task_ex.id)
+            self.assertEqual('RUNNING', task_ex.state)
+            self.assertIsNotNone(task_ex.updated_at)
+
+            # The state doesn't match anymore.
+            self.assertIsNone(
+                db_api.update_task_execution_state(
+                    id=created.id,
+                    cur_state='IDLE',
+                    state='ERROR'
+                )
+            )
+
+        self.assertEqual(
+            'RUNNING',
+            db_api.get_task_execution(created.id).state
+        )
+
+    def test_update_task_execution_state_keeps_pending_changes(self):
+        # See https://bugs.launchpad.net/mistral/+bug/1736821
+        with db_api.transaction():
+            wf_ex = db_api.create_workflow_execution(WF_EXECS[0])
+
+            values = copy.deepcopy(TASK_EXECS[0])
+            values.update(
+                {'workflow_execution_id': wf_ex.id, 'runtime_context': {}}
+            )
+
+            created = db_api.create_task_execution(values)
+
+        with db_api.transaction():
+            task_ex = db_api.get_task_execution(created.id)
+            wf_ex = db_api.get_workflow_execution(wf_ex.id)
+
+            # Changes made before the state update, including the ones
+            # made in place.
+            task_ex.runtime_context['key'] = 'value'
+            task_ex.processed = True
+            wf_ex.state_info = 'Changed'
+
+            task_ex = db_api.update_task_execution_state(
+                id=task_ex.id,
+                cur_state='IDLE',
+                state='RUNNING'
+            )
+
+            # The session hasn't been flushed.
+            self.assertTrue(
+                sa.inspect(task_ex).attrs.processed.history.has_changes()
+            )
+
+            # Changes made after the state update.
+            task_ex.state_info = 'Running'
+
+        with db_api.transaction():
+            task_ex = db_api.get_task_execution(created.id)
+
+            self.assertEqual('RUNNING', task_ex.state)
+            self.assertEqual('Running', task_ex.state_info)
+
+        with db_api.transaction():
+            task_ex = db_api.get_task_execution(created.id)
+
+            self.assertEqual('RUNNING', task_ex.state)
+            self.assertEqual({'key': 'value'}, task_ex.runtime_context)
+            self.assertTrue(task_ex.processed)
+
+            self.assertEqual(
+                'Changed',
+                db_api.get_workflow_execution(wf_ex.id).state_info
+            )
+
+        with db_api.transaction():
+            task_ex = db_api.get_task_execution(created.id)
+
+            # The state changed without a flush is the current state.
+            task_ex.state = 'RUNNING_DELAYED'
+
+            task_ex = db_api.update_task_execution_state(
+                id=task_ex.id,
+                cur_state='RUNNING_DELAYED',
+                state='SUCCESS'
+            )
+
+            self.assertIsNotNone(task_ex)
+            self.assertEqual('SUCCESS', task_ex.state)
+
+        with db_api.transaction():
+            self.assertEqual(
+                'SUCCESS',
+                db_api.get_task_execution(created.id).state
+            )
+
     def test_get_task_execution_with_fields(self):
         with db_api.transaction():
             wf_ex = db_api.create_workflow_execution(WF_EXECS[0])
@@ -3329,6 +3531,8 @@ class LockTest(SQLAlchemyTest):
         self.assertEqual(0, len(locks))
 
     def test_with_named_lock(self):
+        self.override_config('named_lock_backend', 'table', 'engine')
+
         name = 'lock1'
 
         with db_api.named_lock(name):
@@ -3337,3 +3541,13 @@ class LockTest(SQLAlchemyTest):
 
         # Make sure that outside 'with' section the lock record does not exist.
         self.assertEqual(0, len(db_api.get_named_locks()))
+
+    def test_with_named_lock_in_process(self):
+        self.override_config('named_lock_backend', 'in_process', 'engine')
+
+        with db_api.transaction():
+            with db_api.named_lock('lock1'):
+                # In-process locks don't touch the locks table.
+                self.assertEqual(0, len(db_api.get_named_locks()))
+
+        self.assertEqual(0, len(db_api.get_named_locks()))
@@ -80,3 +80,30 @@ class TransactionsTest(test_base.DbTestCase):
 
         wf_execs = db_api.get_workflow_executions()
         self.assertEqual(1, len(wf_execs))
+
+    def test_after_commit_callbacks(self):
+        calls = []
+
+        with db_api.transaction():
+            db_api.create_workflow_execution(WF_EXECS[0])
+
+            db_api.add_after_commit_callback(lambda: calls.append(1))
+
+            # Callbacks must not be invoked before commit.
+            self.assertEqual([], calls)
+
+        self.assertEqual([1], calls)
+
+        # Callbacks of a transaction that was rolled back are discarded.
+        with db_api.transaction(read_only=True):
+            db_api.add_after_commit_callback(lambda: calls.append(2))
+
+        with db_api.transaction():
+            db_api.create_workflow_execution(WF_EXECS[1])
+
+        self.assertEqual([1], calls)
+
+        # Without a transaction a callback is invoked immediately.
+        db_api.add_after_commit_callback(lambda: calls.append(3))
+
+        self.assertEqual([1, 3], calls)
@@ -98,7 +98,7 @@ wf2_with_items:
 
 class ActionDefaultTest(base.EngineTestCase):
     @mock.patch.object(
-        requests, 'request',
+        requests.Session, 'request',
         mock.MagicMock(return_value=test_base.FakeHTTPResponse('', 200, 'OK')))
     @mock.patch.object(
         std_actions.HTTPAction, 'is_sync',
@@ -116,7 +116,7 @@ class ActionDefaultTest(base.EngineTestCase):
             self.assertEqual(states.SUCCESS, wf_ex.state)
             self._assert_single_item(wf_ex.task_executions, name='task1')
 
-        requests.request.assert_called_with(
+        requests.Session.request.assert_called_with(
             'GET',
             'https://api.library.org/books',
             params=None,
@@ -131,7 +131,7 @@ class ActionDefaultTest(base.EngineTestCase):
         )
 
     @mock.patch.object(
-        requests, 'request',
+        requests.Session, 'request',
         mock.MagicMock(return_value=test_base.FakeHTTPResponse('', 200, 'OK')))
     @mock.patch.object(
         std_actions.HTTPAction, 'is_sync',
@@ -149,7 +149,7 @@ class ActionDefaultTest(base.EngineTestCase):
             self.assertEqual(states.SUCCESS, wf_ex.state)
             self._assert_single_item(wf_ex.task_executions, name='task1')
 
-        requests.request.assert_called_with(
+        requests.Session.request.assert_called_with(
             'GET', 'https://api.library.org/books',
             params=None, data=None, headers=None, cookies=None,
             allow_redirects=None, proxies=None, verify=None,
@@ -158,7 +158,7 @@ class ActionDefaultTest(base.EngineTestCase):
         )
 
     @mock.patch.object(
-        requests, 'request',
+        requests.Session, 'request',
         mock.MagicMock(return_value=test_base.FakeHTTPResponse('', 200, 'OK')))
     @mock.patch.object(
         std_actions.HTTPAction, 'is_sync',
@@ -194,10 +194,10 @@ class ActionDefaultTest(base.EngineTestCase):
                                timeout=ENV['__actions']['std.http']['timeout'])
                      for url in wf_input['links']]
 
-        requests.request.assert_has_calls(calls, any_order=True)
+        requests.Session.request.assert_has_calls(calls, any_order=True)
 
     @mock.patch.object(
-        requests, 'request',
+        requests.Session, 'request',
         mock.MagicMock(return_value=test_base.FakeHTTPResponse('', 200, 'OK')))
     @mock.patch.object(
         std_actions.HTTPAction, 'is_sync',
@@ -233,4 +233,4 @@ class ActionDefaultTest(base.EngineTestCase):
                            timeout=60)
                  for url in wf_input['links']]
 
-        requests.request.assert_has_calls(calls, any_order=True)
+        requests.Session.request.assert_has_calls(calls, any_order=True)
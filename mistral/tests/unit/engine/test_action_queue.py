@@ -0,0 +1,149 @@
+# Copyright 2019 - Nokia Networks.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import mock
+from oslo_config import cfg
+
+from mistral.db.v2 import api as db_api
+from mistral.engine import action_queue
+from mistral.executors import base as exe
+from mistral.executors import executor_server
+from mistral.executors import remote_executor as r_exe
+from mistral.rpc import clients as rpc_clients
+from mistral.services import workflows as wf_service
+from mistral.tests.unit.engine import base
+from mistral.workflow import states
+
+
+# Use the set_default method to set value otherwise in certain test cases
+# the change in value is not permanent.
+cfg.CONF.set_default('auth_enable', False, group='pecan')
+
+WF = """---
+version: '2.0'
+
+wf:
+  tasks:
+    task1:
+      with-items: i in <% range(0, 6) %>
+      action: std.echo output=<% $.i %>
+      publish:
+        result: <% task().result %>
+"""
+
+
+class ActionQueueTest(base.EngineTestCase):
+    @mock.patch.object(
+        executor_server.ExecutorServer,
+        'run_actions',
+        autospec=True,
+        side_effect=executor_server.ExecutorServer.run_actions
+    )
+    @mock.patch.object(
+        r_exe.RemoteExecutor,
+        'run_actions',
+        autospec=True,
+        side_effect=rpc_clients.ExecutorClient.run_actions
+    )
+    def test_run_actions_in_batches(self, client_mock, server_mock):
+        self.override_config('run_actions_batch_size', 4, 'executor')
+
+        wf_service.create_workflows(WF)
+
+        wf_ex = self.engine.start_workflow('wf')
+
+        self.await_workflow_success(wf_ex.id)
+
+        with db_api.transaction():
+            wf_ex = db_api.get_workflow_execution(wf_ex.id)
+
+            task_ex = wf_ex.task_executions[0]
+
+            self.assertEqual(
+                list(range(0, 6)),
+                sorted(task_ex.published['result'])
+            )
+
+        # All the actions are sent with one call of the client.
+        self.assertEqual(1, client_mock.call_count)
+        self.assertEqual(6, len(client_mock.call_args[0][1]))
+
+        # And received by executors with two messages.
+        self.assertEqual(2, server_mock.call_count)
+        self.assertEqual(
+            [4, 2],
+            sorted(
+                [len(c[1]['actions']) for c in server_mock.call_args_list],
+                reverse=True
+            )
+        )
+
+    @mock.patch.object(
+        r_exe.RemoteExecutor,
+        'run_actions',
+        autospec=True,
+        side_effect=rpc_clients.ExecutorClient.run_actions
+    )
+    def test_run_actions_batching_disabled(self, client_mock):
+        self.override_config('run_actions_batch_size', 1, 'executor')
+
+        wf_service.create_workflows(WF)
+
+        wf_ex = self.engine.start_workflow('wf')
+
+        self.await_workflow_success(wf_ex.id)
+
+        with db_api.transaction():
+            wf_ex = db_api.get_workflow_execution(wf_ex.id)
+
+            self.assertEqual(states.SUCCESS, wf_ex.state)
+
+        self.assertEqual(0, client_mock.call_count)
+
+    @mock.patch.object(rpc_clients, 'get_engine_client')
+    @mock.patch.object(exe, 'get_executor')
+    def test_process_queue_keeps_order(self, get_exe_mock, get_client_mock):
+        self.override_config('run_actions_batch_size', 10, 'executor')
+
+        calls = mock.Mock()
+
+        get_exe_mock.return_value = calls.executor
+        get_client_mock.return_value = calls.engine_client
+
+        def _run_action_op(action_ex_id):
+            action_ex = mock.Mock(id=action_ex_id, input={})
+            action_ex.runtime_context = {}
+
+            return (
+                action_queue._RUN_ACTION,
+                (action_ex, mock.Mock(attributes={}), None, {}, None)
+            )
+
+        action_queue._process_queue([
+            _run_action_op('1'),
+            _run_action_op('2'),
+            (action_queue._ON_ACTION_COMPLETE, ('3', 'result', False)),
+            _run_action_op('4'),
+        ])
+
+        # The actions queued before the completion are sent first.
+        self.assertEqual(
+            ['executor.run_actions', 'engine_client.on_action_complete',
+             'executor.run_action'],
+            [c[0] for c in calls.mock_calls]
+        )
+        self.assertEqual(
+            ['1', '2'],
+            [a['action_ex_id'] for a in calls.mock_calls[0][1][0]]
+        )
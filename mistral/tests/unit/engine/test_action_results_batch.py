@@ -0,0 +1,223 @@
+# Copyright 2019 - Nokia Networks.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import mock
+from mistral_lib import actions as ml_actions
+from oslo_config import cfg
+
+from mistral.db.v2 import api as db_api
+from mistral.engine import default_engine
+from mistral.rpc import clients as rpc_clients
+from mistral.services import workflows as wf_service
+from mistral.tests.unit.engine import base
+from mistral.workflow import states
+
+
+# Use the set_default method to set value otherwise in certain test cases
+# the change in value is not permanent.
+cfg.CONF.set_default('auth_enable', False, group='pecan')
+
+WITH_ITEMS_WF = """---
+version: '2.0'
+
+wf:
+  tasks:
+    task1:
+      with-items: i in <% [1, 2] %>
+      action: std.async_noop
+      publish:
+        result: <% task().result %>
+"""
+
+PARALLEL_WF = """---
+version: '2.0'
+
+wf:
+  tasks:
+    task1:
+      action: std.async_noop
+      publish:
+        result1: <% task().result %>
+
+    task2:
+      action: std.async_noop
+      publish:
+        result2: <% task().result %>
+"""
+
+SYNC_WF = """---
+version: '2.0'
+
+wf:
+  tasks:
+    task1:
+      with-items: i in <% range(0, 5) %>
+      action: std.echo output=<% $.i %>
+      publish:
+        result: <% task().result %>
+"""
+
+
+class OnActionsCompleteTest(base.EngineTestCase):
+    def _await_running_actions(self, wf_ex_id, count):
+        def _get_running_actions():
+            with db_api.transaction():
+                wf_ex = db_api.get_workflow_execution(wf_ex_id)
+
+                return sorted(
+                    [
+                        a_ex
+                        for t_ex in wf_ex.task_executions
+                        for a_ex in t_ex.action_executions
+                        if a_ex.state == states.RUNNING
+                    ],
+                    key=lambda a_ex: (
+                        a_ex.task_execution.name,
+                        a_ex.runtime_context.get('index', 0)
+                    )
+                )
+
+        self._await(lambda: len(_get_running_actions()) == count)
+
+        return _get_running_actions()
+
+    def _run_with_items_results_in_one_batch(self):
+        wf_service.create_workflows(WITH_ITEMS_WF)
+
+        wf_ex = self.engine.start_workflow('wf')
+
+        action_execs = self._await_running_actions(wf_ex.id, 2)
+
+        # Both results are processed within one transaction that takes
+        # the workflow execution lock and the 'with-items' task lock.
+        self.engine.on_actions_complete([
+            {
+                'action_ex_id': action_execs[0].id,
+                'result': ml_actions.Result(data='a')
+            },
+            {
+                'action_ex_id': action_execs[1].id,
+                'result': ml_actions.Result(data='b')
+            }
+        ])
+
+        self.await_workflow_success(wf_ex.id)
+
+        with db_api.transaction():
+            wf_ex = db_api.get_workflow_execution(wf_ex.id)
+
+            task_ex = wf_ex.task_executions[0]
+
+            self.assertEqual(['a', 'b'], task_ex.published['result'])
+
+    def test_with_items_results_in_one_batch(self):
+        self._run_with_items_results_in_one_batch()
+
+    def test_with_items_results_in_one_batch_in_process_lock(self):
+        # In-process named locks are taken again by the same transaction
+        # without blocking.
+        self.override_config('named_lock_backend', 'in_process', 'engine')
+
+        self._run_with_items_results_in_one_batch()
+
+    @mock.patch.object(
+        default_engine.DefaultEngine,
+        '_on_actions_complete',
+        autospec=True,
+        side_effect=default_engine.DefaultEngine._on_actions_complete
+    )
+    def test_results_of_one_workflow_in_one_transaction(self, process_mock):
+        wf_service.create_workflows(PARALLEL_WF)
+
+        wf_ex = self.engine.start_workflow('wf')
+
+        action_execs = self._await_running_actions(wf_ex.id, 2)
+
+        self.engine.on_actions_complete([
+            {
+                'action_ex_id': a_ex.id,
+                'result': ml_actions.Result(data=a_ex.id)
+            }
+            for a_ex in action_execs
+        ])
+
+        self.await_workflow_success(wf_ex.id)
+
+        self.assertEqual(1, process_mock.call_count)
+        self.assertEqual(wf_ex.id, process_mock.call_args[0][1])
+        self.assertEqual(2, len(process_mock.call_args[0][2]))
+
+    def test_invalid_result_in_batch(self):
+        wf_service.create_workflows(PARALLEL_WF)
+
+        wf_ex = self.engine.start_workflow('wf')
+
+        action_execs = self._await_running_actions(wf_ex.id, 2)
+
+        self.engine.on_actions_complete([
+            {
+                'action_ex_id': action_execs[0].id,
+                'result': ml_actions.Result(data='a')
+            },
+            {
+                'action_ex_id': 'not-existing-action-execution',
+                'result': ml_actions.Result(data='b')
+            },
+            {
+                'action_ex_id': action_execs[1].id,
+                'result': ml_actions.Result(data='c')
+            }
+        ])
+
+        # The valid results are processed anyway.
+        self.await_workflow_success(wf_ex.id)
+
+
+class ExecutorResultBatchTest(base.EngineTestCase):
+    def setUp(self):
+        # The executor reads the options when it is created.
+        self.override_config('result_batch_window', 0.1, 'executor')
+        self.override_config('result_batch_size', 3, 'executor')
+
+        super(ExecutorResultBatchTest, self).setUp()
+
+    @mock.patch.object(
+        rpc_clients.EngineClient,
+        'on_actions_complete',
+        autospec=True,
+        side_effect=rpc_clients.EngineClient.on_actions_complete
+    )
+    def test_executor_sends_results_in_batches(self, client_mock):
+        wf_service.create_workflows(SYNC_WF)
+
+        wf_ex = self.engine.start_workflow('wf')
+
+        self.await_workflow_success(wf_ex.id)
+
+        with db_api.transaction():
+            wf_ex = db_api.get_workflow_execution(wf_ex.id)
+
+            task_ex = wf_ex.task_executions[0]
+
+            self.assertEqual(
+                list(range(0, 5)),
+                sorted(task_ex.published['result'])
+            )
+
+        sent_cnt = sum(len(c[0][1]) for c in client_mock.call_args_list)
+
+        self.assertEqual(5, sent_cnt)
+        self.assertTrue(
+            all(len(c[0][1]) <= 3 for c in client_mock.call_args_list)
+        )
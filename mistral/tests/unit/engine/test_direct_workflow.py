@@ -13,9 +13,11 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import mock
 from oslo_config import cfg
 
 from mistral.db.v2 import api as db_api
+from mistral.engine import workflow_handler as wf_handler
 from mistral import exceptions as exc
 from mistral.lang import parser as spec_parser
 from mistral.services import workflows as wf_service
@@ -737,6 +739,79 @@ class DirectWorkflowEngineTest(base.EngineTestCase):
 
         self.assertIn("Task 'task3' not found", str(exception))
 
+    def test_workflow_completion_on_task_complete(self):
+        # The periodic completion check is only a safety net, the workflow
+        # must complete right after its last task completes.
+        self.override_config('completion_check_interval', 60, 'engine')
+
+        wf_text = """---
+        version: '2.0'
+
+        wf:
+          tasks:
+            async_task:
+              action: std.async_noop
+        """
+
+        wf_service.create_workflows(wf_text)
+
+        wf_ex = self.engine.start_workflow('wf')
+
+        with db_api.transaction():
+            wf_ex = db_api.get_workflow_execution(wf_ex.id)
+
+            task_ex = self._assert_single_item(
+                wf_ex.task_executions,
+                name='async_task'
+            )
+
+            action_ex = self._assert_single_item(
+                task_ex.action_executions,
+                state=states.RUNNING
+            )
+
+        self.engine.on_action_complete(
+            action_ex.id,
+            ml_actions.Result(data='Hi')
+        )
+
+        self.await_workflow_success(wf_ex.id, timeout=10)
+
+    @mock.patch.object(wf_handler, 'check_and_fix_integrity')
+    def test_completion_check_on_task_complete_is_lightweight(self, fix):
+        self.override_config('completion_check_interval', 60, 'engine')
+
+        wf_text = """---
+        version: '2.0'
+
+        wf:
+          tasks:
+            async_task:
+              action: std.async_noop
+        """
+
+        wf_service.create_workflows(wf_text)
+
+        wf_ex = self.engine.start_workflow('wf')
+
+        calls = db_api.get_delayed_calls()
+
+        wf_handler._check_completion(wf_ex.id)
+
+        # Neither integrity is restored nor the check is rescheduled,
+        # it's done only by the periodic safety net check.
+        fix.assert_not_called()
+
+        self.assertEqual(
+            sorted(c.id for c in calls),
+            sorted(c.id for c in db_api.get_delayed_calls())
+        )
+
+        self.assertEqual(
+            states.RUNNING,
+            db_api.get_workflow_execution(wf_ex.id).state
+        )
+
     def test_delete_workflow_completion_check_on_stop(self):
         wf_text = """---
         version: '2.0'
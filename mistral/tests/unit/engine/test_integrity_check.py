@@ -28,6 +28,11 @@ class IntegrityCheckTest(base.EngineTestCase):
             2,
             group='engine'
         )
+        self.override_config(
+            'completion_check_interval',
+            2,
+            group='engine'
+        )
 
     def test_task_execution_integrity(self):
         # The idea of the test is that we use the no-op asynchronous action
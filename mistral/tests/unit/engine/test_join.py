@@ -12,6 +12,7 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import mock
 from oslo_config import cfg
 import testtools
 
@@ -20,6 +21,8 @@ from mistral.lang.v2 import tasks as tasks_lang
 from mistral.services import workflows as wf_service
 from mistral.tests.unit.engine import base
 from mistral import utils
+from mistral.workflow import base as wf_base
+from mistral.workflow import direct_workflow as d_wf
 from mistral.workflow import states
 
 
@@ -235,7 +238,8 @@ class JoinEngineTest(base.EngineTestCase):
         # uncertainty of its running in parallel with task3.
         self.await_task_success(task4.id)
 
-        self.assertEqual(states.RUNNING, wf_ex.state)
+        # Note: The workflow may have already failed by now since its
+        # completion is checked right after task3 fails.
         self.assertEqual(states.SUCCESS, task1.state)
         self.assertEqual(states.SUCCESS, task2.state)
 
@@ -1308,3 +1312,180 @@ class JoinEngineTest(base.EngineTestCase):
         self.assertEqual(states.SUCCESS, task1.state)
         self.assertEqual(states.SUCCESS, task2.state)
         self.assertEqual(states.SUCCESS, task3.state)
+
+    def test_full_join_counts_arrivals(self):
+        branches_cnt = 20
+
+        wf_text = """---
+        version: '2.0'
+
+        wf:
+          tasks:
+            join_task:
+              join: all
+        """
+
+        for i in range(branches_cnt):
+            wf_text += """
+            task%s:
+              on-success: join_task
+            """ % i
+
+        wf_service.create_workflows(wf_text)
+
+        wf_ex = self.engine.start_workflow('wf')
+
+        self.await_workflow_success(wf_ex.id)
+
+        with db_api.transaction():
+            wf_ex = db_api.get_workflow_execution(wf_ex.id)
+
+            join_task_ex = self._assert_single_item(
+                wf_ex.task_executions,
+                name='join_task'
+            )
+
+            # Every inbound task has been registered once when it triggered
+            # the 'join' task.
+            self.assertEqual(
+                sorted(['task%s' % i for i in range(branches_cnt)]),
+                sorted(join_task_ex.runtime_context['join_arrivals'].keys())
+            )
+
+    @mock.patch.object(
+        d_wf.DirectWorkflowController,
+        '_get_join_logical_state',
+        # Pretend that the full evaluation always finds the 'join' task
+        # blocked and postpones the next periodic check for long.
+        return_value=wf_base.TaskLogicalState(
+            states.WAITING,
+            cardinality=100000
+        )
+    )
+    def test_full_join_fires_on_last_arrival(self, get_join_state_mock):
+        wf_text = """---
+        version: '2.0'
+
+        wf:
+          tasks:
+            task1:
+              on-success: join_task
+
+            task2:
+              on-success: join_task
+
+            join_task:
+              join: all
+        """
+
+        wf_service.create_workflows(wf_text)
+
+        wf_ex = self.engine.start_workflow('wf')
+
+        # The 'join' task is run right after the last inbound task arrives
+        # without evaluating states of all inbound tasks.
+        self.await_workflow_success(wf_ex.id, timeout=10)
+
+        with db_api.transaction():
+            wf_ex = db_api.get_workflow_execution(wf_ex.id)
+
+            join_task_ex = self._assert_single_item(
+                wf_ex.task_executions,
+                name='join_task'
+            )
+
+            self.assertEqual(states.SUCCESS, join_task_ex.state)
+
+            task_ids = [
+                t['task_id']
+                for t in join_task_ex.runtime_context['triggered_by']
+            ]
+
+            self.assertEqual(
+                sorted(
+                    [
+                        t_ex.id for t_ex in wf_ex.task_executions
+                        if t_ex.name in ['task1', 'task2']
+                    ]
+                ),
+                sorted(task_ids)
+            )
+
+    def test_join_one_counts_arrivals(self):
+        wf_text = """---
+        version: '2.0'
+
+        wf:
+          tasks:
+            task1:
+              on-success: join_task
+
+            task2:
+              on-success: join_task
+
+            join_task:
+              join: one
+        """
+
+        wf_service.create_workflows(wf_text)
+
+        wf_ex = self.engine.start_workflow('wf')
+
+        self.await_workflow_success(wf_ex.id)
+
+        with db_api.transaction():
+            wf_ex = db_api.get_workflow_execution(wf_ex.id)
+
+            join_task_ex = self._assert_single_item(
+                wf_ex.task_executions,
+                name='join_task'
+            )
+
+            self.assertEqual(states.SUCCESS, join_task_ex.state)
+
+            arrivals = join_task_ex.runtime_context['join_arrivals']
+
+            # The 'join' task runs once the first inbound task arrives.
+            self.assertGreaterEqual(len(arrivals), 1)
+            self.assertTrue(set(arrivals.keys()) <= {'task1', 'task2'})
+
+    def test_numeric_join_counts_arrivals(self):
+        wf_text = """---
+        version: '2.0'
+
+        wf:
+          tasks:
+            task1:
+              on-success: join_task
+
+            task2:
+              on-success: join_task
+
+            task3:
+              action: std.fail
+              on-success: join_task
+              on-error: noop
+
+            join_task:
+              join: 2
+        """
+
+        wf_service.create_workflows(wf_text)
+
+        wf_ex = self.engine.start_workflow('wf')
+
+        self.await_workflow_success(wf_ex.id)
+
+        with db_api.transaction():
+            wf_ex = db_api.get_workflow_execution(wf_ex.id)
+
+            join_task_ex = self._assert_single_item(
+                wf_ex.task_executions,
+                name='join_task'
+            )
+
+            self.assertEqual(states.SUCCESS, join_task_ex.state)
+            self.assertEqual(
+                ['task1', 'task2'],
+                sorted(join_task_ex.runtime_context['join_arrivals'].keys())
+            )
@@ -169,10 +169,7 @@ class RandomSleepEchoAction(actions_base.Action):
 
 class WithItemsEngineTest(base.EngineTestCase):
     def _assert_capacity(self, capacity, task_ex):
-        self.assertEqual(
-            capacity,
-            task_ex.runtime_context['with_items']['capacity']
-        )
+        self.assertEqual(capacity, task_ex.capacity)
 
     @staticmethod
     def _get_incomplete_action(task_ex):
@@ -61,3 +61,38 @@ class WithItemsTaskTest(base.BaseTest):
         indexes = task._get_next_indexes()
 
         self.assertListEqual([2, 3, 4], indexes)
+
+    def test_capacity(self):
+        # Task execution for running 6 items with concurrency=3.
+        task_ex = models.TaskExecution(
+            spec={
+                'action': 'myaction'
+            },
+            runtime_context={
+                'concurrency': 3,
+                'with_items': {
+                    'count': 6
+                }
+            },
+            capacity=3,
+            action_executions=[],
+            workflow_executions=[]
+        )
+
+        task = tasks.WithItemsTask(None, None, None, {}, task_ex)
+
+        task._decrease_capacity(3)
+
+        self.assertEqual(0, task_ex.capacity)
+        self.assertListEqual([], task._get_next_indexes())
+
+        task._increase_capacity()
+
+        self.assertEqual(1, task_ex.capacity)
+        self.assertListEqual([0], task._get_next_indexes())
+
+        # The runtime context is not changed.
+        self.assertEqual(
+            {'concurrency': 3, 'with_items': {'count': 6}},
+            task_ex.runtime_context
+        )
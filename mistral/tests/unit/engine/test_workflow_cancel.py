@@ -256,6 +256,66 @@ class WorkflowCancelTest(base.EngineTestCase):
         self.assertEqual(states.CANCELLED, subwf_execs[0].state)
         self.assertEqual("Cancelled by user.", subwf_execs[0].state_info)
 
+    def test_cancel_nested_sub_workflows(self):
+        workbook = """
+        version: '2.0'
+
+        name: wb
+
+        workflows:
+            wf:
+              tasks:
+                task1:
+                  workflow: subwf1
+
+                task2:
+                  workflow: subwf1
+
+            subwf1:
+              tasks:
+                task1:
+                  workflow: subwf2
+
+            subwf2:
+              tasks:
+                task1:
+                  action: std.async_noop
+        """
+
+        wb_service.create_workbook_v2(workbook)
+
+        wf_ex = self.engine.start_workflow('wb.wf')
+
+        def _get_sub_wf_execs():
+            return db_api.get_workflow_executions(
+                root_execution_id=wf_ex.id
+            )
+
+        self._await(lambda: len(_get_sub_wf_execs()) == 4)
+
+        self.engine.stop_workflow(
+            wf_ex.id,
+            states.CANCELLED,
+            "Cancelled by user."
+        )
+
+        self.await_workflow_cancelled(wf_ex.id)
+
+        for sub_wf_ex in _get_sub_wf_execs():
+            self.await_workflow_cancelled(sub_wf_ex.id)
+
+        for sub_wf_ex in _get_sub_wf_execs():
+            self.assertEqual("Cancelled by user.", sub_wf_ex.state_info)
+            self.assertTrue(sub_wf_ex.accepted)
+
+        with db_api.transaction():
+            wf_ex = db_api.get_workflow_execution(wf_ex.id)
+
+            task_execs = wf_ex.task_executions
+
+        for task_ex in task_execs:
+            self.await_task_cancelled(task_ex.id)
+
     def test_cancel_child_workflow(self):
         workbook = """
         version: '2.0'
@@ -0,0 +1,227 @@
+# Copyright 2019 - Nokia Networks.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import eventlet
+from eventlet import wsgi
+import mock
+
+from mistral import context
+from mistral.executors import default_executor
+from mistral.executors import executor_server
+from mistral.rpc import clients as rpc_clients
+from mistral.tests.unit import base
+from mistral.utils import http_utils
+
+HTTP = 'mistral.actions.std_actions.HTTPAction'
+
+ACTION_COUNT = 1000
+
+# The default value of "executor_thread_pool_size".
+THREAD_POOL_SIZE = 64
+
+
+class IOPoolTest(base.BaseTest):
+    def setUp(self):
+        super(IOPoolTest, self).setUp()
+
+        self.override_config('io_pool_size', 2 * ACTION_COUNT, 'executor')
+        self.override_config('pool_maxsize', ACTION_COUNT, 'http_client')
+
+        self.addCleanup(http_utils.close_sessions)
+
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        sock = eventlet.listen(('127.0.0.1', 0), backlog=2 * ACTION_COUNT)
+
+        self.url = 'http://127.0.0.1:%s/' % sock.getsockname()[1]
+
+        http_server = eventlet.spawn(
+            wsgi.server,
+            sock,
+            self._slow_app,
+            max_size=2 * ACTION_COUNT,
+            log_output=False
+        )
+
+        self.addCleanup(http_server.kill)
+
+        with mock.patch.object(rpc_clients, 'get_engine_client'):
+            self.executor = default_executor.DefaultExecutor()
+
+        self.server = executor_server.ExecutorServer(
+            self.executor,
+            setup_profiler=False
+        )
+
+        self.server._aer = mock.Mock()
+
+        context.set_ctx(base.get_context())
+
+        self.addCleanup(context.set_ctx, None)
+
+    def _slow_app(self, env, start_response):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            eventlet.sleep(1)
+        finally:
+            self.in_flight -= 1
+
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+
+        return [b'done']
+
+    def test_run_http_actions_in_io_pool(self):
+        engine_client = self.executor._engine_client
+
+        actions = [
+            {
+                'action_ex_id': str(i),
+                'action_cls_str': HTTP,
+                'action_cls_attrs': {},
+                'params': {'url': self.url},
+                'safe_rerun': False,
+                'execution_context': {},
+                'timeout': None
+            }
+            for i in range(ACTION_COUNT)
+        ]
+
+        self.server.run_actions(mock.Mock(redelivered=False), actions)
+
+        self._await(
+            lambda:
+            engine_client.on_action_complete.call_count == ACTION_COUNT,
+            delay=0.5
+        )
+
+        # The slow requests have been waiting for responses together,
+        # the thread pool of the executor doesn't limit them.
+        self.assertGreater(self.max_in_flight, THREAD_POOL_SIZE)
+
+        results = [
+            c[0][1] for c in engine_client.on_action_complete.call_args_list
+        ]
+
+        self.assertTrue(all(r.data['status'] == 200 for r in results))
+        self.assertEqual(
+            [str(i) for i in range(ACTION_COUNT)],
+            sorted(
+                (c[0][0] for c in
+                 engine_client.on_action_complete.call_args_list),
+                key=int
+            )
+        )
+
+    def test_io_pool_disabled(self):
+        self.override_config('io_pool_size', 0, 'executor')
+
+        self.assertFalse(
+            self.server._is_io_bound({
+                'action_cls_str': HTTP,
+                'action_cls_attrs': {}
+            })
+        )
+
+    def test_io_pool_actions(self):
+        self.override_config(
+            'io_pool_actions',
+            ['mistral.actions.std_actions.EchoAction'],
+            'executor'
+        )
+
+        self.assertTrue(
+            self.server._is_io_bound({
+                'action_cls_str': 'mistral.actions.std_actions.EchoAction',
+                'action_cls_attrs': {}
+            })
+        )
+        self.assertFalse(
+            self.server._is_io_bound({
+                'action_cls_str': 'mistral.actions.std_actions.NoOpAction',
+                'action_cls_attrs': {}
+            })
+        )
+
+
+class ConcurrencyLimitTest(base.BaseTest):
+    def setUp(self):
+        super(ConcurrencyLimitTest, self).setUp()
+
+        self.override_config('concurrency_limit', 2, 'executor')
+
+        self.executor = mock.Mock()
+
+        self.server = executor_server.ExecutorServer(
+            self.executor,
+            setup_profiler=False
+        )
+
+        self.server._aer = mock.Mock()
+
+        self.running = 0
+        self.max_running = 0
+
+        def _run_action(*args, **kwargs):
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+
+            try:
+                eventlet.sleep(0.1)
+            finally:
+                self.running -= 1
+
+        self.executor.run_action.side_effect = _run_action
+
+    def _run_action(self, limited=True):
+        self.server._run_action(
+            'id', 'cls', {}, {}, False, {}, False, None, limited=limited
+        )
+
+    def test_concurrency_limit(self):
+        pool = eventlet.GreenPool()
+
+        for _ in range(6):
+            pool.spawn_n(self._run_action)
+
+        pool.waitall()
+
+        self.assertEqual(2, self.max_running)
+        self.assertEqual(0, self.server._running_cnt)
+
+    def test_io_bound_actions_not_limited(self):
+        pool = eventlet.GreenPool()
+
+        for _ in range(6):
+            pool.spawn_n(self._run_action, False)
+
+        pool.waitall()
+
+        self.assertEqual(6, self.max_running)
+
+    @mock.patch('mistral.service.coordination.get_service_coordinator')
+    def test_report_capacity(self, get_coordinator_mock):
+        self.server._rpc_server = mock.Mock(server_id='host1')
+        self.server._running_cnt = 1
+
+        self.server._report_capacity()
+
+        coordinator = get_coordinator_mock.return_value
+
+        coordinator.update_capabilities.assert_called_once_with(
+            'executor_group',
+            {'free_slots': 1, 'rpc_server': 'host1'}
+        )
@@ -0,0 +1,145 @@
+# Copyright 2019 - Nokia Networks.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import mock
+
+from mistral import context
+from mistral import exceptions as exc
+from mistral.executors import default_executor
+from mistral.executors import process_pool
+from mistral.tests.unit import base
+
+ECHO = 'mistral.actions.std_actions.EchoAction'
+SLEEP = 'mistral.actions.std_actions.SleepAction'
+
+EXECUTION_CONTEXT = {
+    'workflow_execution_id': 'wf-ex-id',
+    'task_execution_id': 'task-ex-id',
+    'action_execution_id': 'action-ex-id'
+}
+
+
+class ProcessPoolTest(base.BaseTest):
+    def setUp(self):
+        super(ProcessPoolTest, self).setUp()
+
+        context.set_ctx(base.get_context())
+
+        self.addCleanup(context.set_ctx, None)
+
+        self.pool = process_pool.ProcessPool(1, max_result_size=1024)
+
+        self.addCleanup(self._shutdown_pool)
+
+    def _shutdown_pool(self):
+        if self.pool._pool:
+            self.pool._pool.shutdown()
+
+    def test_run_action(self):
+        result = self.pool.run_action(
+            ECHO,
+            {},
+            {'output': 'Hello'},
+            EXECUTION_CONTEXT
+        )
+
+        self.assertEqual('Hello', result.data)
+
+        # The result size is limited.
+        result = self.pool.run_action(
+            ECHO,
+            {},
+            {'output': 'x' * 2048},
+            EXECUTION_CONTEXT
+        )
+
+        self.assertTrue(result.is_error())
+        self.assertIn('exceeds the limit', result.error)
+
+    def test_run_action_timeout(self):
+        self.assertRaisesWithMessage(
+            exc.ActionException,
+            'Action timed out.',
+            self.pool.run_action,
+            SLEEP,
+            {},
+            {'seconds': 10},
+            EXECUTION_CONTEXT,
+            timeout=1
+        )
+
+        # The worker process is still usable.
+        result = self.pool.run_action(
+            ECHO,
+            {},
+            {'output': 'Hello'},
+            EXECUTION_CONTEXT
+        )
+
+        self.assertEqual('Hello', result.data)
+
+    def test_recycle_workers(self):
+        self.pool = process_pool.ProcessPool(1, recycle_after=2)
+
+        pools = []
+
+        for i in range(3):
+            self.pool.run_action(ECHO, {}, {'output': i}, EXECUTION_CONTEXT)
+
+            pools.append(self.pool._pool)
+
+        self.assertIs(pools[0], pools[1])
+        self.assertIsNot(pools[1], pools[2])
+
+    @mock.patch.object(process_pool.ProcessPool, 'run_action')
+    def test_default_executor_dispatch(self, run_action):
+        self.override_config('process_pool_size', 1, 'executor')
+        self.override_config('process_pool_actions', [ECHO], 'executor')
+
+        run_action.side_effect = lambda *args, **kw: 'From pool'
+
+        executor = default_executor.DefaultExecutor()
+
+        result = executor.run_action(
+            None,
+            ECHO,
+            {},
+            {'output': 'Hello'},
+            True,
+            EXECUTION_CONTEXT,
+            timeout=10
+        )
+
+        self.assertEqual('From pool', result.data)
+
+        run_action.assert_called_once_with(
+            ECHO,
+            {},
+            {'output': 'Hello'},
+            EXECUTION_CONTEXT,
+            timeout=10
+        )
+
+        # Other actions run within the executor process.
+        result = executor.run_action(
+            None,
+            'mistral.actions.std_actions.NoOpAction',
+            {},
+            {},
+            True,
+            EXECUTION_CONTEXT
+        )
+
+        self.assertEqual(1, run_action.call_count)
+        self.assertFalse(result.is_error())
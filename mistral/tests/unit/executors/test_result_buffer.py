@@ -0,0 +1,100 @@
+# Copyright 2019 - Nokia Networks.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import eventlet
+import mock
+from mistral_lib import actions as ml_actions
+
+from mistral import context
+from mistral.executors import result_buffer
+from mistral.tests.unit import base
+
+
+class ResultBufferTest(base.BaseTest):
+    def setUp(self):
+        super(ResultBufferTest, self).setUp()
+
+        self.engine_client = mock.Mock()
+
+    def test_send_by_batch_size(self):
+        buf = result_buffer.ResultBuffer(self.engine_client, 60, 2)
+
+        buf.add('1', ml_actions.Result(data=1))
+
+        self.assertEqual(0, self.engine_client.on_actions_complete.call_count)
+
+        buf.add('2', ml_actions.Result(data=2))
+
+        self.engine_client.on_actions_complete.assert_called_once_with([
+            {'action_ex_id': '1', 'result': ml_actions.Result(data=1)},
+            {'action_ex_id': '2', 'result': ml_actions.Result(data=2)}
+        ])
+
+        buf.flush()
+
+    def test_send_by_window(self):
+        buf = result_buffer.ResultBuffer(self.engine_client, 0.01, 100)
+
+        buf.add('1', ml_actions.Result(data=1))
+
+        self._await(
+            lambda: self.engine_client.on_actions_complete.call_count == 1
+        )
+
+        # Nothing is left to send.
+        buf.flush()
+
+        eventlet.sleep(0.05)
+
+        self.assertEqual(1, self.engine_client.on_actions_complete.call_count)
+
+    def test_flush(self):
+        buf = result_buffer.ResultBuffer(self.engine_client, 60, 100)
+
+        buf.add('1', ml_actions.Result(data=1))
+        buf.flush()
+
+        self.assertEqual(1, self.engine_client.on_actions_complete.call_count)
+        self.assertIsNone(buf._timer)
+
+    def test_send_by_security_context(self):
+        buf = result_buffer.ResultBuffer(self.engine_client, 60, 100)
+
+        context.set_ctx(base.get_context())
+        buf.add('1', ml_actions.Result(data=1))
+
+        context.set_ctx(base.get_context(default=False))
+        buf.add('2', ml_actions.Result(data=2))
+
+        context.set_ctx(None)
+
+        buf.flush()
+
+        # Results of different users are sent with separate calls.
+        self.assertEqual(2, self.engine_client.on_actions_complete.call_count)
+
+    def test_send_one_by_one_on_failure(self):
+        self.engine_client.on_actions_complete.side_effect = Exception(
+            'Not supported'
+        )
+
+        buf = result_buffer.ResultBuffer(self.engine_client, 60, 2)
+
+        buf.add('1', ml_actions.Result(data=1))
+        buf.add('2', ml_actions.Result(data=2))
+
+        self.engine_client.on_action_complete.assert_has_calls([
+            mock.call('1', ml_actions.Result(data=1), async_=True),
+            mock.call('2', ml_actions.Result(data=2), async_=True)
+        ])
@@ -0,0 +1,156 @@
+# Copyright 2019 - Nokia Networks.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import mock
+
+from mistral import context as auth_context
+from mistral.rpc import base as rpc_base
+from mistral.rpc import clients
+from mistral.service import coordination
+from mistral.tests.unit import base
+
+
+class EngineClientAffinityTest(base.BaseTest):
+    def setUp(self):
+        super(EngineClientAffinityTest, self).setUp()
+
+        auth_context.set_ctx(base.get_context())
+        self.addCleanup(auth_context.set_ctx, None)
+
+        self.rpc_client = mock.Mock()
+
+        patch = mock.patch.object(
+            rpc_base,
+            'get_rpc_client_driver',
+            return_value=mock.Mock(return_value=self.rpc_client)
+        )
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    @mock.patch.object(
+        coordination.MemberRing,
+        'get_member',
+        return_value='engine1'
+    )
+    def test_calls_routed_to_owner(self, get_member_mock):
+        self.override_config('execution_affinity', True, 'engine')
+
+        client = clients.EngineClient(mock.Mock())
+
+        client.pause_workflow('wf_ex_id')
+
+        get_member_mock.assert_called_with('wf_ex_id')
+
+        self.assertEqual(
+            'engine1',
+            self.rpc_client.sync_call.call_args[1]['target']
+        )
+
+        client.on_action_complete(
+            'action_ex_id',
+            'result',
+            wf_ex_id='wf_ex_id'
+        )
+
+        self.assertEqual(
+            'engine1',
+            self.rpc_client.sync_call.call_args[1]['target']
+        )
+
+    @mock.patch.object(
+        coordination.MemberRing,
+        'get_member',
+        return_value='engine1'
+    )
+    def test_casts_not_routed(self, get_member_mock):
+        self.override_config('execution_affinity', True, 'engine')
+
+        client = clients.EngineClient(mock.Mock())
+
+        # The result would be lost if the owning engine had gone.
+        client.on_action_complete(
+            'action_ex_id',
+            'result',
+            async_=True,
+            wf_ex_id='wf_ex_id'
+        )
+
+        self.assertIsNone(self.rpc_client.async_call.call_args[1]['target'])
+
+    def test_calls_not_routed_without_affinity(self):
+        client = clients.EngineClient(mock.Mock())
+
+        client.pause_workflow('wf_ex_id')
+
+        self.assertIsNone(self.rpc_client.sync_call.call_args[1]['target'])
+
+
+class ExecutorClientCapacityTest(base.BaseTest):
+    def setUp(self):
+        super(ExecutorClientCapacityTest, self).setUp()
+
+        auth_context.set_ctx(base.get_context())
+        self.addCleanup(auth_context.set_ctx, None)
+
+        self.rpc_client = mock.Mock()
+
+        patch = mock.patch.object(
+            rpc_base,
+            'get_rpc_client_driver',
+            return_value=mock.Mock(return_value=self.rpc_client)
+        )
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def _run_action(self, client):
+        client.run_action('action_ex_id', 'cls', {}, {}, False, {})
+
+    @mock.patch.object(
+        coordination.MemberCapacity,
+        'get_member',
+        return_value='executor1'
+    )
+    def test_calls_routed_by_capacity(self, get_member_mock):
+        self.override_config('capacity_routing', True, 'executor')
+        self.override_config('run_actions_batch_size', 2, 'executor')
+
+        client = clients.ExecutorClient(mock.Mock())
+
+        self._run_action(client)
+
+        get_member_mock.assert_called_once_with(1)
+
+        self.assertEqual(
+            'executor1',
+            self.rpc_client.async_call.call_args[1]['target']
+        )
+
+        get_member_mock.reset_mock()
+
+        client.run_actions([{}, {}, {}])
+
+        # Every chunk takes as many slots as many actions it has.
+        self.assertEqual(
+            [mock.call(2), mock.call(1)],
+            get_member_mock.call_args_list
+        )
+
+    def test_calls_not_routed_without_capacity_routing(self):
+        client = clients.ExecutorClient(mock.Mock())
+
+        self._run_action(client)
+        client.run_actions([{}])
+
+        for c in self.rpc_client.async_call.call_args_list:
+            self.assertIsNone(c[1]['target'])
@@ -12,14 +12,18 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
+import eventlet
 from eventlet import event
 from eventlet import semaphore
 from eventlet import timeout
 
 import datetime
 import mock
+from sqlalchemy.dialects import postgresql
 
 from mistral.db.v2 import api as db_api
+from mistral.db.v2.sqlalchemy import api as sa_api
+from mistral.db.v2.sqlalchemy import models as db_models
 from mistral.scheduler import base as scheduler_base
 from mistral.scheduler import default_scheduler
 from mistral.tests.unit import base
@@ -108,6 +112,44 @@ class SchedulerTest(base.DbTestCase):
         # After the job is processed the persistent object must be deleted.
         self._await(lambda: not db_api.get_scheduled_jobs())
 
+    @mock.patch(TARGET_METHOD_PATH)
+    def test_schedule_in_timer_wheel(self, method):
+        with db_api.transaction():
+            self.scheduler.schedule(
+                scheduler_base.SchedulerJob(
+                    run_after=1,
+                    func_name=TARGET_METHOD_PATH,
+                    func_args={'name': 'task'}
+                )
+            )
+
+        # A short job is kept by the timing wheel, not by a green thread.
+        self.assertEqual(0, len(self.scheduler.memory_jobs))
+
+        self._await(lambda: not db_api.get_scheduled_jobs())
+
+        method.assert_called_once_with(name='task')
+
+    @mock.patch(TARGET_METHOD_PATH)
+    def test_schedule_without_timer_wheel(self, method):
+        self.override_config('timer_wheel_max_delay', 0.5, 'scheduler')
+
+        self.scheduler.schedule(
+            scheduler_base.SchedulerJob(
+                run_after=1,
+                func_name=TARGET_METHOD_PATH,
+                func_args={'name': 'task'}
+            )
+        )
+
+        self.assertEqual(1, len(self.scheduler.memory_jobs))
+
+        self._await(lambda: not db_api.get_scheduled_jobs())
+
+        method.assert_called_once_with(name='task')
+
+        self.assertEqual(0, len(self.scheduler.memory_jobs))
+
     @mock.patch(TARGET_METHOD_PATH)
     def test_pickup_from_job_store(self, method):
         method.side_effect = self.target_method
@@ -174,3 +216,370 @@ class SchedulerTest(base.DbTestCase):
             datetime.datetime.now() - before_ts >=
             datetime.timedelta(seconds=3)
         )
+
+    def _test_capture_scheduled_jobs(self, capture_mode):
+        self.override_config('job_capture_mode', capture_mode, 'scheduler')
+
+        # Stop the scheduler so that it doesn't interfere.
+        self.scheduler.stop(True)
+
+        now = datetime.datetime.now()
+
+        for _ in range(3):
+            db_api.create_scheduled_job({
+                'run_after': 1,
+                'func_name': TARGET_METHOD_PATH,
+                'func_args': {},
+                'execute_at': now,
+                'captured_at': None,
+                'auth_ctx': {}
+            })
+
+        jobs = db_api.get_scheduled_jobs()
+
+        # Simulate another scheduler that captured one of the selected jobs.
+        db_api.update_scheduled_job(jobs[2].id, {'captured_at': now})
+
+        with db_api.transaction():
+            captured_jobs = self.scheduler._capture_scheduled_jobs(jobs)
+
+        self.assertEqual(2, len(captured_jobs))
+        self.assertEqual(
+            {'captured': 2, 'contended': 1, 'coalesced': 0},
+            self.scheduler.get_stats()
+        )
+
+        for job in db_api.get_scheduled_jobs():
+            self.assertIsNotNone(job.captured_at)
+
+    def test_capture_scheduled_jobs_batch(self):
+        self._test_capture_scheduled_jobs('batch')
+
+    def test_capture_scheduled_jobs_per_job(self):
+        self._test_capture_scheduled_jobs('per_job')
+
+    def test_capture_scheduled_jobs_to_start(self):
+        # Stop the scheduler so that it doesn't interfere.
+        self.scheduler.stop(True)
+
+        now = datetime.datetime.now()
+
+        for i in range(4):
+            db_api.create_scheduled_job({
+                'run_after': 1,
+                'func_name': TARGET_METHOD_PATH,
+                'func_args': {'i': i},
+                'execute_at': now - datetime.timedelta(hours=1, seconds=-i),
+                'captured_at': None,
+                'auth_ctx': {}
+            })
+
+        jobs = db_api.get_scheduled_jobs()
+
+        # Simulate another scheduler that captured one of the jobs.
+        captured_by_other = [j for j in jobs if j.func_args['i'] == 0][0]
+
+        db_api.update_scheduled_job(captured_by_other.id, {'captured_at': now})
+
+        with db_api.transaction():
+            captured_jobs = db_api.capture_scheduled_jobs_to_start(
+                now,
+                now,
+                batch_size=2
+            )
+
+        # The earliest jobs that were not captured yet.
+        self.assertEqual(
+            [1, 2],
+            sorted(j.func_args['i'] for j in captured_jobs)
+        )
+
+        for job in captured_jobs:
+            self.assertEqual(now, db_api.get_scheduled_job(job.id).captured_at)
+
+    def test_capture_scheduled_jobs_to_start_statement(self):
+        now = datetime.datetime.now()
+
+        stmt = sa_api._get_capture_scheduled_jobs_to_start_statement(
+            db_models.ScheduledJob.__table__,
+            now,
+            now,
+            batch_size=10
+        )
+
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+        # Jobs are selected and captured with one statement.
+        self.assertTrue(sql.startswith('UPDATE scheduled_jobs_v2'))
+        self.assertIn('ORDER BY scheduled_jobs_v2.execute_at', sql)
+        self.assertIn('LIMIT', sql)
+        self.assertIn('FOR UPDATE SKIP LOCKED', sql)
+        self.assertIn('RETURNING', sql)
+
+    def _create_due_jobs(self, func_args_list):
+        execute_at = datetime.datetime.now() - datetime.timedelta(seconds=2)
+
+        for func_args in func_args_list:
+            db_api.create_scheduled_job({
+                'run_after': 1,
+                'func_name': TARGET_METHOD_PATH,
+                'func_args': func_args,
+                'execute_at': execute_at,
+                'captured_at': None,
+                'auth_ctx': {}
+            })
+
+    @mock.patch(TARGET_METHOD_PATH)
+    def test_store_jobs_invoked_in_parallel(self, method):
+        self.override_config('pickup_job_after', 1, 'scheduler')
+        self.override_config('job_pool_size', 2, 'scheduler')
+
+        self.scheduler.stop(True)
+
+        fast_job_finished = event.Event()
+
+        def _target_method(name):
+            if name == 'slow':
+                # The slow job can finish only after the fast one.
+                fast_job_finished.wait()
+            else:
+                fast_job_finished.send()
+
+        method.side_effect = _target_method
+
+        self._create_due_jobs([{'name': 'slow'}, {'name': 'fast'}])
+
+        scheduler = default_scheduler.DefaultScheduler(1, 1, 100)
+
+        scheduler._process_store_jobs()
+        scheduler._job_pool.waitall()
+
+        self.assertEqual(2, method.call_count)
+        self.assertEqual(0, len(db_api.get_scheduled_jobs()))
+
+    @mock.patch(TARGET_METHOD_PATH)
+    def test_slow_store_job_does_not_block_polling(self, method):
+        self.override_config('pickup_job_after', 1, 'scheduler')
+        self.override_config('job_pool_size', 2, 'scheduler')
+
+        self.scheduler.stop(True)
+
+        slow_job_released = event.Event()
+
+        def _target_method(name):
+            if name == 'slow':
+                slow_job_released.wait()
+
+        method.side_effect = _target_method
+
+        self._create_due_jobs([{'name': 'slow'}])
+
+        scheduler = default_scheduler.DefaultScheduler(1, 1, 100)
+
+        scheduler._process_store_jobs()
+
+        # Let the slow job start.
+        eventlet.sleep(0.1)
+
+        self._create_due_jobs([{'name': 'fast'}, {'name': 'fast'}])
+
+        # Polling doesn't wait for the slow job and captures only as
+        # many jobs as there are free green threads in the pool.
+        scheduler._process_store_jobs()
+
+        self._await(lambda: method.call_count == 2)
+
+        self.assertEqual(2, len(db_api.get_scheduled_jobs()))
+        self.assertEqual(2, scheduler.get_stats()['captured'])
+
+        slow_job_released.send()
+
+        scheduler._job_pool.waitall()
+
+        scheduler._process_store_jobs()
+        scheduler._job_pool.waitall()
+
+        self.assertEqual(3, method.call_count)
+        self.assertEqual(0, len(db_api.get_scheduled_jobs()))
+
+    @mock.patch.object(default_scheduler, 'LOG')
+    def test_store_job_failure_logged(self, log):
+        self.override_config('pickup_job_after', 1, 'scheduler')
+
+        self.scheduler.stop(True)
+
+        db_api.create_scheduled_job({
+            'run_after': 1,
+            'func_name': 'mistral.not_existing.function',
+            'func_args': {},
+            'execute_at': (
+                datetime.datetime.now() - datetime.timedelta(seconds=2)
+            ),
+            'captured_at': None,
+            'auth_ctx': {}
+        })
+
+        scheduler = default_scheduler.DefaultScheduler(1, 1, 100)
+
+        scheduler._process_store_jobs()
+        scheduler._job_pool.waitall()
+
+        self.assertEqual(1, log.exception.call_count)
+
+    @mock.patch(TARGET_METHOD_PATH)
+    def test_store_job_timeout(self, method):
+        self.override_config('pickup_job_after', 1, 'scheduler')
+        self.override_config('job_timeout', 0.1, 'scheduler')
+
+        self.scheduler.stop(True)
+
+        method.side_effect = lambda name: eventlet.sleep(
+            10 if name == 'slow' else 0
+        )
+
+        self._create_due_jobs([{'name': 'slow'}, {'name': 'fast'}])
+
+        scheduler = default_scheduler.DefaultScheduler(1, 1, 100)
+
+        scheduler._process_store_jobs()
+        scheduler._job_pool.waitall()
+
+        self.assertEqual(2, method.call_count)
+
+        # The interrupted job must stay in Job Store.
+        jobs = db_api.get_scheduled_jobs()
+
+        self.assertEqual(1, len(jobs))
+        self.assertEqual({'name': 'slow'}, jobs[0].func_args)
+
+    def test_coalesce_jobs_by_key(self):
+        self.scheduler.stop(True)
+
+        scheduler = default_scheduler.DefaultScheduler(1, 1, 100)
+
+        for run_after in (5, 10, 1):
+            scheduler.schedule(
+                scheduler_base.SchedulerJob(
+                    run_after=run_after,
+                    func_name=TARGET_METHOD_PATH,
+                    func_args={'name': 'task'},
+                    key='test-key'
+                )
+            )
+
+        # A job with other arguments is never coalesced.
+        scheduler.schedule(
+            scheduler_base.SchedulerJob(
+                run_after=10,
+                func_name=TARGET_METHOD_PATH,
+                func_args={'name': 'other-task'},
+                key='test-key'
+            )
+        )
+
+        jobs = db_api.get_scheduled_jobs(key='test-key')
+
+        self.assertEqual(2, len(jobs))
+
+        job = self._assert_single_item(jobs, func_args={'name': 'task'})
+
+        # Only the earliest job is kept.
+        self.assertEqual(1, job.run_after)
+        self.assertEqual(2, scheduler.get_stats()['coalesced'])
+
+        for thread in scheduler.memory_jobs:
+            thread.kill()
+
+    @mock.patch(TARGET_METHOD_PATH)
+    @mock.patch.object(default_scheduler, 'LOG')
+    def test_superseded_memory_job_not_reported(self, log, method):
+        self.scheduler.stop(True)
+
+        scheduler = default_scheduler.DefaultScheduler(1, 1, 100)
+
+        for run_after in (0.5, 0):
+            scheduler.schedule(
+                scheduler_base.SchedulerJob(
+                    run_after=run_after,
+                    func_name=TARGET_METHOD_PATH,
+                    func_args={'name': 'task'},
+                    key='test-key'
+                )
+            )
+
+        self.assertEqual(1, scheduler.get_stats()['coalesced'])
+
+        # Wait till the in-memory entry of the superseded job fires.
+        eventlet.sleep(1)
+
+        method.assert_called_once_with(name='task')
+
+        log.warning.assert_not_called()
+
+    def test_prepare_job_keeps_job_values(self):
+        self.scheduler.stop(True)
+
+        auth_ctx = {'project_id': 'p', 'trace_info': {'hmac_key': 'key'}}
+
+        result = '{"data": "data", "error": null, "cancel": false}'
+
+        job = db_models.ScheduledJob(
+            func_name=TARGET_METHOD_PATH,
+            func_args={'result': result},
+            func_arg_serializers={
+                'result': 'mistral.workflow.utils.ResultSerializer'
+            },
+            auth_ctx=auth_ctx
+        )
+
+        ctx, func, args = default_scheduler.DefaultScheduler._prepare_job(job)
+
+        self.assertEqual(target_method, func)
+        self.assertEqual('data', args['result'].data)
+
+        # Deserialization doesn't change the job itself.
+        self.assertEqual({'result': result}, job.func_args)
+
+        # Deserializing the security context drops the tracing info from
+        # the given dictionary.
+        ctx.pop('trace_info')
+
+        self.assertIn('trace_info', job.auth_ctx)
+
+        # Serializers are stateless and created once.
+        self.assertIs(
+            scheduler_base.get_serializer(
+                'mistral.workflow.utils.ResultSerializer'
+            ),
+            scheduler_base.get_serializer(
+                'mistral.workflow.utils.ResultSerializer'
+            )
+        )
+
+
+class PollingDelayTest(base.BaseTest):
+    def test_next(self):
+        delay = scheduler_base.PollingDelay(1, 0, 5)
+
+        # Backlog.
+        self.assertEqual(0, delay.next(10, 10))
+
+        # Some jobs.
+        self.assertEqual(1, delay.next(3, 10))
+        self.assertEqual(1, delay.next(3))
+
+        # No jobs.
+        self.assertEqual([1, 2, 4, 5, 5], [delay.next(0) for _ in range(5)])
+
+        self.assertEqual(1, delay.next(1, 10))
+        self.assertEqual(1, delay.next(0, 10))
+        self.assertEqual(2, delay.next(0, 10))
+
+        # An error.
+        self.assertEqual(1, delay.next(None))
+
+    def test_next_without_max_delay(self):
+        delay = scheduler_base.PollingDelay(1, 0)
+
+        self.assertEqual([1, 1, 1], [delay.next(0) for _ in range(3)])
+        self.assertEqual(0, delay.next(10, 10))
@@ -0,0 +1,80 @@
+# Copyright 2019 - Nokia Networks.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import time
+
+import eventlet
+
+from mistral.scheduler import timer_wheel
+from mistral.tests.unit import base
+
+
+class TimerWheelTest(base.BaseTest):
+    def setUp(self):
+        super(TimerWheelTest, self).setUp()
+
+        self.wheel = timer_wheel.TimerWheel(tick=0.01, wheel_sizes=(10, 5))
+        self.wheel.start()
+
+        self.addCleanup(self.wheel.stop)
+
+    def test_max_delay(self):
+        self.assertAlmostEqual(0.49, self.wheel.max_delay)
+
+        self.assertFalse(self.wheel.schedule(1, lambda: None))
+
+    def test_schedule(self):
+        calls = []
+
+        def _record(name):
+            calls.append((name, time.time()))
+
+        started = time.time()
+
+        # The last delay needs cascading from the upper level.
+        self.assertTrue(self.wheel.schedule(0.3, _record, 'c'))
+        self.assertTrue(self.wheel.schedule(0.05, _record, name='b'))
+        self.assertTrue(self.wheel.schedule(0, _record, 'a'))
+
+        self._await(lambda: len(calls) == 3, delay=0.05, timeout=5)
+
+        self.assertEqual(['a', 'b', 'c'], [name for name, _ in calls])
+
+        # Calls must not be invoked before they are due.
+        self.assertTrue(calls[1][1] - started >= 0.05)
+        self.assertTrue(calls[2][1] - started >= 0.3)
+
+    def test_failed_call(self):
+        calls = []
+
+        def _fail():
+            raise RuntimeError('Error')
+
+        self.wheel.schedule(0.02, _fail)
+        self.wheel.schedule(0.05, calls.append, 1)
+
+        self._await(lambda: calls == [1], delay=0.05, timeout=5)
+
+    def test_stop(self):
+        calls = []
+
+        self.wheel.schedule(0.1, calls.append, 1)
+
+        self.wheel.stop()
+
+        self.assertFalse(self.wheel.is_running())
+
+        eventlet.sleep(0.2)
+
+        self.assertEqual([], calls)
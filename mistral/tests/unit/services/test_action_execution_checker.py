@@ -0,0 +1,99 @@
+# Copyright 2019 - Nokia Networks.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import datetime
+
+from oslo_config import cfg
+
+from mistral.db.v2 import api as db_api
+from mistral.services import action_execution_checker
+from mistral.services import workflows as wf_service
+from mistral.tests.unit.engine import base
+from mistral import utils
+from mistral.workflow import states
+
+
+# Use the set_default method to set value otherwise in certain test cases
+# the change in value is not permanent.
+cfg.CONF.set_default('auth_enable', False, group='pecan')
+
+WF = """---
+version: '2.0'
+
+wf:
+  tasks:
+    task1:
+      action: std.async_noop
+
+    task2:
+      action: std.async_noop
+"""
+
+
+class ActionExecutionCheckerTest(base.EngineTestCase):
+    def test_handle_expired_actions(self):
+        wf_service.create_workflows(WF)
+
+        wf_ex = self.engine.start_workflow('wf')
+
+        self.await_workflow_running(wf_ex.id)
+
+        def _get_action_execs():
+            with db_api.transaction():
+                wf_ex_db = db_api.get_workflow_execution(wf_ex.id)
+
+                return sorted(
+                    [
+                        a_ex
+                        for t_ex in wf_ex_db.task_executions
+                        for a_ex in t_ex.action_executions
+                    ],
+                    key=lambda a_ex: a_ex.task_execution.name
+                )
+
+        self._await(lambda: len(_get_action_execs()) == 2)
+
+        a_ex1, a_ex2 = _get_action_execs()
+
+        expired = utils.utc_now_sec() - datetime.timedelta(hours=1)
+
+        with db_api.transaction():
+            for a_ex in (a_ex1, a_ex2):
+                db_api.update_action_execution(
+                    a_ex.id,
+                    {'is_sync': True, 'last_heartbeat': expired}
+                )
+
+            # The second action completes before the checker fails it.
+            db_api.update_action_execution(
+                a_ex2.id,
+                {'state': states.SUCCESS, 'accepted': True}
+            )
+
+        action_execution_checker.handle_expired_actions()
+
+        with db_api.transaction():
+            a_ex1 = db_api.get_action_execution(a_ex1.id)
+            a_ex2 = db_api.get_action_execution(a_ex2.id)
+
+            self.assertEqual(states.ERROR, a_ex1.state)
+            self.assertEqual(
+                {'result': "Heartbeat wasn't received."},
+                a_ex1.output
+            )
+            self.assertTrue(a_ex1.accepted)
+
+            self.assertEqual(states.SUCCESS, a_ex2.state)
+
+        self.await_task_error(a_ex1.task_execution_id)
@@ -22,6 +22,7 @@ from eventlet import timeout
 from mistral import context as auth_context
 from mistral.db.v2 import api as db_api
 from mistral import exceptions as exc
+from mistral.service import coordination
 from mistral.services import scheduler
 from mistral.tests.unit import base
 from mistral_lib import actions as ml_actions
@@ -304,6 +305,153 @@ class SchedulerServiceTest(base.DbTestCase):
         db_api.get_delayed_call(calls[0].id)
         db_api.delete_delayed_call(calls[0].id)
 
+    def test_coalesce_calls_by_key(self):
+        self.scheduler.stop(True)
+
+        coalesced_cnt = scheduler.get_stats()['coalesced']
+
+        for delay in (5, 10, 1):
+            scheduler.schedule_call(
+                None,
+                TARGET_METHOD_PATH,
+                delay,
+                key='test-key',
+                name='task'
+            )
+
+        # A call with other arguments is never coalesced.
+        scheduler.schedule_call(
+            None,
+            TARGET_METHOD_PATH,
+            10,
+            key='test-key',
+            name='other-task'
+        )
+
+        calls = db_api.get_delayed_calls(key='test-key')
+
+        self.assertEqual(2, len(calls))
+
+        call = self._assert_single_item(
+            calls,
+            method_arguments={'name': 'task'}
+        )
+
+        # Only the earliest call is kept.
+        self.assertTrue(call.execution_time < get_time_delay(2))
+
+        self.assertEqual(
+            coalesced_cnt + 2,
+            scheduler.get_stats()['coalesced']
+        )
+
+    @mock.patch(TARGET_METHOD_PATH)
+    def test_coalesce_memory_calls_by_due_time(self, method):
+        self.scheduler.stop(True)
+
+        scheduler._start_timer_wheel()
+
+        self.addCleanup(scheduler._stop_timer_wheel)
+
+        # Kept by the timing wheel, its execution time is shifted.
+        scheduler.schedule_call(
+            None,
+            TARGET_METHOD_PATH,
+            20,
+            key='test-key',
+            name='task'
+        )
+
+        call = db_api.get_delayed_calls(key='test-key')[0]
+
+        self.assertGreater(call.execution_time, get_time_delay(60))
+        self.assertLess(call.due_time, get_time_delay(21))
+
+        # Not kept by the timing wheel, due later than the pending
+        # call but before its shifted execution time.
+        scheduler.schedule_call(
+            None,
+            TARGET_METHOD_PATH,
+            40,
+            key='test-key',
+            name='task'
+        )
+
+        calls = db_api.get_delayed_calls(key='test-key')
+
+        self.assertEqual(1, len(calls))
+        self.assertEqual(call.id, calls[0].id)
+
+        # Due earlier than the pending call.
+        scheduler.schedule_call(
+            None,
+            TARGET_METHOD_PATH,
+            1,
+            key='test-key',
+            name='task'
+        )
+
+        calls = db_api.get_delayed_calls(key='test-key')
+
+        self.assertEqual(1, len(calls))
+        self.assertNotEqual(call.id, calls[0].id)
+        self.assertLess(calls[0].due_time, get_time_delay(2))
+
+        self._await(lambda: method.call_count == 1)
+
+    def test_coalesce_calls_disabled(self):
+        self.override_config('coalesce_calls', False, 'scheduler')
+
+        self.scheduler.stop(True)
+
+        for _ in range(2):
+            scheduler.schedule_call(
+                None,
+                TARGET_METHOD_PATH,
+                10,
+                key='test-key',
+                name='task'
+            )
+
+        self.assertEqual(2, len(db_api.get_delayed_calls(key='test-key')))
+
+    def test_process_memory_call(self):
+        self.scheduler.stop(True)
+
+        scheduler.schedule_call(None, TARGET_METHOD_PATH, 10, name='task')
+
+        call = db_api.get_delayed_calls()[0]
+
+        def _target_method(name):
+            # The call is kept in DB until it's invoked so that it
+            # doesn't get lost if the process crashes in between.
+            db_call = db_api.get_delayed_call(call.id)
+
+            self.queue.put(db_call.processing)
+
+        with mock.patch(TARGET_METHOD_PATH, side_effect=_target_method):
+            scheduler._process_memory_call(call)
+
+        self.assertTrue(self.queue.get())
+        self.assertEqual(0, len(db_api.get_delayed_calls()))
+
+    @mock.patch(TARGET_METHOD_PATH)
+    def test_process_captured_memory_call(self, method):
+        self.scheduler.stop(True)
+
+        scheduler.schedule_call(None, TARGET_METHOD_PATH, 10, name='task')
+
+        call = db_api.get_delayed_calls()[0]
+
+        # Simulate a scheduler that picked up the call from DB.
+        db_api.update_delayed_call(call.id, {'processing': True})
+
+        scheduler._process_memory_call(call)
+
+        method.assert_not_called()
+
+        self.assertEqual(1, len(db_api.get_delayed_calls()))
+
     def test_scheduler_with_custom_batch_size(self):
         self.scheduler.stop()
 
@@ -339,3 +487,87 @@ class SchedulerServiceTest(base.DbTestCase):
             self.queue.get()
 
         self.assertListEqual([1, 2, 2], sorted(processed_calls_at_time))
+
+    def test_capture_calls_by_shard(self):
+        self.scheduler.stop(True)
+
+        self.override_config('pickup_job_after', 5, 'scheduler')
+
+        def _create_call(shard, delay=0):
+            return db_api.create_delayed_call({
+                'target_method_name': TARGET_METHOD_PATH,
+                'execution_time': get_time_delay(delay),
+                'method_arguments': {'shard': shard},
+                'shard': shard
+            })
+
+        own_call = _create_call(0)
+        no_shard_call = _create_call(None)
+        other_call = _create_call(1)
+
+        calls = scheduler.Scheduler._capture_calls(None, [0])
+
+        self.assertEqual(
+            {own_call.id, no_shard_call.id},
+            set(c.id for c in calls)
+        )
+
+        # Calls of other shards are picked up if they are overdue.
+        overdue_call = _create_call(1, -6)
+
+        calls = scheduler.Scheduler._capture_calls(None, [0])
+
+        self.assertEqual([overdue_call.id], [c.id for c in calls])
+
+        calls = scheduler.Scheduler._capture_calls(None, None)
+
+        self.assertEqual([other_call.id], [c.id for c in calls])
+
+    @mock.patch.object(scheduler, '_shard_ring')
+    def test_update_own_shards(self, ring):
+        self.override_config('shard_count', 4, 'scheduler')
+
+        my_id = coordination.get_service_coordinator().my_id
+
+        ring.get_member.side_effect = lambda key: (
+            my_id if int(key) % 2 else 'other-engine'
+        )
+
+        self.assertEqual([1, 3], scheduler._update_own_shards())
+
+        for _ in range(10):
+            self.assertIn(scheduler._get_shard(), [1, 3])
+
+        # Engines aren't coordinated.
+        ring.get_member.side_effect = None
+        ring.get_member.return_value = None
+
+        self.assertIsNone(scheduler._update_own_shards())
+
+        self.override_config('shard_count', 1, 'scheduler')
+
+        self.assertIsNone(scheduler._update_own_shards())
+        self.assertEqual(0, scheduler._get_shard())
+
+    @mock.patch(TARGET_METHOD_PATH)
+    def test_scheduler_wakeup(self, method):
+        method.side_effect = self.target_method
+
+        self.scheduler.stop(True)
+
+        # Without a wakeup the call would be processed in 30 seconds.
+        self.scheduler = scheduler.Scheduler(30, 0, None, 60)
+
+        scheduler._schedulers.add(self.scheduler)
+
+        self.scheduler.start()
+
+        self.addCleanup(scheduler.stop_scheduler, self.scheduler, True)
+
+        eventlet.sleep(0.1)
+
+        scheduler.schedule_call(None, TARGET_METHOD_PATH, 2, name='task')
+
+        self.queue.get()
+
+        method.assert_called_once_with(name='task')
@@ -0,0 +1,39 @@
+# Copyright 2019 - Nokia Networks.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+from mistral import config
+from mistral.tests.unit import base
+
+
+class ValidateOptsTest(base.BaseTest):
+    def test_capacity_routing_requires_heartbeat_checker(self):
+        self.override_config('capacity_routing', True, 'executor')
+
+        # Other test modules change the defaults of these options.
+        self.override_config('check_interval', 20, 'action_heartbeat')
+        self.override_config('max_missed_heartbeats', 15, 'action_heartbeat')
+
+        config.validate_opts()
+
+        self.override_config('check_interval', 0, 'action_heartbeat')
+
+        self.assertRaises(RuntimeError, config.validate_opts)
+
+        self.override_config('check_interval', 20, 'action_heartbeat')
+        self.override_config('max_missed_heartbeats', 0, 'action_heartbeat')
+
+        self.assertRaises(RuntimeError, config.validate_opts)
+
+    def test_defaults(self):
+        config.validate_opts()
@@ -143,3 +143,179 @@ class ServiceTest(base.BaseTest):
 
         mock_get_identifier.assert_called_once_with()
         self.assertEqual(set([six.b('fake_id')]), members)
+
+
+class MemberRingTest(base.BaseTest):
+    def setUp(self):
+        super(MemberRingTest, self).setUp()
+
+        self.override_config('heartbeat_interval', 0, 'coordination')
+
+        self.members = set([six.b('engine1'), six.b('engine2')])
+
+        self.coordinator = mock.Mock()
+        self.coordinator.get_members.side_effect = lambda _: self.members
+
+        self.patch = mock.patch.object(
+            coordination,
+            'get_service_coordinator',
+            return_value=self.coordinator
+        )
+        self.patch.start()
+        self.addCleanup(self.patch.stop)
+
+    def test_get_member(self):
+        ring = coordination.MemberRing('engine_group')
+
+        keys = ['key%s' % i for i in range(100)]
+
+        owners = {k: ring.get_member(k) for k in keys}
+
+        self.assertEqual({'engine1', 'engine2'}, set(owners.values()))
+
+        # The same key is always owned by the same member.
+        self.assertEqual(owners, {k: ring.get_member(k) for k in keys})
+
+        self.coordinator.get_members.assert_called_with('engine_group')
+
+    def test_member_leaves(self):
+        ring = coordination.MemberRing('engine_group')
+
+        keys = ['key%s' % i for i in range(100)]
+
+        owners = {k: ring.get_member(k) for k in keys}
+
+        self.members = set([six.b('engine1')])
+
+        # Only the keys of the member that left move to another member.
+        for k in keys:
+            if owners[k] == 'engine1':
+                self.assertEqual('engine1', ring.get_member(k))
+
+        self.assertEqual(
+            {'engine1'},
+            set(ring.get_member(k) for k in keys)
+        )
+
+    def test_no_members(self):
+        self.members = set()
+
+        ring = coordination.MemberRing('engine_group')
+
+        self.assertIsNone(ring.get_member('key'))
+
+    def test_ring_over_capability(self):
+        self.coordinator.get_members_capabilities.return_value = {
+            six.b('engine1_1'): {'rpc_server': 'host1'},
+            six.b('engine1_2'): {'rpc_server': 'host1'},
+            six.b('engine2_1'): {'rpc_server': 'host2'},
+            six.b('engine3_1'): {}
+        }
+
+        ring = coordination.MemberRing('engine_group', 'rpc_server')
+
+        self.assertEqual(
+            {'host1', 'host2'},
+            set(ring.get_member('key%s' % i) for i in range(100))
+        )
+
+        self.coordinator.get_members_capabilities.assert_called_with(
+            'engine_group'
+        )
+
+    def test_advertise_rpc_server(self):
+        coordination.advertise_rpc_server('engine_group', 'host1')
+
+        self.coordinator.update_capabilities.assert_called_once_with(
+            'engine_group',
+            {'rpc_server': 'host1'}
+        )
+
+
+class MemberCapacityTest(base.BaseTest):
+    def setUp(self):
+        super(MemberCapacityTest, self).setUp()
+
+        self.override_config('heartbeat_interval', 0, 'coordination')
+
+        self.capabilities = {
+            six.b('executor1'): {'free_slots': 2},
+            six.b('executor2'): {'free_slots': 1}
+        }
+
+        self.coordinator = mock.Mock()
+        self.coordinator.get_members_capabilities.side_effect = (
+            lambda _: self.capabilities
+        )
+
+        self.patch = mock.patch.object(
+            coordination,
+            'get_service_coordinator',
+            return_value=self.coordinator
+        )
+        self.patch.start()
+        self.addCleanup(self.patch.stop)
+
+    def test_get_member(self):
+        capacity = coordination.MemberCapacity('executor_group')
+
+        self.assertEqual('executor1', capacity.get_member())
+
+        self.coordinator.get_members_capabilities.assert_called_with(
+            'executor_group'
+        )
+
+    def test_spread_between_refreshes(self):
+        self.override_config('heartbeat_interval', 60, 'coordination')
+
+        capacity = coordination.MemberCapacity('executor_group')
+
+        self.assertEqual(
+            ['executor1', 'executor1', 'executor2', None],
+            [capacity.get_member() for _ in range(4)]
+        )
+
+        self.assertEqual(
+            1,
+            self.coordinator.get_members_capabilities.call_count
+        )
+
+    def test_batch_takes_many_slots(self):
+        self.override_config('heartbeat_interval', 60, 'coordination')
+
+        capacity = coordination.MemberCapacity('executor_group')
+
+        self.assertEqual('executor1', capacity.get_member(2))
+        self.assertEqual('executor2', capacity.get_member(2))
+        self.assertIsNone(capacity.get_member())
+
+    def test_no_free_slots(self):
+        self.capabilities = {six.b('executor1'): {'free_slots': 0}}
+
+        capacity = coordination.MemberCapacity('executor_group')
+
+        self.assertIsNone(capacity.get_member())
+
+    def test_no_capabilities(self):
+        self.capabilities = {six.b('executor1'): {}}
+
+        capacity = coordination.MemberCapacity('executor_group')
+
+        self.assertIsNone(capacity.get_member())
+
+    def test_sum_free_slots_by_capability(self):
+        self.override_config('heartbeat_interval', 60, 'coordination')
+
+        self.capabilities = {
+            six.b('executor1_1'): {'free_slots': 1, 'rpc_server': 'host1'},
+            six.b('executor1_2'): {'free_slots': 1, 'rpc_server': 'host1'},
+            six.b('executor2_1'): {'free_slots': 1, 'rpc_server': 'host2'},
+            six.b('executor3_1'): {'free_slots': 5}
+        }
+
+        capacity = coordination.MemberCapacity('executor_group', 'rpc_server')
+
+        self.assertEqual(
+            ['host1', 'host1', 'host2', None],
+            [capacity.get_member() for _ in range(4)]
+        )
@@ -0,0 +1,131 @@
+# Copyright 2019 - Nokia Networks.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import mock
+import requests
+from requests import cookies
+import requests_mock
+from six.moves import http_client
+
+from mistral.tests.unit import base
+from mistral.utils import http_utils
+
+
+URL1 = 'https://host1/resource'
+URL2 = 'https://host2/resource'
+
+
+@requests_mock.Mocker()
+class HTTPUtilsTest(base.BaseTest):
+    def setUp(self):
+        super(HTTPUtilsTest, self).setUp()
+
+        self.addCleanup(http_utils.close_sessions)
+
+    def _get_sessions(self):
+        return [s for s, _ in http_utils._SESSIONS.values()]
+
+    def test_reuse_session(self, req_mock):
+        req_mock.get(URL1, text='1')
+        req_mock.get(URL1 + '/other', text='other')
+        req_mock.get(URL2, text='2')
+
+        self.assertEqual('1', http_utils.request('GET', URL1).text)
+
+        sessions = self._get_sessions()
+
+        http_utils.request('GET', URL1 + '/other')
+
+        self.assertEqual(sessions, self._get_sessions())
+
+        # Another host or other TLS settings need another session.
+        http_utils.request('GET', URL2)
+        http_utils.request('GET', URL1, verify=False)
+
+        self.assertEqual(3, len(self._get_sessions()))
+
+    def test_no_keep_alive(self, req_mock):
+        self.override_config('keep_alive', False, 'http_client')
+
+        req_mock.get(URL1, text='1')
+
+        self.assertEqual('1', http_utils.request('GET', URL1).text)
+        self.assertEqual([], self._get_sessions())
+
+    def test_cookies_not_shared(self, req_mock):
+        req_mock.get(URL1, text='1')
+
+        http_utils.request('GET', URL1)
+
+        session = self._get_sessions()[0]
+
+        # Cookies set by a server must not be sent with requests of
+        # other users.
+        headers = http_client.HTTPMessage()
+        headers['Set-Cookie'] = 'session_id=secret; Path=/'
+
+        cookies.extract_cookies_to_jar(
+            session.cookies,
+            requests.Request('GET', URL1).prepare(),
+            mock.Mock(_original_response=mock.Mock(msg=headers))
+        )
+
+        self.assertEqual(0, len(session.cookies))
+
+        # Cookies given explicitly are still sent.
+        http_utils.request('GET', URL1, cookies={'a': 'b'})
+
+        self.assertEqual('a=b', req_mock.last_request.headers['Cookie'])
+
+    @mock.patch('time.time')
+    def test_close_idle_sessions(self, req_mock, time_mock):
+        self.override_config('idle_timeout', 10, 'http_client')
+
+        req_mock.get(URL1, text='1')
+        req_mock.get(URL2, text='2')
+
+        time_mock.return_value = 100
+
+        http_utils.request('GET', URL1)
+
+        session1 = self._get_sessions()[0]
+
+        time_mock.return_value = 105
+
+        http_utils.request('GET', URL2)
+
+        time_mock.return_value = 112
+
+        with mock.patch.object(session1, 'close') as close_mock:
+            http_utils.request('GET', URL2)
+
+        close_mock.assert_called_once_with()
+
+        self.assertEqual(1, len(self._get_sessions()))
+        self.assertNotIn(session1, self._get_sessions())
+
+    def test_max_sessions(self, req_mock):
+        self.override_config('max_sessions', 1, 'http_client')
+
+        req_mock.get(URL1, text='1')
+        req_mock.get(URL2, text='2')
+
+        http_utils.request('GET', URL1)
+        http_utils.request('GET', URL2)
+
+        self.assertEqual(1, len(self._get_sessions()))
+        self.assertEqual(
+            ('https', 'host2'),
+            list(http_utils._SESSIONS.keys())[0][:2]
+        )
@@ -0,0 +1,263 @@
+# Copyright 2019 - Nokia Networks.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import mock
+from oslo_utils import importutils
+import testtools
+
+from mistral.services import security
+from mistral.tests.unit import base
+from mistral.utils import javascript
+
+SCRIPT = """function f() {
+  return $.a + $.b;
+}
+f()
+"""
+
+
+class FakeJSRuntime(javascript._JSRuntime):
+    def __init__(self):
+        super(FakeJSRuntime, self).__init__()
+
+        self.scripts = []
+
+    def _eval(self, script):
+        self.scripts.append(script)
+
+        return len(self.scripts) - 1
+
+    def _call(self, func_name, args):
+        func_id, context = args
+
+        if context.get('fail'):
+            raise Exception('Script failed')
+
+        return [func_id, context.get('dirty', False)]
+
+
+class JSRuntimePoolTest(base.BaseTest):
+    def setUp(self):
+        super(JSRuntimePoolTest, self).setUp()
+
+        self.pool = javascript._JSRuntimePool(FakeJSRuntime)
+
+    def _get_idle_runtimes(self):
+        return [r for _, r in self.pool._idle_runtimes]
+
+    def test_reuse_runtime(self):
+        self.assertEqual(1, self.pool.evaluate('script1', {}))
+        self.assertEqual(2, self.pool.evaluate('script2', {}))
+        self.assertEqual(1, self.pool.evaluate('script1', {}))
+
+        self.assertEqual(1, len(self._get_idle_runtimes()))
+
+        # The runtime has been set up once and every script has been
+        # compiled once.
+        scripts = self._get_idle_runtimes()[0].scripts
+
+        self.assertEqual(3, len(scripts))
+        self.assertEqual(javascript._RUNTIME_SETUP, scripts[0])
+
+    def test_drop_failed_runtime(self):
+        self.pool.evaluate('script1', {})
+
+        runtime = self._get_idle_runtimes()[0]
+
+        self.assertRaises(
+            Exception,
+            self.pool.evaluate,
+            'script1',
+            {'fail': True}
+        )
+
+        self.assertEqual([], self._get_idle_runtimes())
+
+        self.pool.evaluate('script1', {})
+
+        self.assertIsNot(runtime, self._get_idle_runtimes()[0])
+
+    def test_drop_dirty_runtime(self):
+        self.pool.evaluate('script1', {'dirty': True})
+
+        self.assertEqual([], self._get_idle_runtimes())
+
+    def test_recycle_runtime(self):
+        self.override_config('recycle_after', 2, 'javascript')
+
+        self.pool.evaluate('script1', {})
+
+        runtime = self._get_idle_runtimes()[0]
+
+        self.pool.evaluate('script1', {})
+
+        self.assertEqual([], self._get_idle_runtimes())
+
+        self.pool.evaluate('script1', {})
+
+        self.assertIsNot(runtime, self._get_idle_runtimes()[0])
+
+    def test_script_cache_size(self):
+        self.override_config('script_cache_size', 2, 'javascript')
+
+        self.pool.evaluate('script1', {})
+
+        self.assertEqual(1, len(self._get_idle_runtimes()))
+
+        self.pool.evaluate('script2', {})
+
+        self.assertEqual([], self._get_idle_runtimes())
+
+    @mock.patch.object(security, 'get_project_id')
+    def test_runtimes_not_shared_between_projects(self, project_mock):
+        project_mock.return_value = 'project1'
+
+        self.pool.evaluate('script1', {})
+
+        runtime = self._get_idle_runtimes()[0]
+
+        project_mock.return_value = 'project2'
+
+        self.pool.evaluate('script1', {})
+
+        self.assertEqual(2, len(self._get_idle_runtimes()))
+        self.assertIs(runtime, self._get_idle_runtimes()[0])
+
+        project_mock.return_value = 'project1'
+
+        self.pool.evaluate('script1', {})
+
+        self.assertIs(runtime, self._get_idle_runtimes()[1])
+
+    def test_pool_size(self):
+        self.override_config('pool_size', 1, 'javascript')
+
+        with mock.patch.object(security, 'get_project_id') as project_mock:
+            project_mock.return_value = 'project1'
+
+            self.pool.evaluate('script1', {})
+
+            project_mock.return_value = 'project2'
+
+            self.pool.evaluate('script1', {})
+
+        # The runtime that has been idle for the longest time is dropped.
+        self.assertEqual(
+            ['project2'],
+            [p for p, _ in self.pool._idle_runtimes]
+        )
+
+
+@testtools.skipIf(not importutils.try_import('py_mini_racer'),
+                  'This test requires that py_mini_racer library was '
+                  'installed')
+class PyMiniRacerEvaluatorTest(base.BaseTest):
+    def setUp(self):
+        super(PyMiniRacerEvaluatorTest, self).setUp()
+
+        patcher = mock.patch.object(
+            javascript,
+            '_PY_MINI_RACER_POOL',
+            javascript._JSRuntimePool(javascript._PyMiniRacerRuntime)
+        )
+
+        self.pool = patcher.start()
+
+        self.addCleanup(patcher.stop)
+
+    def _evaluate(self, script, context):
+        return javascript.PyMiniRacerEvaluator.evaluate(script, context)
+
+    def test_evaluate(self):
+        self.assertEqual(3, self._evaluate(SCRIPT, {'a': 1, 'b': 2}))
+        self.assertEqual(7, self._evaluate(SCRIPT, {'a': 3, 'b': 4}))
+
+        runtime = self.pool._idle_runtimes[0][1]
+
+        self.assertEqual(1, len(runtime._functions))
+
+        # Declarations of the script don't outlive its run.
+        self.assertEqual('undefined', runtime._ctx.eval('typeof f'))
+
+    def test_evaluate_undefined(self):
+        self.assertIsNone(self._evaluate('undefined', {}))
+
+    def test_runs_isolated(self):
+        # Reports what is left by previous runs and then tries to leave
+        # something for the next ones.
+        spy = (
+            'var seen = JSON.stringify('
+            '  [typeof stolen, typeof leaked, typeof RegExp.$1]'
+            ');'
+            'var apply = Function.prototype.apply;'
+            'Function.prototype.apply = function (self, args) {'
+            '  stolen = args;'
+            '  return apply.call(this, self, args);'
+            '};'
+            'leaked = $;'
+            '/(.*)/.exec($.secret);'
+            'seen'
+        )
+
+        self.assertEqual(
+            '["undefined","undefined","undefined"]',
+            self._evaluate(spy, {'secret': 'spy'})
+        )
+
+        self.assertEqual(
+            2,
+            self._evaluate('$.x + 1', {'x': 1, 'password': 's3cr3t'})
+        )
+
+        # Another run of the same script in the same runtime doesn't see
+        # anything left by its previous run or by other scripts.
+        self.assertEqual(
+            '["undefined","undefined","undefined"]',
+            self._evaluate(spy, {'secret': 'spy'})
+        )
+
+        self.assertEqual(1, len(self.pool._idle_runtimes))
+
+    def test_undeclared_variables(self):
+        script = 'var r = typeof x; x = 1; y = x + 1; [r, y]'
+
+        self.assertEqual(['undefined', 2], self._evaluate(script, {}))
+        self.assertEqual(['undefined', 2], self._evaluate(script, {}))
+
+    def test_drop_runtime_with_persistent_changes(self):
+        self._evaluate(
+            'Object.defineProperty(this, "x", {value: $});',
+            {'a': 1}
+        )
+
+        self.assertEqual([], self.pool._idle_runtimes)
+
+    def test_evaluate_without_pool(self):
+        self.override_config('pool_size', 0, 'javascript')
+
+        self.assertEqual(3, self._evaluate(SCRIPT, {'a': 1, 'b': 2}))
+
+        self.assertEqual([], self.pool._idle_runtimes)
+
+    def test_timeout(self):
+        self.override_config('timeout', 0.1, 'javascript')
+
+        self.assertRaises(
+            Exception,
+            self._evaluate,
+            'while (true) {}',
+            {}
+        )
+
+        self.assertEqual([], self.pool._idle_runtimes)
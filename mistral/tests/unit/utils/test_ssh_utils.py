@@ -0,0 +1,209 @@
+# Copyright 2019 - Nokia Networks.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import mock
+
+from mistral.tests.unit import base
+from mistral.utils import ssh_utils
+
+
+def _open_session(ret_code=0):
+    chan = mock.Mock()
+
+    chan.recv.side_effect = ['output', '']
+    chan.recv_stderr.side_effect = ['']
+    chan.recv_exit_status.return_value = ret_code
+
+    return chan
+
+
+class SSHConnectionPoolTest(base.BaseTest):
+    def setUp(self):
+        super(SSHConnectionPoolTest, self).setUp()
+
+        self.addCleanup(ssh_utils.close_connections)
+
+        self.clients = []
+
+        def _create_client():
+            client = mock.Mock()
+
+            client.get_transport.return_value.is_active.return_value = True
+            client.get_transport.return_value.open_session.side_effect = (
+                lambda: _open_session(self.ret_code)
+            )
+
+            self.clients.append(client)
+
+            return client
+
+        self.ret_code = 0
+
+        patcher = mock.patch('paramiko.SSHClient', side_effect=_create_client)
+        patcher.start()
+
+        self.addCleanup(patcher.stop)
+
+    def _execute(self, host='host1', **kwargs):
+        return ssh_utils.execute_command(
+            'ls',
+            host,
+            'user',
+            password='secret',
+            **kwargs
+        )
+
+    def test_reuse_connection(self):
+        self.assertEqual((0, 'output'), self._execute())
+        self.assertEqual((0, 'output'), self._execute())
+
+        self.assertEqual(1, len(self.clients))
+        self.assertEqual(1, self.clients[0].connect.call_count)
+        self.assertEqual(0, self.clients[0].close.call_count)
+
+        # Another host needs another connection.
+        self._execute(host='host2')
+
+        self.assertEqual(2, len(self.clients))
+
+    def test_reuse_connection_after_failed_command(self):
+        self.ret_code = 1
+
+        self.assertRaises(RuntimeError, self._execute)
+
+        self.assertEqual(
+            (1, 'output', ''),
+            self._execute(get_stderr=True, raise_when_error=False)
+        )
+
+        self.assertEqual(1, len(self.clients))
+
+    def test_close_broken_connection(self):
+        self._execute()
+
+        transport = self.clients[0].get_transport.return_value
+
+        # The connection breaks after the command has been sent.
+        transport.open_session.side_effect = None
+        transport.open_session.return_value.exec_command.side_effect = (
+            EOFError()
+        )
+
+        self.assertRaises(EOFError, self._execute)
+
+        self.clients[0].close.assert_called_once_with()
+
+        self._execute()
+
+        self.assertEqual(2, len(self.clients))
+
+    def test_retry_dropped_pooled_connection(self):
+        self._execute()
+
+        transport = self.clients[0].get_transport.return_value
+
+        # The connection has been dropped while it was idle.
+        transport.open_session.side_effect = EOFError()
+
+        self.assertEqual((0, 'output'), self._execute())
+
+        self.assertEqual(2, len(self.clients))
+        self.clients[0].close.assert_called_once_with()
+        self.assertEqual(0, self.clients[1].close.call_count)
+
+    def test_new_connection_not_retried(self):
+        def _create_client():
+            client = mock.Mock()
+
+            client.get_transport.return_value.open_session.side_effect = (
+                EOFError()
+            )
+
+            self.clients.append(client)
+
+            return client
+
+        with mock.patch('paramiko.SSHClient', side_effect=_create_client):
+            self.assertRaises(EOFError, self._execute)
+
+        self.assertEqual(1, len(self.clients))
+        self.clients[0].close.assert_called_once_with()
+
+    def test_replace_inactive_connection(self):
+        self._execute()
+
+        transport = self.clients[0].get_transport.return_value
+
+        transport.is_active.return_value = False
+
+        self._execute()
+
+        self.assertEqual(2, len(self.clients))
+        self.clients[0].close.assert_called_once_with()
+
+    def test_pool_disabled(self):
+        self.override_config('pool_size', 0, 'ssh_client')
+
+        self._execute()
+        self._execute()
+
+        self.assertEqual(2, len(self.clients))
+        self.assertTrue(all(c.close.call_count == 1 for c in self.clients))
+
+    @mock.patch('time.time')
+    def test_close_idle_connections(self, time_mock):
+        self.override_config('idle_timeout', 10, 'ssh_client')
+
+        time_mock.return_value = 100
+
+        self._execute()
+
+        time_mock.return_value = 111
+
+        self._execute()
+
+        self.assertEqual(2, len(self.clients))
+        self.clients[0].close.assert_called_once_with()
+
+    def test_pool_size(self):
+        self.override_config('pool_size', 1, 'ssh_client')
+
+        self._execute(host='host1')
+        self._execute(host='host2')
+
+        # The least recently used connection has been closed.
+        self.clients[0].close.assert_called_once_with()
+        self.assertEqual(0, self.clients[1].close.call_count)
+
+    @mock.patch.object(ssh_utils, '_to_paramiko_private_key')
+    def test_reuse_connection_via_gateway(self, key_mock):
+        for _ in range(2):
+            self.assertEqual(
+                (0, 'output'),
+                ssh_utils.execute_command_via_gateway(
+                    'ls',
+                    'host1',
+                    'user',
+                    'key',
+                    'gateway'
+                )
+            )
+
+        # The gateway and the target host are connected once.
+        self.assertEqual(2, len(self.clients))
+        self.assertEqual(1, key_mock.call_count)
+
+        ssh_utils.close_connections()
+
+        self.assertTrue(all(c.close.call_count == 1 for c in self.clients))
@@ -423,6 +423,16 @@ def get_process_identifier():
     return "%s_%s" % (socket.gethostname(), os.getpid())
 
 
+def get_host_identifier():
+    """Gets identifier of the host the process is running on.
+
+    Unlike the process identifier it doesn't change when the process
+    is restarted.
+    """
+
+    return socket.gethostname()
+
+
 @contextlib.contextmanager
 def tempdir(**kwargs):
     argdict = kwargs.copy()
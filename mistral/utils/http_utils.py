@@ -0,0 +1,128 @@
+# Copyright 2019 - Nokia Networks.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+import collections
+import threading
+import time
+
+import requests
+from requests import adapters
+import six
+from six.moves import http_cookiejar
+
+from mistral import config as cfg
+
+
+CONF = cfg.CONF
+
+# Session key -> (session, time of the last use). The sessions that
+# have been used least recently go first.
+_SESSIONS = collections.OrderedDict()
+_SESSIONS_LOCK = threading.Lock()
+
+
+def _get_session_key(url, verify, proxies):
+    url_data = six.moves.urllib.parse.urlsplit(url)
+
+    return (
+        url_data.scheme,
+        url_data.netloc,
+        verify,
+        tuple(sorted((proxies or {}).items()))
+    )
+
+
+def _create_session():
+    session = requests.Session()
+
+    # The session is shared between requests sent on behalf of different
+    # users so it must never keep cookies set by servers.
+    session.cookies.set_policy(
+        http_cookiejar.DefaultCookiePolicy(allowed_domains=[])
+    )
+
+    adapter = adapters.HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=CONF.http_client.pool_maxsize
+    )
+
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    return session
+
+
+def _get_session(url, verify, proxies):
+    key = _get_session_key(url, verify, proxies)
+    now = time.time()
+
+    stale_sessions = []
+
+    with _SESSIONS_LOCK:
+        idle_timeout = CONF.http_client.idle_timeout
+
+        while idle_timeout and _SESSIONS:
+            _, last_used = next(iter(_SESSIONS.values()))
+
+            if now - last_used <= idle_timeout:
+                break
+
+            stale_sessions.append(_SESSIONS.popitem(last=False)[1][0])
+
+        session = (
+            _SESSIONS.pop(key)[0] if key in _SESSIONS else _create_session()
+        )
+
+        _SESSIONS[key] = (session, now)
+
+        while len(_SESSIONS) > CONF.http_client.max_sessions:
+            stale_sessions.append(_SESSIONS.popitem(last=False)[1][0])
+
+    for s in stale_sessions:
+        s.close()
+
+    return session
+
+
+def request(method, url, **kwargs):
+    """Sends an HTTP request reusing open connections to the same host.
+
+    Takes the same arguments as requests.request(). Requests sent to
+    the same host with the same "verify" and "proxies" values share
+    a session and its pool of connections so that they don't pay for
+    TCP and TLS handshakes every time.
+
+    :return: requests.Response object.
+    """
+    if not CONF.http_client.keep_alive:
+        return requests.request(method, url, **kwargs)
+
+    session = _get_session(
+        url,
+        kwargs.get('verify'),
+        kwargs.get('proxies')
+    )
+
+    return session.request(method, url, **kwargs)
+
+
+def close_sessions():
+    """Closes all pooled sessions and their connections."""
+    with _SESSIONS_LOCK:
+        sessions = [s for s, _ in _SESSIONS.values()]
+
+        _SESSIONS.clear()
+
+    for s in sessions:
+        s.close()
@@ -14,9 +14,11 @@
 
 import abc
 import json
+import threading
 
 from mistral import config as cfg
 from mistral import exceptions as exc
+from mistral.services import security
 
 from oslo_utils import importutils
 from stevedore import driver
@@ -27,6 +29,143 @@ _V8EVAL = importutils.try_import('v8eval')
 _PY_MINI_RACER = importutils.try_import('py_mini_racer.py_mini_racer')
 _EVALUATOR = None
 
+# Run once in every new runtime used for more than one script. Makes
+# the built-in objects and the global variables existing at that moment
+# read-only and defines the functions running scripts so that a script
+# can't change what next scripts see. Global variables created by
+# a script are deleted once it completes. If any of them can't be
+# deleted or the global object itself has been changed the runtime
+# is not reused. The legacy static properties of RegExp keeping the last
+# match and the objects exposing garbage collection are removed since
+# they would let a script see what previous scripts have done.
+_RUNTIME_SETUP = """
+(function (global) {
+  'use strict';
+
+  var scripts = new Map();
+  var nextId = 0;
+
+  ['input', '$_', 'lastMatch', '$&', 'lastParen', '$+', 'leftContext',
+   '$`', 'rightContext', "$'", '$1', '$2', '$3', '$4', '$5', '$6', '$7',
+   '$8', '$9'].forEach(function (name) {
+    delete RegExp[name];
+  });
+
+  ['WeakRef', 'FinalizationRegistry'].forEach(function (name) {
+    delete global[name];
+  });
+
+  // The global object itself stays extensible for the variables
+  // scripts assign without declaring them.
+  var frozen = new WeakSet([global]);
+
+  function freeze(obj) {
+    if (obj === null ||
+        (typeof obj !== 'object' && typeof obj !== 'function') ||
+        frozen.has(obj)) {
+      return;
+    }
+
+    frozen.add(obj);
+
+    Reflect.ownKeys(obj).forEach(function (key) {
+      var desc = Reflect.getOwnPropertyDescriptor(obj, key);
+
+      if ('value' in desc) {
+        freeze(desc.value);
+      } else {
+        freeze(desc.get);
+        freeze(desc.set);
+      }
+    });
+
+    freeze(Reflect.getPrototypeOf(obj));
+
+    Object.freeze(obj);
+  }
+
+  function reset() {
+    var dirty = (
+      !Reflect.isExtensible(global) ||
+      !Reflect.setPrototypeOf(global, globalProto)
+    );
+
+    Reflect.ownKeys(global).forEach(function (key) {
+      if (!builtins.has(key) && !Reflect.deleteProperty(global, key)) {
+        dirty = true;
+      }
+    });
+
+    return dirty;
+  }
+
+  Reflect.defineProperty(global, '__mistral_define', {
+    value: function (func) {
+      var id = nextId++;
+
+      scripts.set(id, func);
+
+      return id;
+    }
+  });
+
+  // Returns the script result and whether the runtime can't be reused.
+  Reflect.defineProperty(global, '__mistral_run', {
+    value: function (id, $) {
+      var result, dirty;
+
+      try {
+        result = scripts.get(id)($);
+      } finally {
+        dirty = reset();
+      }
+
+      return [result === undefined ? null : result, dirty];
+    }
+  });
+
+  var builtins = new Set(Reflect.ownKeys(global));
+  var globalProto = Reflect.getPrototypeOf(global);
+
+  // Objects reachable only with the syntax.
+  [
+    globalProto,
+    Reflect.getPrototypeOf(function* () {}),
+    Reflect.getPrototypeOf(async function () {}),
+    Reflect.getPrototypeOf(async function* () {}),
+    Reflect.getPrototypeOf([][Symbol.iterator]()),
+    Reflect.getPrototypeOf(''[Symbol.iterator]()),
+    Reflect.getPrototypeOf(new Map()[Symbol.iterator]()),
+    Reflect.getPrototypeOf(new Set()[Symbol.iterator]()),
+    Reflect.getPrototypeOf(/a/[Symbol.matchAll](''))
+  ].forEach(freeze);
+
+  Reflect.ownKeys(global).forEach(function (key) {
+    var desc = Reflect.getOwnPropertyDescriptor(global, key);
+
+    if ('value' in desc) {
+      freeze(desc.value);
+
+      desc.writable = false;
+    } else {
+      freeze(desc.get);
+      freeze(desc.set);
+    }
+
+    desc.configurable = false;
+
+    Reflect.defineProperty(global, key, desc);
+  });
+})(this);
+"""
+
+# Defines a function evaluating the script with "$" bound to its
+# argument and returns its id. Since the script is evaluated within
+# the function scope the variables and functions it declares don't
+# outlive the run, and V8 compiles the script once and then reuses it
+# from its eval cache.
+_DEFINE_SCRIPT = '__mistral_define(function ($) { return eval(%s); });'
+
 
 class JSEvaluator(object):
     @classmethod
@@ -44,6 +183,98 @@ class JSEvaluator(object):
         pass
 
 
+class _JSRuntime(object):
+    """JavaScript runtime running scripts compiled in it before."""
+
+    def __init__(self):
+        # Script text -> id of the function evaluating the script.
+        self._functions = {}
+        self._run_cnt = 0
+        self._ready = False
+        self._dirty = False
+
+    def _eval(self, script):
+        raise NotImplementedError
+
+    def _call(self, func_name, args):
+        raise NotImplementedError
+
+    def evaluate(self, script, context):
+        if not self._ready:
+            self._eval(_RUNTIME_SETUP)
+
+            self._ready = True
+
+        func_id = self._functions.get(script)
+
+        if func_id is None:
+            func_id = self._eval(_DEFINE_SCRIPT % json.dumps(script))
+
+            self._functions[script] = func_id
+
+        self._run_cnt += 1
+
+        result, self._dirty = self._call('__mistral_run', [func_id, context])
+
+        return result
+
+    def is_reusable(self):
+        js_cfg = cfg.CONF.javascript
+
+        return (
+            not self._dirty and
+            len(self._functions) < js_cfg.script_cache_size and
+            (not js_cfg.recycle_after or self._run_cnt < js_cfg.recycle_after)
+        )
+
+
+class _JSRuntimePool(object):
+    """Pool of warmed up JavaScript runtimes.
+
+    Creating a runtime takes much longer than running a typical script
+    so idle runtimes are kept for next scripts of the same project.
+    A runtime is replaced with a new one once it has run the configured
+    number of scripts, has compiled the configured number of distinct
+    scripts, has failed to run a script, e.g. because the script has
+    exceeded the time or memory limit, or a script has left changes
+    that can't be undone.
+    """
+
+    def __init__(self, runtime_cls):
+        self._runtime_cls = runtime_cls
+        self._lock = threading.Lock()
+        # Tuples (project id, runtime). The runtimes that have been idle
+        # for the longest time go first.
+        self._idle_runtimes = []
+
+    def evaluate(self, script, context):
+        project_id = security.get_project_id()
+        runtime = None
+
+        with self._lock:
+            for i in reversed(range(len(self._idle_runtimes))):
+                if self._idle_runtimes[i][0] == project_id:
+                    runtime = self._idle_runtimes.pop(i)[1]
+
+                    break
+
+        if runtime is None:
+            runtime = self._runtime_cls()
+
+        # The runtime is dropped if the script fails.
+        result = runtime.evaluate(script, context)
+
+        if runtime.is_reusable():
+            with self._lock:
+                self._idle_runtimes.append((project_id, runtime))
+
+                while (len(self._idle_runtimes) >
+                       cfg.CONF.javascript.pool_size):
+                    self._idle_runtimes.pop(0)
+
+        return result
+
+
 class PyV8Evaluator(JSEvaluator):
     @classmethod
     def evaluate(cls, script, context):
@@ -68,11 +299,27 @@ class V8EvalEvaluator(JSEvaluator):
                 "v8eval module is not available. Please install v8eval."
             )
 
+        if cfg.CONF.javascript.pool_size:
+            return _V8EVAL_POOL.evaluate(script, context)
+
         v8 = _V8EVAL.V8()
         return v8.eval(('$ = %s; %s' % (json.dumps(context), script)).encode(
             encoding='UTF-8'))
 
 
+class _V8EvalRuntime(_JSRuntime):
+    def __init__(self):
+        super(_V8EvalRuntime, self).__init__()
+
+        self._v8 = _V8EVAL.V8()
+
+    def _eval(self, script):
+        return self._v8.eval(script.encode(encoding='UTF-8'))
+
+    def _call(self, func_name, args):
+        return self._v8.call(func_name, args)
+
+
 class PyMiniRacerEvaluator(JSEvaluator):
     @classmethod
     def evaluate(cls, script, context):
@@ -82,8 +329,44 @@ class PyMiniRacerEvaluator(JSEvaluator):
                 "PyMiniRacer."
             )
 
+        if cfg.CONF.javascript.pool_size:
+            return _PY_MINI_RACER_POOL.evaluate(script, context)
+
         ctx = _PY_MINI_RACER.MiniRacer()
-        return ctx.eval(('$ = {}; {}'.format(json.dumps(context), script)))
+        return ctx.eval(
+            '$ = {}; {}'.format(json.dumps(context), script),
+            **_get_mini_racer_limits()
+        )
+
+
+def _get_mini_racer_limits():
+    js_cfg = cfg.CONF.javascript
+
+    return {
+        'timeout': int(js_cfg.timeout * 1000) or None,
+        'max_memory': js_cfg.max_memory * 1024 * 1024 or None
+    }
+
+
+class _PyMiniRacerRuntime(_JSRuntime):
+    def __init__(self):
+        super(_PyMiniRacerRuntime, self).__init__()
+
+        self._ctx = _PY_MINI_RACER.MiniRacer()
+
+    def _eval(self, script):
+        return self._ctx.eval(script)
+
+    def _call(self, func_name, args):
+        return self._ctx.call(
+            func_name,
+            *args,
+            **_get_mini_racer_limits()
+        )
+
+
+_V8EVAL_POOL = _JSRuntimePool(_V8EvalRuntime)
+_PY_MINI_RACER_POOL = _JSRuntimePool(_PyMiniRacerRuntime)
 
 
 _mgr = extension.ExtensionManager(
@@ -13,18 +13,27 @@
 #    limitations under the License.
 
 from os import path
+import threading
+import time
 
 import six
 
 from oslo_log import log as logging
 import paramiko
 
+from mistral import config as cfg
 from mistral import exceptions as exc
 
 
+CONF = cfg.CONF
 KEY_PATH = path.expanduser("~/.ssh/")
 LOG = logging.getLogger(__name__)
 
+# Idle connections as (key, connection, time of the last use) tuples.
+# The connections that have been used least recently go first.
+_IDLE_CONNECTIONS = []
+_POOL_LOCK = threading.Lock()
+
 
 def _read_paramimko_stream(recv_func):
     result = ''
@@ -78,84 +87,245 @@ def _cleanup(ssh_client):
     ssh_client.close()
 
 
-def _execute_command(ssh_client, cmd, get_stderr=False,
-                     raise_when_error=True):
+class _Connection(object):
+    """SSH client connected to a host, possibly through a gateway."""
+
+    def __init__(self, ssh_client, gateway_ssh_client=None):
+        self.ssh_client = ssh_client
+        self.gateway_ssh_client = gateway_ssh_client
+
+    def is_active(self):
+        for client in (self.ssh_client, self.gateway_ssh_client):
+            if client is None:
+                continue
+
+            transport = client.get_transport()
+
+            if transport is None or not transport.is_active():
+                return False
+
+        try:
+            # Only fails if the socket is already known to be closed. A
+            # connection dropped silently by the server or a NAT on the
+            # way is detected when a session is opened.
+            self.ssh_client.get_transport().send_ignore()
+        except Exception:
+            return False
+
+        return True
+
+    def close(self):
+        _cleanup(self.ssh_client)
+
+        if self.gateway_ssh_client:
+            _cleanup(self.gateway_ssh_client)
+
+
+def _get_connection(key, connect):
+    """Gets an idle pooled connection or creates a new one.
+
+    :return: A tuple (connection, True if the connection is pooled).
+    """
+    now = time.time()
+
+    conn = None
+    stale_conns = []
+
+    with _POOL_LOCK:
+        idle_timeout = CONF.ssh_client.idle_timeout
+
+        while (idle_timeout and _IDLE_CONNECTIONS and
+               now - _IDLE_CONNECTIONS[0][2] > idle_timeout):
+            stale_conns.append(_IDLE_CONNECTIONS.pop(0)[1])
+
+        for i in reversed(range(len(_IDLE_CONNECTIONS))):
+            if _IDLE_CONNECTIONS[i][0] == key:
+                conn = _IDLE_CONNECTIONS.pop(i)[1]
+
+                break
+
+    for c in stale_conns:
+        c.close()
+
+    if conn is not None:
+        if conn.is_active():
+            LOG.debug('Reusing SSH connection to %s', key[0])
+
+            return conn, True
+
+        conn.close()
+
+    return connect(), False
+
+
+def _release_connection(key, conn):
+    pool_size = CONF.ssh_client.pool_size
+
+    if not pool_size:
+        conn.close()
+
+        return
+
+    stale_conns = []
+
+    with _POOL_LOCK:
+        _IDLE_CONNECTIONS.append((key, conn, time.time()))
+
+        while len(_IDLE_CONNECTIONS) > pool_size:
+            stale_conns.append(_IDLE_CONNECTIONS.pop(0)[1])
+
+    for c in stale_conns:
+        c.close()
+
+
+def close_connections():
+    """Closes all idle pooled connections."""
+    with _POOL_LOCK:
+        conns = [c for _, c, _ in _IDLE_CONNECTIONS]
+
+        del _IDLE_CONNECTIONS[:]
+
+    for c in conns:
+        c.close()
+
+
+def _open_session(conn):
+    try:
+        return conn.ssh_client.get_transport().open_session()
+    except Exception:
+        conn.close()
+
+        raise
+
+
+def _execute_command(chan, cmd):
+    chan.exec_command(cmd)
+
+    # TODO(nmakhotkin): that could hang if stderr buffer overflows
+    stdout = _read_paramimko_stream(chan.recv)
+    stderr = _read_paramimko_stream(chan.recv_stderr)
+
+    return chan.recv_exit_status(), stdout, stderr
+
+
+def _execute_pooled_command(key, connect, cmd, get_stderr=False,
+                            raise_when_error=True):
+    conn, pooled = _get_connection(key, connect)
+
+    try:
+        chan = _open_session(conn)
+    except Exception:
+        if not pooled:
+            raise
+
+        # The pooled connection has been dropped while it was idle. The
+        # command hasn't been sent yet so it's safe to retry it once
+        # over a new connection.
+        LOG.debug('Reconnecting to %s, SSH connection is broken', key[0])
+
+        conn = connect()
+        chan = _open_session(conn)
+
     try:
-        chan = ssh_client.get_transport().open_session()
-        chan.exec_command(cmd)
+        ret_code, stdout, stderr = _execute_command(chan, cmd)
+    except Exception:
+        conn.close()
 
-        # TODO(nmakhotkin): that could hang if stderr buffer overflows
-        stdout = _read_paramimko_stream(chan.recv)
-        stderr = _read_paramimko_stream(chan.recv_stderr)
+        raise
 
-        ret_code = chan.recv_exit_status()
+    # A command that has failed leaves the connection usable.
+    _release_connection(key, conn)
 
-        if ret_code and raise_when_error:
-            raise RuntimeError("Cmd: %s\nReturn code: %s\nstdout: %s"
-                               % (cmd, ret_code, stdout))
-        if get_stderr:
-            return ret_code, stdout, stderr
-        else:
-            return ret_code, stdout
-    finally:
-        _cleanup(ssh_client)
+    if ret_code and raise_when_error:
+        raise RuntimeError("Cmd: %s\nReturn code: %s\nstdout: %s"
+                           % (cmd, ret_code, stdout))
+    if get_stderr:
+        return ret_code, stdout, stderr
+    else:
+        return ret_code, stdout
 
 
 def execute_command_via_gateway(cmd, host, username, private_key_filename,
                                 gateway_host, gateway_username=None,
                                 proxy_command=None, password=None):
-    LOG.debug('Creating SSH connection')
+    def connect():
+        LOG.debug('Creating SSH connection')
 
-    private_key = _to_paramiko_private_key(private_key_filename, password)
+        private_key = _to_paramiko_private_key(private_key_filename, password)
 
-    proxy = None
+        proxy = None
 
-    if proxy_command:
-        LOG.debug('Creating proxy using command: %s', proxy_command)
+        if proxy_command:
+            LOG.debug('Creating proxy using command: %s', proxy_command)
 
-        proxy = paramiko.ProxyCommand(proxy_command)
+            proxy = paramiko.ProxyCommand(proxy_command)
 
-    _proxy_ssh_client = paramiko.SSHClient()
-    _proxy_ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        _proxy_ssh_client = paramiko.SSHClient()
+        _proxy_ssh_client.set_missing_host_key_policy(
+            paramiko.AutoAddPolicy()
+        )
 
-    LOG.debug('Connecting to proxy gateway at: %s', gateway_host)
+        LOG.debug('Connecting to proxy gateway at: %s', gateway_host)
 
-    if not gateway_username:
-        gateway_username = username
+        _proxy_ssh_client.connect(
+            gateway_host,
+            username=gateway_username or username,
+            pkey=private_key,
+            sock=proxy
+        )
 
-    _proxy_ssh_client.connect(
-        gateway_host,
-        username=gateway_username,
-        pkey=private_key,
-        sock=proxy
-    )
+        try:
+            proxy = _proxy_ssh_client.get_transport().open_session()
+            proxy.exec_command("nc {0} 22".format(host))
+
+            ssh_client = _connect(
+                host,
+                username=username,
+                pkey=private_key,
+                proxy=proxy
+            )
+        except Exception:
+            _cleanup(_proxy_ssh_client)
+
+            raise
 
-    proxy = _proxy_ssh_client.get_transport().open_session()
-    proxy.exec_command("nc {0} 22".format(host))
+        return _Connection(ssh_client, _proxy_ssh_client)
 
-    ssh_client = _connect(
+    key = (
         host,
-        username=username,
-        pkey=private_key,
-        proxy=proxy
+        username,
+        password,
+        private_key_filename,
+        gateway_host,
+        gateway_username,
+        proxy_command
     )
 
-    try:
-        return _execute_command(
-            ssh_client,
-            cmd,
-            get_stderr=False,
-            raise_when_error=True
-        )
-    finally:
-        _cleanup(_proxy_ssh_client)
+    return _execute_pooled_command(
+        key,
+        connect,
+        cmd,
+        get_stderr=False,
+        raise_when_error=True
+    )
 
 
 def execute_command(cmd, host, username, password=None,
                     private_key_filename=None, get_stderr=False,
                     raise_when_error=True):
-    ssh_client = _connect(host, username, password, private_key_filename)
+    def connect():
+        return _Connection(
+            _connect(host, username, password, private_key_filename)
+        )
+
+    key = (host, username, password, private_key_filename)
 
     LOG.debug("Executing command %s", cmd)
 
-    return _execute_command(ssh_client, cmd, get_stderr, raise_when_error)
+    return _execute_pooled_command(
+        key,
+        connect,
+        cmd,
+        get_stderr,
+        raise_when_error
+    )
@@ -0,0 +1,70 @@
+# Copyright 2019 - Nokia Networks.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Measures the overhead of DefaultExecutor.run_action().
+
+Runs "std.noop" the given number of times without sending results to
+the engine and prints the average time of one run. For example:
+
+    python tools/run_action_benchmark.py 100000
+"""
+
+import os
+import sys
+import timeit
+
+from mistral import config
+from mistral import context
+from mistral.executors import default_executor
+
+NOOP = 'mistral.actions.std_actions.NoOpAction'
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    # Results aren't sent anywhere, the engine client is never used.
+    os.environ.setdefault('OS_DEFAULT__TRANSPORT_URL', 'fake:/')
+
+    config.parse_args(args=[])
+
+    context.set_ctx(
+        context.MistralContext(
+            user_id='user',
+            project_id='project',
+            auth_token='token'
+        )
+    )
+
+    executor = default_executor.DefaultExecutor()
+
+    execution_context = {
+        'workflow_execution_id': 'wf-ex-id',
+        'task_execution_id': 'task-ex-id',
+        'action_execution_id': 'action-ex-id'
+    }
+
+    def run():
+        executor.run_action(None, NOOP, {}, {}, True, execution_context)
+
+    elapsed = min(timeit.repeat(run, number=count, repeat=3))
+
+    print(
+        "std.noop: %.2f us per run_action() call (%s calls)"
+        % (elapsed / count * 1e6, count)
+    )
+
+
+if __name__ == '__main__':
+    sys.exit(main())